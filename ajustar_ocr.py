@@ -0,0 +1,194 @@
+"""
+Ajuste automático do motor OCR para CPU
+Executa o vídeo de amostra com várias configurações (threads, MKLDNN, variante,
+det_limit_side_len, lote, classificador adaptativo) e grava em config_ocr.json a mais rápida que atinge
+a precisão mínima em relação à configuração de referência.
+
+Uso:
+    python ajustar_ocr.py --frames 150 --piso 0.95
+    python ajustar_ocr.py --threads 2,4 --lados 640,960 --mkldnn 1 --lotes 6
+"""
+
+import argparse
+import itertools
+import os
+import re
+import time
+from datetime import datetime
+
+import cv2
+
+from motor_ocr import (ARQUIVO_CONFIG_OCR, CONFIG_OCR_PADRAO, MODELOS_VARIANTE, aquecer_ocr, criar_ocr,
+                       reconhecer, salvar_config_ocr, validar_config_ocr)
+from configuracao import ARQUIVO_VIDEO, CONFIANCA_MINIMA, CONFIANCA_MINIMA_MOTO, validar_placa
+
+
+def ler_frames(caminho: str, quantidade: int, passo: int) -> list:
+    """Lê `quantidade` frames do vídeo, um a cada `passo`"""
+    cap = cv2.VideoCapture(caminho)
+    if not cap.isOpened():
+        raise SystemExit(f"❌ Não foi possível abrir o vídeo: {caminho}")
+
+    frames = []
+    indice = 0
+    while len(frames) < quantidade:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if indice % passo == 0:
+            frames.append(frame)
+        indice += 1
+    cap.release()
+    return frames
+
+
+def placas_do_resultado(linhas: list) -> set:
+    """Placas válidas de um frame (carros e combinações de 2 linhas para motos)"""
+    textos = [(linha[1][0], linha[1][1]) for linha in linhas if linha[1][1] >= CONFIANCA_MINIMA]
+    placas = set()
+
+    for texto, _ in textos:
+        placa, _ = validar_placa(texto)
+        if placa:
+            placas.add(placa)
+
+    for i, (texto1, conf1) in enumerate(textos):
+        for texto2, conf2 in textos[i+1:]:
+            combinado = re.sub(r'[^A-Z0-9]', '', texto1.upper()) + re.sub(r'[^A-Z0-9]', '', texto2.upper())
+            placa, _ = validar_placa(combinado, eh_combinacao=True)
+            if placa and (conf1 + conf2) / 2 >= CONFIANCA_MINIMA_MOTO:
+                placas.add(placa)
+                break
+
+    return placas
+
+
+def avaliar(config: dict, frames: list) -> dict:
+    """Carrega o modelo com a configuração e mede velocidade e placas lidas"""
+    ocr = criar_ocr(config)
+    aquecer_ocr(ocr, config)  # Falha aqui se a variante lê lixo (não entra no ajuste)
+
+    leituras = []
+    inicio = time.perf_counter()
+    for frame in frames:
+        linhas = reconhecer(ocr, frame, config, CONFIANCA_MINIMA)
+        leituras.append(placas_do_resultado(linhas))
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'config': config,
+        'fps': len(frames) / duracao if duracao else 0.0,
+        'ms_por_frame': duracao / len(frames) * 1000 if frames else 0.0,
+        'leituras': leituras
+    }
+
+
+def calcular_precisao(leituras: list, referencia: list) -> float:
+    """Fração das placas da referência que a configuração também leu (por frame)"""
+    total = sum(len(ref) for ref in referencia)
+    if total == 0:
+        return 1.0
+    acertos = sum(len(lidas & ref) for lidas, ref in zip(leituras, referencia))
+    return acertos / total
+
+
+def lista_inteiros(texto: str) -> list:
+    return [int(valor) for valor in texto.split(',') if valor.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajuste automático do motor OCR para CPU")
+    parser.add_argument('--video', default=ARQUIVO_VIDEO, help="Vídeo de amostra")
+    parser.add_argument('--frames', type=int, default=150, help="Quantidade de frames avaliados")
+    parser.add_argument('--passo', type=int, default=5, help="Usa 1 a cada N frames do vídeo")
+    parser.add_argument('--piso', type=float, default=0.95, help="Precisão mínima em relação à referência")
+    parser.add_argument('--threads', default=','.join(str(t) for t in sorted({1, 2, 4, CONFIG_OCR_PADRAO['cpu_threads']})))
+    parser.add_argument('--mkldnn', default='1,0', help="1 = ativo, 0 = inativo")
+    parser.add_argument('--variantes', default=','.join(v for v in MODELOS_VARIANTE
+                                                       if v == 'mobile' or all(p is None or os.path.isdir(p)
+                                                                               for p in MODELOS_VARIANTE[v].values())))
+    parser.add_argument('--lados', default='480,640,960', help="Valores de det_limit_side_len")
+    parser.add_argument('--lotes', default='1,6', help="Valores de rec_batch_num")
+    parser.add_argument('--adaptativo', default='1,0', help="cls_adaptativo: 1 = fallback, 0 = em todo recorte")
+    parser.add_argument('--reconhecedores', default='geral', help="geral e/ou placas (gramática da placa)")
+    parser.add_argument('--saida', default=ARQUIVO_CONFIG_OCR)
+    args = parser.parse_args()
+
+    frames = ler_frames(args.video, args.frames, args.passo)
+    if not frames:
+        raise SystemExit("❌ Nenhum frame lido do vídeo")
+    print(f"📹 {len(frames)} frames de {args.video}")
+
+    variantes = [v for v in args.variantes.split(',') if v]
+    candidatas = []
+    reconhecedores = [r for r in args.reconhecedores.split(',') if r]
+    for threads, mkldnn, variante, lado, lote, adaptativo, reconhecedor in itertools.product(
+            lista_inteiros(args.threads), lista_inteiros(args.mkldnn), variantes,
+            lista_inteiros(args.lados), lista_inteiros(args.lotes), lista_inteiros(args.adaptativo),
+            reconhecedores):
+        candidatas.append(validar_config_ocr({
+            'cpu_threads': threads,
+            'enable_mkldnn': bool(mkldnn),
+            'variante': variante,
+            'det_limit_side_len': lado,
+            'rec_batch_num': lote,
+            'cls_adaptativo': bool(adaptativo),
+            'reconhecedor': reconhecedor,
+        }))
+
+    # Referência: variante mais precisa disponível, maior entrada do detector, classificador em todo recorte e sem cache
+    referencia_config = validar_config_ocr({
+        'variante': 'server' if 'server' in variantes else 'mobile',
+        'det_limit_side_len': max(lista_inteiros(args.lados)),
+        'cls_adaptativo': False,
+        'reconhecedor': 'geral',
+        'cache_tamanho': 0,
+    })
+    print("\nExecutando configuração de referência...")
+    referencia = avaliar(referencia_config, frames)
+    total_ref = sum(len(r) for r in referencia['leituras'])
+    print(f"✓ Referência: {referencia['fps']:.2f} FPS, {total_ref} leituras de placa")
+    if total_ref == 0:
+        print("⚠️  Nenhuma placa lida pela referência: a precisão não poderá ser comparada")
+
+    resultados = []
+    for i, config in enumerate(candidatas, 1):
+        print(f"\n[{i}/{len(candidatas)}] {config}")
+        try:
+            resultado = avaliar(config, frames)
+        except Exception as e:
+            print(f"   ❌ Falhou: {e}")
+            continue
+        resultado['precisao'] = calcular_precisao(resultado['leituras'], referencia['leituras'])
+        print(f"   {resultado['fps']:.2f} FPS ({resultado['ms_por_frame']:.0f} ms/frame) - "
+              f"precisão {resultado['precisao']:.1%}")
+        resultados.append(resultado)
+
+    aprovados = [r for r in resultados if r['precisao'] >= args.piso]
+    print("\n" + "="*60)
+    print("RESULTADO DO AJUSTE")
+    print("="*60)
+
+    if not aprovados:
+        print(f"❌ Nenhuma configuração atingiu a precisão mínima de {args.piso:.0%}")
+        return
+
+    melhor = max(aprovados, key=lambda r: r['fps'])
+    for r in sorted(aprovados, key=lambda r: -r['fps'])[:5]:
+        c = r['config']
+        print(f"  {r['fps']:6.2f} FPS | {r['precisao']:.1%} | threads={c['cpu_threads']} "
+              f"mkldnn={c['enable_mkldnn']} {c['variante']} lado={c['det_limit_side_len']} "
+              f"lote={c['rec_batch_num']} adaptativo={c['cls_adaptativo']} {c['reconhecedor']}")
+
+    salvar_config_ocr(melhor['config'], args.saida,
+                      fps=round(melhor['fps'], 2),
+                      precisao=round(melhor['precisao'], 4),
+                      piso=args.piso,
+                      video=args.video,
+                      frames=len(frames),
+                      data=datetime.now().isoformat(timespec='seconds'))
+    print(f"\n✓ Configuração mais rápida gravada em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
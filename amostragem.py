@@ -0,0 +1,185 @@
+"""
+Controle adaptativo da taxa de amostragem do OCR
+Substitui o intervalo fixo de frames: mede a latência ponta a ponta e a fila de frames
+acumulados e ajusta quantos frames pular para manter a latência alvo. Com veículo ou
+movimento na cena o intervalo volta ao mínimo permitido pela carga; com a cena parada
+ele sobe até o intervalo de ociosidade.
+"""
+
+import math
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from metricas import (AMOSTRAGEM_DECISOES, AMOSTRAGEM_INTERVALO, CENA_ATIVA, FILA_PROFUNDIDADE,
+                      LATENCIA_PONTA_A_PONTA)
+
+CONFIG_AMOSTRAGEM_PADRAO = {
+    'latencia_alvo': 0.5,  # Segundos da captura ao fim do processamento do frame
+    'fila_maxima': 2,  # Frames acumulados na fonte tolerados antes de reduzir a taxa
+    'intervalo_minimo': 1,  # Processa no máximo 1 a cada N frames
+    'intervalo_maximo': 15,  # Sob carga, nunca pula mais que N frames
+    'intervalo_ocioso': 6,  # Intervalo com a cena parada (sem movimento nem veículo)
+    'limiar_movimento': 0.01,  # Fração de pixels alterados que indica movimento
+    'segundos_presenca': 3.0,  # Tempo em que a cena segue ativa após o último movimento/placa
+    'janela': 5,  # Execuções do OCR entre ajustes de carga
+}
+
+# Resolução reduzida usada na detecção de movimento
+TAMANHO_MOVIMENTO = (160, 90)
+DIFERENCA_PIXEL = 25
+
+
+def validar_config_amostragem(config: dict = None) -> dict:
+    """
+    Completa a configuração com os valores padrão e valida os limites
+
+    Raises:
+        ValueError: se algum campo for desconhecido ou inválido
+    """
+    final = dict(CONFIG_AMOSTRAGEM_PADRAO)
+    final.update(config or {})
+
+    desconhecidos = set(final) - set(CONFIG_AMOSTRAGEM_PADRAO)
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos na configuração de amostragem: {', '.join(sorted(desconhecidos))}")
+
+    erros = []
+    if not 1 <= final['intervalo_minimo'] <= final['intervalo_maximo']:
+        erros.append("intervalo_minimo deve estar entre 1 e intervalo_maximo")
+    if not final['intervalo_minimo'] <= final['intervalo_ocioso'] <= final['intervalo_maximo']:
+        erros.append("intervalo_ocioso deve estar entre intervalo_minimo e intervalo_maximo")
+    if final['latencia_alvo'] <= 0:
+        erros.append("latencia_alvo deve ser positiva")
+    if final['janela'] < 1:
+        erros.append("janela deve ser ao menos 1")
+    if erros:
+        raise ValueError("Configuração de amostragem inválida: " + "; ".join(erros))
+    return final
+
+
+class ControladorAmostragem:
+    """
+    Decide, frame a frame, se o frame vai para o OCR
+
+    Uso:
+        if controlador.deve_processar(frame):
+            inicio = time.perf_counter()
+            ...OCR...
+            controlador.registrar(time.perf_counter() - inicio, veiculo=bool(deteccoes))
+    """
+
+    def __init__(self, config: dict = None, nome: str = 'camera'):
+        self.config = validar_config_amostragem(config)
+        self.nome = nome
+        self.intervalo_carga = self.config['intervalo_minimo']  # Definido pela latência/fila
+        self.intervalo = self.config['intervalo_ocioso']  # Efetivo (carga + presença)
+        self.frames_desde_ocr = 0
+        self.latencias = deque(maxlen=self.config['janela'])
+        self.filas = deque(maxlen=self.config['janela'])
+        self.ultima_atividade = 0.0
+        self.quadro_anterior = None
+        self.decisoes = deque(maxlen=50)
+        AMOSTRAGEM_INTERVALO.rotulo(nome).set(self.intervalo)
+
+    @property
+    def cena_ativa(self) -> bool:
+        return time.monotonic() - self.ultima_atividade < self.config['segundos_presenca']
+
+    def detectar_movimento(self, frame) -> bool:
+        """Diferença entre frames consecutivos em baixa resolução"""
+        cinza = cv2.cvtColor(cv2.resize(frame, TAMANHO_MOVIMENTO, interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY)
+        anterior, self.quadro_anterior = self.quadro_anterior, cinza
+        if anterior is None:
+            return False
+        alterados = np.count_nonzero(cv2.absdiff(cinza, anterior) > DIFERENCA_PIXEL)
+        return alterados / cinza.size >= self.config['limiar_movimento']
+
+    def deve_processar(self, frame) -> bool:
+        """Chamado para cada frame capturado"""
+        if self.detectar_movimento(frame):
+            self.ultima_atividade = time.monotonic()
+        self._atualizar_intervalo()
+
+        self.frames_desde_ocr += 1
+        if self.frames_desde_ocr < self.intervalo:
+            return False
+        self.frames_desde_ocr = 0
+        return True
+
+    def registrar(self, latencia: float, fila: float = 0, veiculo: bool = False):
+        """Registra a latência ponta a ponta e a fila observadas em um frame processado"""
+        LATENCIA_PONTA_A_PONTA.observar(latencia)
+        FILA_PROFUNDIDADE.rotulo('fonte').set(fila)
+        if veiculo:
+            self.ultima_atividade = time.monotonic()
+
+        self.latencias.append(latencia)
+        self.filas.append(fila)
+        ajuste = None
+        if len(self.latencias) == self.latencias.maxlen:
+            ajuste = self._ajustar_carga()
+            self.latencias.clear()
+            self.filas.clear()
+        self._atualizar_intervalo(*(ajuste or ()))
+
+    def _ajustar_carga(self):
+        """
+        Aumento multiplicativo do intervalo sob carga, redução de um frame com folga
+
+        Returns:
+            (motivo, detalhe) quando o intervalo de carga muda, senão None
+        """
+        latencia = sorted(self.latencias)[len(self.latencias) // 2]
+        fila = max(self.filas)
+        alvo = self.config['latencia_alvo']
+        anterior = self.intervalo_carga
+
+        if latencia > alvo or fila > self.config['fila_maxima']:
+            novo = math.ceil(anterior * max(1.5, latencia / alvo))
+            motivo = 'sobrecarga'
+        elif latencia < 0.7 * alvo and fila <= self.config['fila_maxima'] / 2:
+            novo = anterior - 1
+            motivo = 'folga'
+        else:
+            return None
+
+        novo = min(max(novo, self.config['intervalo_minimo']), self.config['intervalo_maximo'])
+        if novo == anterior:
+            return None
+        self.intervalo_carga = novo
+        return motivo, f"latência {latencia * 1000:.0f}ms, fila {fila:.0f}"
+
+    def _atualizar_intervalo(self, motivo: str = None, detalhe: str = ''):
+        """Intervalo efetivo: o de carga, elevado ao de ociosidade quando a cena está parada"""
+        ativa = self.cena_ativa
+        CENA_ATIVA.rotulo(self.nome).set(int(ativa))
+        novo = self.intervalo_carga if ativa else max(self.intervalo_carga, self.config['intervalo_ocioso'])
+        if novo == self.intervalo and motivo is None:
+            return
+        self.intervalo = novo
+        self._decidir(motivo or ('presenca' if ativa else 'ocioso'), detalhe)
+
+    def _decidir(self, motivo: str, detalhe: str = ''):
+        AMOSTRAGEM_DECISOES.rotulo(motivo).inc()
+        AMOSTRAGEM_INTERVALO.rotulo(self.nome).set(self.intervalo)
+        self.decisoes.append({
+            'momento': time.time(),
+            'motivo': motivo,
+            'intervalo': self.intervalo,
+            'intervalo_carga': self.intervalo_carga,
+            'detalhe': detalhe
+        })
+        print(f"🎚️  Amostragem [{self.nome}] {motivo}: OCR a cada {self.intervalo} frame(s)"
+              f"{' - ' + detalhe if detalhe else ''}")
+
+    def estado(self) -> dict:
+        return {
+            'intervalo': self.intervalo,
+            'intervalo_carga': self.intervalo_carga,
+            'cena_ativa': self.cena_ativa,
+            'decisoes': list(self.decisoes)
+        }
@@ -0,0 +1,724 @@
+"""
+Armazenamento das detecções com backends intercambiáveis: PostgreSQL, MySQL e SQLite (embarcado)
+Os três gravam o mesmo esquema (usuarios, veiculos, acessos, alertas e as estatísticas pré-agregadas),
+então o web_app_placas e o detectar_placas_video leem e escrevem as mesmas tabelas.
+
+Cada backend usa o caminho nativo do seu driver:
+- PostgreSQL: comandos preparados no servidor (PREPARE/EXECUTE, uma vez por conexão) e lotes num único
+  INSERT ... SELECT FROM json_to_recordset; acesso, alertas e estatísticas de uma detecção num só comando
+  (registrar_acessos_com_alertas)
+- MySQL: cursores preparados (protocolo binário) nas consultas por placa e executemany, que o
+  mysql.connector reescreve num INSERT com várias linhas
+- SQLite: executemany (um comando compilado para o lote) e o cache de comandos do sqlite3
+
+Os métodos recebem a conexão e não fazem commit: quem chama controla a transação (o SincronizadorDiario
+grava um lote por transação). Eventos são pares (chave, dados) do diario_local; a chave é a restrição única
+que torna o reenvio idempotente.
+
+Uso:
+    armazenamento = criar_armazenamento('sqlite', {'database': 'placas.db'})
+    conn = armazenamento.abrir()  # conexão com o esquema pronto
+"""
+
+import json
+import re
+import sqlite3
+import weakref
+from datetime import date, datetime
+
+import estatisticas
+
+COLUNAS_VEICULO = ('veiculo_id', 'placa', 'tipo_placa', 'modelo', 'cor', 'tipo_veiculo', 'marcado',
+                   'motivo_marcacao', 'usuario_id', 'usuario_nome', 'usuario_cpf', 'usuario_telefone',
+                   'usuario_tipo', 'usuario_autorizado')
+
+CONSULTA_VEICULO = """
+    SELECT v.id, v.placa, v.tipo_placa, v.modelo, v.cor, v.tipo_veiculo,
+           v.marcado, v.motivo_marcacao,
+           u.id, u.nome, u.cpf, u.telefone, u.tipo, u.autorizado
+    FROM veiculos v
+    LEFT JOIN usuarios u ON v.usuario_id = u.id
+    WHERE v.placa = {marcador}
+"""
+
+# Veículos que geram alerta quando lidos (lista_observacao): marcados ou de usuário não autorizado/sem usuário
+CONSULTA_OBSERVADOS = """
+    SELECT v.placa, v.marcado, v.motivo_marcacao, u.nome, u.autorizado
+    FROM veiculos v
+    LEFT JOIN usuarios u ON v.usuario_id = u.id
+    WHERE v.marcado = TRUE OR u.autorizado IS NOT TRUE
+"""
+
+
+def _momento(texto) -> datetime:
+    return texto if isinstance(texto, datetime) else datetime.fromisoformat(texto)
+
+
+def _veiculo(linha) -> dict:
+    if linha is None:
+        return None
+    veiculo = dict(zip(COLUNAS_VEICULO, linha))
+    # MySQL e SQLite devolvem os booleanos como 0/1
+    for campo in ('marcado', 'usuario_autorizado'):
+        if veiculo[campo] is not None:
+            veiculo[campo] = bool(veiculo[campo])
+    return veiculo
+
+
+class Armazenamento:
+    """
+    Interface comum dos backends; a implementação padrão dos eventos serve ao MySQL e ao SQLite
+    (consulta as chaves e veículos do lote com IN, depois um executemany)
+
+    Args:
+        config: parâmetros de conexão do driver
+    """
+
+    dialeto = None
+    nome = None
+
+    def __init__(self, config: dict):
+        self.config = config
+
+    # --- Conexão e esquema ---
+    def conectar(self):
+        raise NotImplementedError
+
+    def conexao_aberta(self, conn) -> bool:
+        raise NotImplementedError
+
+    def criar_esquema(self, conn):
+        """Cria (ou atualiza) as tabelas; faz commit"""
+        raise NotImplementedError
+
+    def abrir(self):
+        """Conexão nova com o esquema pronto (o banco pode ter subido depois da aplicação)"""
+        conn = self.conectar()
+        try:
+            self.criar_esquema(conn)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    @property
+    def descricao(self) -> str:
+        return f"{self.nome}: {self.config.get('database')}"
+
+    def _cursor(self, conn, nome: str = None):
+        """Cursor para o comando `nome` (backends com cursores preparados reaproveitam o mesmo)"""
+        return conn.cursor()
+
+    # --- Consultas ---
+    def buscar_veiculo(self, conn, placa: str):
+        """Veículo com o dono (dict com COLUNAS_VEICULO) ou None"""
+        cursor = self._cursor(conn, 'buscar_veiculo')
+        cursor.execute(CONSULTA_VEICULO.format(marcador='%s'), (placa,))
+        # fetchall: o cursor reaproveitado não pode ficar com resultado pendente
+        linhas = cursor.fetchall()
+        return _veiculo(linhas[0] if linhas else None)
+
+    def observados(self, conn) -> list:
+        """Veículos da lista de observação (dicts com os campos de COLUNAS_VEICULO usados por ela)"""
+        cursor = conn.cursor()
+        cursor.execute(CONSULTA_OBSERVADOS)
+        veiculos = [{'placa': placa, 'marcado': bool(marcado), 'motivo_marcacao': motivo, 'usuario_nome': nome,
+                     'usuario_autorizado': None if autorizado is None else bool(autorizado)}
+                    for placa, marcado, motivo, nome, autorizado in cursor.fetchall()]
+        cursor.close()
+        return veiculos
+
+    def _chaves_existentes(self, cursor, tabela: str, chaves: list) -> set:
+        if not chaves:
+            return set()
+        cursor.execute(f"SELECT chave_evento FROM {tabela} WHERE chave_evento IN ({', '.join(['%s'] * len(chaves))})",
+                       chaves)
+        return {linha[0] for linha in cursor.fetchall()}
+
+    def _ids_veiculos(self, cursor, placas) -> dict:
+        placas = sorted(set(placas))
+        cursor.execute(f"SELECT placa, id FROM veiculos WHERE placa IN ({', '.join(['%s'] * len(placas))})", placas)
+        return dict(cursor.fetchall())
+
+    def _ids_existentes(self, cursor, ids) -> set:
+        ids = sorted({id_ for id_ in ids if id_ is not None})
+        if not ids:
+            return set()
+        cursor.execute(f"SELECT id FROM veiculos WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+        return {linha[0] for linha in cursor.fetchall()}
+
+    def _inserir_acessos(self, cursor, eventos: list, veiculo_de) -> list:
+        """
+        INSERT (executemany) dos acessos cuja chave ainda não está no banco, contados nas estatísticas
+
+        Args:
+            veiculo_de: função(dados) -> veiculo_id ou None
+
+        Returns:
+            [(chave, dados, momento, veiculo_id)] dos acessos novos
+        """
+        existentes = self._chaves_existentes(cursor, 'acessos', [chave for chave, _ in eventos])
+        novos = []
+        for chave, dados in eventos:
+            if chave in existentes:
+                continue
+            existentes.add(chave)
+            novos.append((chave, dados, _momento(dados['data_acesso']), veiculo_de(dados)))
+        if novos:
+            cursor.executemany("""
+                INSERT INTO acessos
+                (veiculo_id, placa, tipo_placa, tipo_evento, confianca, imagem_path, camera, data_acesso, chave_evento)
+                VALUES (%s, %s, %s, 'DETECTADO', %s, %s, %s, %s, %s)
+            """, [(veiculo_id, dados['placa'], dados.get('tipo_placa'), dados['confianca'], dados.get('imagem_path'),
+                   dados['camera'], momento, chave) for chave, dados, momento, veiculo_id in novos])
+            estatisticas.registrar_deteccoes(cursor, [(momento, dados['camera'], dados['placa'], veiculo_id is not None)
+                                                      for _, dados, momento, veiculo_id in novos], self.dialeto)
+        return novos
+
+    def _inserir_alertas(self, cursor, linhas: list):
+        """INSERT (executemany) de [(veiculo_id, placa, tipo_alerta, mensagem, camera, momento, chave)] e estatísticas"""
+        if not linhas:
+            return
+        cursor.executemany("""
+            INSERT INTO alertas (veiculo_id, placa, tipo_alerta, mensagem, camera, data_alerta, chave_evento)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, linhas)
+        for _, _, tipo_alerta, _, camera, momento, _ in linhas:
+            estatisticas.registrar_alerta(cursor, momento, camera, tipo_alerta, self.dialeto)
+
+    # --- Eventos do diário (idempotentes pela chave) ---
+    def registrar_acessos(self, conn, eventos: list) -> int:
+        """Grava os acessos [(chave, dados)] e conta os novos nas estatísticas; retorna quantos eram novos"""
+        cursor = conn.cursor()
+        veiculos = self._ids_veiculos(cursor, [dados['placa'] for _, dados in eventos])
+        novos = self._inserir_acessos(cursor, eventos, lambda dados: veiculos.get(dados['placa']))
+        cursor.close()
+        return len(novos)
+
+    def registrar_acessos_com_alertas(self, conn, eventos: list) -> int:
+        """
+        Grava acessos que já trazem o veiculo_id (de buscar_veiculo) e os alertas de cada um
+        (dados['alertas'] = [{'chave', 'tipo_alerta', 'mensagem'}]); os alertas só entram com o acesso novo.
+        Sem veiculo_id (banco fora do ar na detecção), o veículo é resolvido pela placa
+
+        Returns:
+            Quantidade de acessos novos
+        """
+        cursor = conn.cursor()
+        # O veículo pode ter sido removido depois da detecção: confere os ids do lote numa consulta
+        veiculos = self._ids_existentes(cursor, [dados['veiculo_id'] for _, dados in eventos])
+        sem_veiculo = [dados['placa'] for _, dados in eventos if dados['veiculo_id'] is None]
+        por_placa = self._ids_veiculos(cursor, sem_veiculo) if sem_veiculo else {}
+
+        def veiculo_de(dados):
+            if dados['veiculo_id'] is None:
+                return por_placa.get(dados['placa'])
+            return dados['veiculo_id'] if dados['veiculo_id'] in veiculos else None
+
+        novos = self._inserir_acessos(cursor, eventos, veiculo_de)
+        # Alertas gravados junto com o acesso: se o acesso é novo, os alertas dele também são
+        self._inserir_alertas(cursor, [(veiculo_id, dados['placa'], alerta['tipo_alerta'], alerta['mensagem'],
+                                        dados['camera'], momento, alerta['chave'])
+                                       for _, dados, momento, veiculo_id in novos if veiculo_id is not None
+                                       for alerta in dados.get('alertas', ())])
+        cursor.close()
+        return len(novos)
+
+    def registrar_alertas(self, conn, eventos: list) -> int:
+        """Grava os alertas (apenas de veículos cadastrados) e os conta nas estatísticas"""
+        cursor = conn.cursor()
+        existentes = self._chaves_existentes(cursor, 'alertas', [chave for chave, _ in eventos])
+        veiculos = self._ids_veiculos(cursor, [dados['placa'] for _, dados in eventos])
+        linhas = []
+        for chave, dados in eventos:
+            if chave in existentes or dados['placa'] not in veiculos:
+                continue
+            existentes.add(chave)
+            linhas.append((veiculos[dados['placa']], dados['placa'], dados['tipo_alerta'], dados['mensagem'],
+                           dados['camera'], _momento(dados['data_alerta']), chave))
+        self._inserir_alertas(cursor, linhas)
+        cursor.close()
+        return len(linhas)
+
+    def vincular_clipes(self, conn, eventos: list) -> int:
+        """Associa os clipes aos alertas (o alerta vem antes no diário, então já foi gravado)"""
+        cursor = conn.cursor()
+        cursor.executemany("UPDATE alertas SET clipe = %s WHERE chave_evento = %s",
+                           [(dados['clipe'], dados['chave_alerta']) for _, dados in eventos])
+        alterados = cursor.rowcount
+        cursor.close()
+        return alterados
+
+    def aplicadores_diario(self) -> tuple:
+        """
+        Aplicadores para o SincronizadorDiario
+
+        Returns:
+            (tipo -> função(conn, chave, dados) -> bool, tipo -> função(conn, [(chave, dados)]))
+        """
+        lote = {
+            'acesso': self.registrar_acessos,
+            'acesso_com_alertas': self.registrar_acessos_com_alertas,
+            'alerta': self.registrar_alertas,
+            'clipe': self.vincular_clipes,
+        }
+        unitarios = {tipo: (lambda conn, chave, dados, aplicar=aplicar: aplicar(conn, [(chave, dados)]) > 0)
+                     for tipo, aplicar in lote.items()}
+        return unitarios, lote
+
+
+class ArmazenamentoPostgres(Armazenamento):
+    """
+    PostgreSQL (psycopg2): esquema pelas migrações versionadas (migracoes.py) e comandos preparados
+
+    Args:
+        contexto_migracoes: opções dos passos de migração ('particionar_acessos', 'meses_futuros')
+    """
+
+    dialeto = 'postgres'
+    nome = 'PostgreSQL'
+
+    # nome -> (tipos dos parâmetros, comando com $1..$n)
+    COMANDOS = {
+        'buscar_veiculo': ('VARCHAR', CONSULTA_VEICULO.format(marcador='$1')),
+        'registrar_acessos': ('JSON', """
+            INSERT INTO acessos
+            (veiculo_id, placa, tipo_placa, tipo_evento, confianca, imagem_path, camera, data_acesso, chave_evento)
+            SELECT v.id, e.placa, e.tipo_placa, 'DETECTADO', e.confianca, e.imagem_path, e.camera,
+                   e.data_acesso, e.chave
+            FROM json_to_recordset($1) AS e(placa VARCHAR, tipo_placa VARCHAR, confianca DECIMAL,
+                                            imagem_path VARCHAR, camera VARCHAR, data_acesso TIMESTAMP,
+                                            chave VARCHAR)
+            LEFT JOIN veiculos v ON v.placa = e.placa
+            ON CONFLICT (chave_evento, data_acesso) DO NOTHING
+            RETURNING data_acesso, camera, placa, veiculo_id IS NOT NULL
+        """),
+        'registrar_alertas': ('JSON', """
+            INSERT INTO alertas (veiculo_id, placa, tipo_alerta, mensagem, camera, data_alerta, chave_evento)
+            SELECT v.id, v.placa, e.tipo_alerta, e.mensagem, e.camera, e.data_alerta, e.chave
+            FROM json_to_recordset($1) AS e(placa VARCHAR, tipo_alerta VARCHAR, mensagem TEXT, camera VARCHAR,
+                                            data_alerta TIMESTAMP, chave VARCHAR)
+            JOIN veiculos v ON v.placa = e.placa
+            ON CONFLICT (chave_evento) DO NOTHING
+            RETURNING data_alerta, camera, tipo_alerta
+        """),
+        'vincular_clipes': ('JSON', """
+            UPDATE alertas a SET clipe = e.clipe
+            FROM json_to_recordset($1) AS e(chave_alerta VARCHAR, clipe VARCHAR)
+            WHERE a.chave_evento = e.chave_alerta
+        """),
+        # Acessos, alertas e estatísticas num único comando (uma ida ao servidor por detecção ou lote).
+        # Estatísticas com as mesmas regras de estatisticas.registrar_deteccoes e registrar_alerta
+        'registrar_acessos_com_alertas': ('JSON', """
+            WITH e AS (
+                SELECT e.*, v.id AS id_veiculo
+                FROM json_to_recordset($1) AS e(chave VARCHAR, placa VARCHAR, tipo_placa VARCHAR,
+                                                confianca DECIMAL, imagem_path VARCHAR, camera VARCHAR,
+                                                data_acesso TIMESTAMP, veiculo_id INTEGER, alertas JSON)
+                -- Sem veiculo_id (banco fora do ar na detecção): o veículo é resolvido pela placa
+                LEFT JOIN veiculos v ON v.id = COALESCE(e.veiculo_id, (SELECT id FROM veiculos WHERE placa = e.placa))
+            ), novos AS (
+                INSERT INTO acessos
+                (veiculo_id, placa, tipo_placa, tipo_evento, confianca, imagem_path, camera, data_acesso, chave_evento)
+                SELECT id_veiculo, placa, tipo_placa, 'DETECTADO', confianca, imagem_path, camera, data_acesso, chave
+                FROM e
+                ON CONFLICT (chave_evento, data_acesso) DO NOTHING
+                RETURNING chave_evento, veiculo_id, placa, camera, data_acesso
+            ), novos_alertas AS (
+                INSERT INTO alertas (veiculo_id, placa, tipo_alerta, mensagem, camera, data_alerta, chave_evento)
+                SELECT n.veiculo_id, n.placa, a.tipo_alerta, a.mensagem, n.camera, n.data_acesso, a.chave
+                FROM novos n
+                JOIN e ON e.chave = n.chave_evento
+                CROSS JOIN json_to_recordset(e.alertas) AS a(chave VARCHAR, tipo_alerta VARCHAR, mensagem TEXT)
+                WHERE n.veiculo_id IS NOT NULL
+                ON CONFLICT (chave_evento) DO NOTHING
+                RETURNING camera, tipo_alerta, data_alerta
+            ), por_hora AS (
+                INSERT INTO estatisticas_hora (hora, camera, total, conhecidas, desconhecidas)
+                SELECT date_trunc('hour', data_acesso), camera, COUNT(*), COUNT(veiculo_id), COUNT(*) - COUNT(veiculo_id)
+                FROM novos GROUP BY 1, 2
+                ON CONFLICT (hora, camera) DO UPDATE SET
+                    total = estatisticas_hora.total + EXCLUDED.total,
+                    conhecidas = estatisticas_hora.conhecidas + EXCLUDED.conhecidas,
+                    desconhecidas = estatisticas_hora.desconhecidas + EXCLUDED.desconhecidas
+            ), por_placa AS (
+                INSERT INTO estatisticas_placas_dia (dia, camera, placa, deteccoes, primeira, ultima)
+                SELECT CAST(data_acesso AS DATE), camera, placa, COUNT(*), MIN(data_acesso), MAX(data_acesso)
+                FROM novos GROUP BY 1, 2, 3
+                ON CONFLICT (dia, camera, placa) DO UPDATE SET
+                    deteccoes = estatisticas_placas_dia.deteccoes + EXCLUDED.deteccoes,
+                    ultima = GREATEST(estatisticas_placas_dia.ultima, EXCLUDED.ultima)
+                RETURNING dia, camera, placa, (xmax = 0) AS nova
+            ), por_placa_geral AS (
+                -- Placa nova no dia (em qualquer câmera) para o contador de todas as câmeras
+                INSERT INTO estatisticas_placas_geral_dia (dia, placa, cameras)
+                SELECT dia, placa, COUNT(*) FROM por_placa WHERE nova GROUP BY 1, 2
+                ON CONFLICT (dia, placa) DO UPDATE SET
+                    cameras = estatisticas_placas_geral_dia.cameras + EXCLUDED.cameras
+                RETURNING dia, (xmax = 0) AS nova
+            ), por_geral AS (
+                INSERT INTO estatisticas_geral_dia (dia, placas_unicas)
+                SELECT dia, COUNT(*) FROM por_placa_geral WHERE nova GROUP BY 1
+                ON CONFLICT (dia) DO UPDATE SET
+                    placas_unicas = estatisticas_geral_dia.placas_unicas + EXCLUDED.placas_unicas
+            ), por_dia AS (
+                INSERT INTO estatisticas_dia (dia, camera, total, placas_unicas, conhecidas, desconhecidas)
+                SELECT d.dia, d.camera, d.total, COALESCE(p.novas, 0), d.conhecidas, d.total - d.conhecidas
+                FROM (SELECT CAST(data_acesso AS DATE) AS dia, camera, COUNT(*) AS total, COUNT(veiculo_id) AS conhecidas
+                      FROM novos GROUP BY 1, 2) d
+                LEFT JOIN (SELECT dia, camera, COUNT(*) FILTER (WHERE nova) AS novas
+                           FROM por_placa GROUP BY 1, 2) p USING (dia, camera)
+                ON CONFLICT (dia, camera) DO UPDATE SET
+                    total = estatisticas_dia.total + EXCLUDED.total,
+                    placas_unicas = estatisticas_dia.placas_unicas + EXCLUDED.placas_unicas,
+                    conhecidas = estatisticas_dia.conhecidas + EXCLUDED.conhecidas,
+                    desconhecidas = estatisticas_dia.desconhecidas + EXCLUDED.desconhecidas
+            ), por_alerta AS (
+                INSERT INTO estatisticas_alertas_dia (dia, camera, tipo_alerta, total)
+                SELECT CAST(data_alerta AS DATE), camera, tipo_alerta, COUNT(*)
+                FROM novos_alertas GROUP BY 1, 2, 3
+                ON CONFLICT (dia, camera, tipo_alerta) DO UPDATE SET
+                    total = estatisticas_alertas_dia.total + EXCLUDED.total
+            )
+            SELECT (SELECT COUNT(*) FROM novos), (SELECT COUNT(*) FROM novos_alertas)
+        """),
+    }
+
+    def __init__(self, config: dict, contexto_migracoes: dict = None):
+        super().__init__(config)
+        self.contexto_migracoes = contexto_migracoes or {'particionar_acessos': False, 'meses_futuros': 2}
+        # Comandos já preparados em cada conexão (a entrada some quando a conexão é descartada)
+        self._preparados = weakref.WeakKeyDictionary()
+
+    def conectar(self):
+        import psycopg2
+        return psycopg2.connect(**self.config)
+
+    def conexao_aberta(self, conn) -> bool:
+        return not conn.closed
+
+    def criar_esquema(self, conn) -> list:
+        """Aplica as migrações pendentes; retorna as versões aplicadas"""
+        import migracoes
+        aplicadas = migracoes.aplicar_migracoes(conn, self.contexto_migracoes)
+        # Particionamento ligado depois que o banco já estava na versão atual
+        if self.contexto_migracoes['particionar_acessos']:
+            migracoes.garantir_acessos_particionada(conn, self.contexto_migracoes['meses_futuros'])
+        return aplicadas
+
+    def _executar(self, cursor, nome: str, *parametros):
+        """EXECUTE do comando preparado, com o PREPARE na primeira vez em cada conexão"""
+        # cursor.connection: a conexão do driver, mesmo com um cursor envolvido (auditoria_consultas)
+        preparados = self._preparados.setdefault(cursor.connection, set())
+        if nome not in preparados:
+            tipos, comando = self.COMANDOS[nome]
+            cursor.execute(f"PREPARE {nome} ({tipos}) AS {comando}")
+            preparados.add(nome)
+        cursor.execute(f"EXECUTE {nome} ({', '.join(['%s'] * len(parametros))})", parametros)
+
+    def buscar_veiculo(self, conn, placa: str):
+        with conn.cursor() as cursor:
+            self._executar(cursor, 'buscar_veiculo', placa)
+            return _veiculo(cursor.fetchone())
+
+    def registrar_acessos(self, conn, eventos: list) -> int:
+        with conn.cursor() as cursor:
+            self._executar(cursor, 'registrar_acessos',
+                           json.dumps([{**dados, 'chave': chave} for chave, dados in eventos]))
+            novos = cursor.fetchall()
+            estatisticas.registrar_deteccoes(cursor, novos, self.dialeto)
+        return len(novos)
+
+    def registrar_alertas(self, conn, eventos: list) -> int:
+        with conn.cursor() as cursor:
+            self._executar(cursor, 'registrar_alertas',
+                           json.dumps([{**dados, 'chave': chave} for chave, dados in eventos]))
+            novos = cursor.fetchall()
+            for momento, camera, tipo_alerta in novos:
+                estatisticas.registrar_alerta(cursor, momento, camera, tipo_alerta, self.dialeto)
+        return len(novos)
+
+    def vincular_clipes(self, conn, eventos: list) -> int:
+        with conn.cursor() as cursor:
+            self._executar(cursor, 'vincular_clipes', json.dumps([dados for _, dados in eventos]))
+            return cursor.rowcount
+
+    def registrar_acessos_com_alertas(self, conn, eventos: list) -> int:
+        with conn.cursor() as cursor:
+            self._executar(cursor, 'registrar_acessos_com_alertas',
+                           json.dumps([{**dados, 'chave': chave} for chave, dados in eventos]))
+            return cursor.fetchone()[0]
+
+
+# Esquema do MySQL e do SQLite: as mesmas tabelas e índices das migrações do PostgreSQL
+# ({auto}: chave primária autoincremental; {momento}: tipo de data e hora; {booleano}: tipo lógico).
+# As chaves estrangeiras ficam em CHAVES_ESTRANGEIRAS: o MySQL ignora REFERENCES na definição da coluna
+TABELAS_ESQUEMA = {
+    'usuarios': """
+        id {auto},
+        nome VARCHAR(100) NOT NULL,
+        cpf VARCHAR(14) UNIQUE,
+        telefone VARCHAR(20),
+        tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('PARTICULAR', 'OFICIAL')),
+        autorizado {booleano} DEFAULT TRUE,
+        observacoes TEXT,
+        data_cadastro {momento} DEFAULT CURRENT_TIMESTAMP
+    """,
+    'veiculos': """
+        id {auto},
+        placa VARCHAR(10) UNIQUE NOT NULL,
+        tipo_placa VARCHAR(20) NOT NULL,
+        usuario_id INTEGER,
+        modelo VARCHAR(100),
+        cor VARCHAR(50),
+        tipo_veiculo VARCHAR(20) CHECK (tipo_veiculo IN ('CARRO', 'MOTO', 'CAMINHAO', 'OUTRO')),
+        marcado {booleano} DEFAULT FALSE,
+        motivo_marcacao TEXT,
+        data_cadastro {momento} DEFAULT CURRENT_TIMESTAMP
+    """,
+    'acessos': """
+        id {auto},
+        veiculo_id INTEGER,
+        placa VARCHAR(10) NOT NULL,
+        tipo_placa VARCHAR(20),
+        tipo_evento VARCHAR(20) CHECK (tipo_evento IN ('ENTRADA', 'SAIDA', 'DETECTADO')),
+        confianca DECIMAL(5, 4),
+        imagem_path VARCHAR(255),
+        camera VARCHAR(50),
+        chave_evento VARCHAR(32) UNIQUE,
+        data_acesso {momento} NOT NULL DEFAULT CURRENT_TIMESTAMP
+    """,
+    'alertas': """
+        id {auto},
+        veiculo_id INTEGER,
+        placa VARCHAR(10) NOT NULL,
+        tipo_alerta VARCHAR(50) NOT NULL,
+        mensagem TEXT NOT NULL,
+        resolvido {booleano} DEFAULT FALSE,
+        data_alerta {momento} DEFAULT CURRENT_TIMESTAMP,
+        clipe VARCHAR(255),
+        camera VARCHAR(50),
+        chave_evento VARCHAR(32) UNIQUE
+    """,
+}
+
+# tabela -> [(coluna, tabela referenciada, ação no DELETE)]
+CHAVES_ESTRANGEIRAS = {
+    'veiculos': [('usuario_id', 'usuarios', 'SET NULL')],
+    'acessos': [('veiculo_id', 'veiculos', 'CASCADE')],
+    'alertas': [('veiculo_id', 'veiculos', 'CASCADE')],
+}
+
+
+def _chaves_estrangeiras(tabela: str) -> list:
+    """Cláusulas FOREIGN KEY da tabela (nomeadas fk_<tabela>_<coluna>)"""
+    return [f"CONSTRAINT fk_{tabela}_{coluna} FOREIGN KEY ({coluna}) REFERENCES {referenciada}(id) ON DELETE {acao}"
+            for coluna, referenciada, acao in CHAVES_ESTRANGEIRAS.get(tabela, ())]
+
+
+INDICES_ESQUEMA = {
+    'idx_acessos_data': 'acessos(data_acesso)',
+    'idx_acessos_placa_data': 'acessos(placa, data_acesso)',
+    'idx_veiculos_usuario': 'veiculos(usuario_id)',
+    'idx_veiculos_data_cadastro': 'veiculos(data_cadastro)',
+    'idx_usuarios_nome': 'usuarios(nome)',
+    'idx_alertas_data': 'alertas(data_alerta)',
+}
+
+
+class ArmazenamentoMySQL(Armazenamento):
+    """MySQL 8 (mysql.connector): cursores preparados por conexão e executemany nos lotes"""
+
+    dialeto = 'mysql'
+    nome = 'MySQL'
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self._cursores = weakref.WeakKeyDictionary()
+
+    def conectar(self):
+        import mysql.connector
+        return mysql.connector.connect(**self.config)
+
+    def conexao_aberta(self, conn) -> bool:
+        return conn.is_connected()
+
+    def _cursor(self, conn, nome: str = None):
+        # Cursor preparado: o comando é enviado ao servidor uma vez e reexecutado só com os parâmetros
+        if nome is None:
+            return conn.cursor()
+        cursores = self._cursores.setdefault(conn, {})
+        if nome not in cursores:
+            cursores[nome] = conn.cursor(prepared=True)
+        return cursores[nome]
+
+    def criar_esquema(self, conn):
+        cursor = conn.cursor()
+        for tabela, colunas in TABELAS_ESQUEMA.items():
+            definicoes = [colunas.format(auto='INT AUTO_INCREMENT PRIMARY KEY', momento='DATETIME', booleano='BOOLEAN')]
+            # MySQL não tem CREATE INDEX IF NOT EXISTS: os índices vão na criação da tabela
+            definicoes += [f"INDEX {nome} {definicao[len(tabela):]}" for nome, definicao in INDICES_ESQUEMA.items()
+                           if definicao.startswith(tabela + '(')]
+            definicoes += _chaves_estrangeiras(tabela)
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {tabela} ({', '.join(definicoes)}) "
+                           "ENGINE=InnoDB DEFAULT CHARSET=utf8mb4")
+        self._garantir_chaves_estrangeiras(cursor)
+        estatisticas.criar_tabelas(cursor, self.dialeto)
+        self._migrar_deteccoes_legado(cursor)
+        cursor.close()
+        conn.commit()
+
+    def _garantir_chaves_estrangeiras(self, cursor):
+        """Acrescenta as chaves estrangeiras às tabelas criadas sem elas (REFERENCES na coluna era ignorado)"""
+        cursor.execute("""
+            SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+        """)
+        existentes = set(cursor.fetchall())
+        for tabela, chaves in CHAVES_ESTRANGEIRAS.items():
+            for clausula, (coluna, _, _) in zip(_chaves_estrangeiras(tabela), chaves):
+                if (tabela, coluna) in existentes:
+                    continue
+                try:
+                    cursor.execute(f"ALTER TABLE {tabela} ADD {clausula}")
+                except Exception as e:
+                    # Linhas que apontam para registros removidos impedem a chave; o resto do esquema segue
+                    print(f"⚠️  Chave estrangeira {tabela}.{coluna} não criada: {e}")
+
+    def _migrar_deteccoes_legado(self, cursor):
+        """Copia a antiga tabela deteccoes_placas do detector para acessos (uma vez)"""
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'deteccoes_placas'
+        """)
+        if cursor.fetchone()[0] == 0:
+            return
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'deteccoes_placas' AND COLUMN_NAME = 'chave_evento'
+        """)
+        chave = 'd.chave_evento' if cursor.fetchone()[0] else 'NULL'
+        cursor.execute(f"""
+            INSERT INTO acessos
+            (veiculo_id, placa, tipo_placa, tipo_evento, confianca, camera, data_acesso, chave_evento)
+            SELECT v.id, d.placa, d.tipo_placa, 'DETECTADO', d.confianca, d.origem,
+                   COALESCE(d.data_deteccao, CURRENT_TIMESTAMP), {chave}
+            FROM deteccoes_placas d
+            LEFT JOIN veiculos v ON v.placa = d.placa
+        """)
+        print(f"✓ {cursor.rowcount} detecções de deteccoes_placas copiadas para acessos")
+        cursor.execute("RENAME TABLE deteccoes_placas TO deteccoes_placas_migrada")
+
+
+# --- SQLite ---
+_MARCADORES = re.compile(r'%([%s])')
+
+
+def _para_sqlite(comando: str) -> str:
+    """Marcadores do formato dos outros drivers (%s, %%) para o do sqlite3 (?, %)"""
+    return _MARCADORES.sub(lambda m: '?' if m.group(1) == 's' else '%', comando)
+
+
+# Datas gravadas como texto ISO e lidas de volta pelo tipo declarado da coluna (registro global do sqlite3)
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(' '))
+sqlite3.register_adapter(date, lambda valor: valor.isoformat())
+sqlite3.register_converter('TIMESTAMP', lambda valor: datetime.fromisoformat(valor.decode()))
+sqlite3.register_converter('DATE', lambda valor: date.fromisoformat(valor.decode()))
+
+
+class _CursorSQLite:
+    """Cursor do sqlite3 que aceita os comandos escritos para psycopg2/mysql.connector"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, comando, parametros=()):
+        self._cursor.execute(_para_sqlite(comando), parametros or ())
+        return self
+
+    def executemany(self, comando, sequencia):
+        self._cursor.executemany(_para_sqlite(comando), sequencia)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+
+class _ConexaoSQLite:
+    """Conexão do sqlite3 com cursores compatíveis e o atributo closed (como no psycopg2)"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.closed = False
+
+    def cursor(self):
+        return _CursorSQLite(self._conn.cursor())
+
+    def close(self):
+        self._conn.close()
+        self.closed = True
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+
+class ArmazenamentoSQLite(Armazenamento):
+    """
+    SQLite embarcado (arquivo local, sem servidor): para equipamentos de borda e testes
+
+    Args:
+        config: {'database': caminho do arquivo} (':memory:' para um banco temporário)
+    """
+
+    dialeto = 'sqlite'
+    nome = 'SQLite'
+
+    def conectar(self):
+        conn = sqlite3.connect(self.config['database'], detect_types=sqlite3.PARSE_DECLTYPES)
+        # WAL: a leitura da interface não espera a gravação do sincronizador
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return _ConexaoSQLite(conn)
+
+    def conexao_aberta(self, conn) -> bool:
+        return not conn.closed
+
+    def criar_esquema(self, conn):
+        cursor = conn.cursor()
+        for tabela, colunas in TABELAS_ESQUEMA.items():
+            definicoes = [colunas.format(auto='INTEGER PRIMARY KEY AUTOINCREMENT', momento='TIMESTAMP',
+                                         booleano='BOOLEAN')] + _chaves_estrangeiras(tabela)
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {tabela} ({', '.join(definicoes)})")
+        for nome, definicao in INDICES_ESQUEMA.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON {definicao}")
+        estatisticas.criar_tabelas(cursor, self.dialeto)
+        cursor.close()
+        conn.commit()
+
+
+BACKENDS = {
+    'postgres': ArmazenamentoPostgres,
+    'mysql': ArmazenamentoMySQL,
+    'sqlite': ArmazenamentoSQLite,
+}
+
+
+def criar_armazenamento(backend: str, config: dict, **opcoes) -> Armazenamento:
+    """
+    Instancia o backend pelo nome ('postgres', 'mysql' ou 'sqlite')
+
+    Raises:
+        ValueError: backend desconhecido
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de armazenamento desconhecido: {backend} (use {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[backend](config, **opcoes)
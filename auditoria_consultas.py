@@ -0,0 +1,213 @@
+"""
+Auditoria das consultas do GerenciadorBanco (web_app_placas)
+Executa cada método com argumentos de exemplo numa transação que é desfeita no fim, grava os comandos
+enviados ao banco e roda EXPLAIN em cada um. Aponta leituras sequenciais (Seq Scan) em tabelas com mais
+de LIMITE_LINHAS linhas estimadas, que normalmente indicam um índice faltando.
+
+Uso:
+    python auditoria_consultas.py
+    python auditoria_consultas.py --limite-linhas 1000 --detalhes
+Termina com código 1 quando há apontamentos (para uso em CI).
+"""
+
+import argparse
+import io
+import json
+import re
+import sys
+
+LIMITE_LINHAS = 10000  # Tabelas menores que isso podem ser lidas inteiras sem problema
+PREFIXOS_EXPLICAVEIS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'EXECUTE')  # EXECUTE: comando preparado
+
+
+class _CursorGravador:
+    """Cursor que registra cada comando executado antes de repassá-lo"""
+
+    def __init__(self, cursor, registro: list, metodo: list):
+        self._cursor = cursor
+        self._registro = registro
+        self._metodo = metodo
+
+    def execute(self, consulta, parametros=None):
+        texto = consulta.as_string(self._cursor) if hasattr(consulta, 'as_string') else consulta
+        self._registro.append((self._metodo[0], texto, parametros))
+        return self._cursor.execute(consulta, parametros)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+
+class _ConexaoAuditoria:
+    """Conexão cujo commit não grava: tudo o que os métodos fizerem é desfeito no fim da auditoria"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.registro = []  # (método, comando, parâmetros)
+        self.metodo = [None]
+
+    def cursor(self, *args, **kwargs):
+        return _CursorGravador(self._conn.cursor(*args, **kwargs), self.registro, self.metodo)
+
+    def commit(self):
+        pass
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+
+def chamadas_exemplo(cursor) -> dict:
+    """Argumentos de exemplo de cada método, usando uma placa real do banco quando houver"""
+    cursor.execute("SELECT id, placa FROM veiculos ORDER BY id LIMIT 1")
+    linha = cursor.fetchone()
+    veiculo = {'veiculo_id': linha[0]} if linha else None
+    placa = linha[1] if linha else 'ABC1234'
+    return {
+        'placa_existe': (placa,),
+        'buscar_veiculo': (placa,),
+        'registrar_acesso': (placa, 0.95),
+        'registrar_deteccao': (placa, 'ANTIGA_CARRO', 0.95, None, veiculo, [('AUDITORIA', 'auditoria')]),
+        'cadastrar_usuario': ('Auditoria', None, None, 'PARTICULAR'),
+        'cadastrar_veiculo': ('AUD1T00', 'MERCOSUL_CARRO', None),
+        'marcar_veiculo': (placa, 'auditoria'),
+        'gerar_alerta': (placa, 'AUDITORIA', 'auditoria'),
+        'vincular_clipe': ('0' * 32, 'auditoria.mp4'),
+        'listar_veiculos': (),
+        'listar_usuarios': (),
+        'listar_alertas': (),
+        'resumo_estatisticas': (None, None, True),
+        'listar_acessos_recentes': (),
+        'carregar_lista_observacao': (),
+        # Por último: a tabela temporária da importação só existe até o fim da transação
+        'importar_cadastros': (io.StringIO("nome,cpf,placa\nAuditoria,529.982.247-25,AUD1A23\n"),),
+    }
+
+
+def _nos(plano: dict):
+    yield plano
+    for filho in plano.get('Plans', []):
+        yield from _nos(filho)
+
+
+def _linhas_estimadas(cursor, tabela: str) -> float:
+    cursor.execute("SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)", (tabela,))
+    linha = cursor.fetchone()
+    return max(linha[0], 0) if linha else 0
+
+
+def explicar(cursor, consulta: str, parametros, limite_linhas: int) -> dict:
+    """EXPLAIN do comando; retorna o custo estimado e as leituras sequenciais em tabelas grandes"""
+    cursor.execute("SAVEPOINT auditoria")
+    try:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + consulta, parametros)
+        plano = cursor.fetchone()[0]
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        plano = plano[0]['Plan']
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT auditoria")
+        return {'erro': str(e).strip().splitlines()[0], 'custo': None, 'sequenciais': [], 'plano': None}
+
+    sequenciais = []
+    for no in _nos(plano):
+        if no.get('Node Type') == 'Seq Scan':
+            tabela = no.get('Relation Name')
+            linhas = _linhas_estimadas(cursor, tabela)
+            if linhas >= limite_linhas:
+                sequenciais.append((tabela, int(linhas)))
+    cursor.execute("RELEASE SAVEPOINT auditoria")
+    return {'erro': None, 'custo': plano.get('Total Cost'), 'sequenciais': sequenciais, 'plano': plano}
+
+
+def auditar(gerenciador, limite_linhas: int = LIMITE_LINHAS) -> list:
+    """
+    Roda os métodos do gerenciador e explica os comandos executados (tudo desfeito no fim)
+
+    Returns:
+        Lista de dicts {metodo, consulta, custo, sequenciais, erro, plano}
+    """
+    original = gerenciador.conn
+    conexao = _ConexaoAuditoria(original)
+    gerenciador.conn = conexao
+    try:
+        with original.cursor() as cursor:
+            chamadas = chamadas_exemplo(cursor)
+        for metodo, argumentos in chamadas.items():
+            conexao.metodo[0] = metodo
+            getattr(gerenciador, metodo)(*argumentos)
+
+        resultados = []
+        vistos = set()
+        with original.cursor() as cursor:
+            for metodo, consulta, parametros in conexao.registro:
+                normalizada = re.sub(r'\s+', ' ', consulta).strip()
+                if not normalizada.upper().startswith(PREFIXOS_EXPLICAVEIS) or (metodo, normalizada) in vistos:
+                    continue
+                vistos.add((metodo, normalizada))
+                resultado = explicar(cursor, consulta, parametros, limite_linhas)
+                resultado.update(metodo=metodo, consulta=normalizada)
+                resultados.append(resultado)
+        return resultados
+    finally:
+        original.rollback()
+        gerenciador.conn = original
+
+
+def metodos_sem_auditoria(classe, auditados) -> list:
+    """Métodos públicos do gerenciador que não estão em chamadas_exemplo"""
+    ignorados = {'conectar', 'criar_tabelas', 'disponivel', 'fechar'}
+    return sorted(nome for nome in vars(classe)
+                  if not nome.startswith('_') and callable(getattr(classe, nome))
+                  and nome not in ignorados and nome not in auditados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN das consultas do GerenciadorBanco")
+    parser.add_argument('--limite-linhas', type=int, default=LIMITE_LINHAS,
+                        help="Aponta Seq Scan em tabelas com ao menos este número de linhas estimadas")
+    parser.add_argument('--detalhes', action='store_true', help="Mostra o plano completo de cada comando")
+    args = parser.parse_args()
+
+    import web_app_placas as origem
+    gerenciador = origem.GerenciadorBanco()
+    if not gerenciador.conn:
+        sys.exit(1)
+    try:
+        resultados = auditar(gerenciador, args.limite_linhas)
+        with gerenciador.conn.cursor() as cursor:
+            faltando = metodos_sem_auditoria(origem.GerenciadorBanco, chamadas_exemplo(cursor))
+    finally:
+        gerenciador.fechar()
+
+    apontamentos = 0
+    for resultado in resultados:
+        if resultado['erro']:
+            situacao = f"⚠️  EXPLAIN falhou: {resultado['erro']}"
+        elif resultado['sequenciais']:
+            apontamentos += 1
+            situacao = "❌ Seq Scan em " + ", ".join(f"{tabela} (~{linhas} linhas)"
+                                                     for tabela, linhas in resultado['sequenciais'])
+        else:
+            situacao = "✓"
+        custo = f"{resultado['custo']:.1f}" if resultado['custo'] is not None else "-"
+        print(f"{resultado['metodo']:<26} custo {custo:>10}  {situacao}")
+        print(f"    {resultado['consulta'][:150]}")
+        if args.detalhes and resultado['plano']:
+            print(json.dumps(resultado['plano'], indent=2, ensure_ascii=False))
+
+    for metodo in faltando:
+        print(f"⚠️  {metodo}: sem argumentos de exemplo em chamadas_exemplo (não auditado)")
+    print(f"\n{len(resultados)} comandos analisados, {apontamentos} com leitura sequencial em tabela grande")
+    sys.exit(1 if apontamentos else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Barramento de frames em memória compartilhada
+Anel de slots pré-alocados (um bloco de multiprocessing.shared_memory): a captura escreve cada
+frame uma única vez direto no slot e OCR, desenho e codificação leem o mesmo buffer por views.
+Cada slot tem contagem de referências; o slot só volta a ser escrito quando todos o liberam.
+
+Workers em outros processos usam anexar(**barramento.descritor()) e recebem apenas o índice do
+slot; o processo dono adquire a referência antes de despachar e libera quando o resultado volta.
+"""
+
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from metricas import BARRAMENTO_SLOTS_LIVRES
+
+
+class BarramentoFrames:
+    """Anel de `slots` frames com o formato (altura, largura, canais) em memória compartilhada"""
+
+    def __init__(self, slots: int, forma: tuple, nome: str = None, _memoria=None):
+        self.slots = slots
+        self.forma = tuple(forma)
+        self.dono = _memoria is None
+        tamanho = slots * int(np.prod(self.forma))
+        self.memoria = _memoria or shared_memory.SharedMemory(create=True, size=tamanho, name=nome)
+        self.quadros = np.ndarray((slots,) + self.forma, dtype=np.uint8, buffer=self.memoria.buf)
+
+        self.referencias = [0] * slots
+        self.lock = threading.Lock()
+        self.aposentado = False  # Substituído (ex.: mudança de resolução); fecha ao liberar o último slot
+        self.fechado = False
+        self.proximo = 0
+        if self.dono:
+            BARRAMENTO_SLOTS_LIVRES.set_funcao(self.livres)
+
+    @classmethod
+    def anexar(cls, nome: str, slots: int, forma: tuple):
+        """Abre, em outro processo, um barramento criado pelo processo dono"""
+        return cls(slots, forma, _memoria=shared_memory.SharedMemory(name=nome))
+
+    def descritor(self) -> dict:
+        """Argumentos de anexar() para enviar a um processo worker"""
+        return {'nome': self.memoria.name, 'slots': self.slots, 'forma': self.forma}
+
+    # --- Referências ---
+    def reservar(self):
+        """
+        Reserva um slot livre para escrita (com uma referência, do escritor)
+
+        Returns:
+            Índice do slot, ou None se todos estiverem em uso
+        """
+        with self.lock:
+            for deslocamento in range(self.slots):
+                indice = (self.proximo + deslocamento) % self.slots
+                if self.referencias[indice] == 0:
+                    self.referencias[indice] = 1
+                    self.proximo = (indice + 1) % self.slots
+                    return indice
+        return None
+
+    def adquirir(self, indice: int):
+        with self.lock:
+            if self.referencias[indice] <= 0:
+                raise RuntimeError(f"Slot {indice} não está em uso")
+            self.referencias[indice] += 1
+
+    def liberar(self, indice: int):
+        with self.lock:
+            if self.referencias[indice] <= 0:
+                raise RuntimeError(f"Slot {indice} liberado mais vezes que adquirido")
+            self.referencias[indice] -= 1
+            fechar = self.aposentado and not any(self.referencias)
+        if fechar:
+            self.fechar()
+
+    def livres(self) -> int:
+        with self.lock:
+            return self.referencias.count(0)
+
+    # --- Acesso ---
+    def slot(self, indice: int):
+        """View gravável do slot (apenas para quem o reservou)"""
+        return self.quadros[indice]
+
+    def visao(self, indice: int):
+        """View somente leitura do slot para os consumidores"""
+        visao = self.quadros[indice].view()
+        visao.flags.writeable = False
+        return visao
+
+    # --- Ciclo de vida ---
+    def aposentar(self):
+        """Marca o barramento para fechar assim que nenhum slot estiver referenciado"""
+        with self.lock:
+            self.aposentado = True
+            fechar = not any(self.referencias)
+        if fechar:
+            self.fechar()
+
+    def fechar(self):
+        if self.fechado:
+            return
+        self.fechado = True
+        # Views ainda vivas impedem o close(); o unlink libera o nome e a memória quando a última sair
+        self.quadros = None
+        try:
+            self.memoria.close()
+        except BufferError:
+            pass
+        if self.dono:
+            try:
+                self.memoria.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,133 @@
+"""
+Benchmark: reconhecedor geral do PaddleOCR x reconhecedor de placas (gramática)
+Compara tempo por recorte, taxa de leituras válidas e acerto (quando há rótulo).
+
+Fontes de recortes:
+- Pastas de imagens salvas pelo sistema (o nome do arquivo traz a placa: ABC1D23_20240101_120000.jpg)
+- Vídeo de amostra: detecção + retificação de cada caixa (sem rótulo)
+
+Uso:
+    python benchmark_reconhecedor.py --pastas placas_conhecidas,placas_desconhecidas --frames 100
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+
+from configuracao import (ARQUIVO_VIDEO, CONFIANCA_MINIMA, PASTA_PLACAS_CONHECIDAS, PASTA_PLACAS_DESCONHECIDAS,
+                          validar_placa)
+from motor_ocr import carregar_config_ocr, criar_ocr, ordenar_caixas, retificar_quadrilatero
+from reconhecedor_placas import ReconhecedorPlacas
+
+
+def recortes_das_pastas(pastas: list) -> list:
+    """(recorte, placa_rotulada) das imagens salvas; o rótulo vem do nome do arquivo"""
+    recortes = []
+    for pasta in pastas:
+        for caminho in sorted(glob.glob(os.path.join(pasta, "*.jpg"))):
+            imagem = cv2.imread(caminho)
+            if imagem is None:
+                continue
+            rotulo, _ = validar_placa(os.path.basename(caminho).split('_')[0])
+            recortes.append((imagem, rotulo))
+    return recortes
+
+
+def recortes_do_video(ocr, caminho: str, quantidade: int, passo: int) -> list:
+    """(recorte, None) de cada caixa de texto detectada nos frames do vídeo"""
+    cap = cv2.VideoCapture(caminho)
+    recortes = []
+    indice = 0
+    lidos = 0
+    while lidos < quantidade:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        indice += 1
+        if indice % passo:
+            continue
+        lidos += 1
+        caixas, _ = ocr.text_detector(frame)
+        if caixas is None:
+            continue
+        for caixa in ordenar_caixas(list(caixas)):
+            recortes.append((retificar_quadrilatero(frame, caixa), None))
+    cap.release()
+    return recortes
+
+
+def medir(reconhecedor, recortes: list, repeticoes: int) -> dict:
+    """Tempo por recorte, leituras válidas e acertos"""
+    imagens = [r for r, _ in recortes]
+    reconhecedor(imagens[:8])  # Aquecimento
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultados, _ = reconhecedor(imagens)
+    duracao = (time.perf_counter() - inicio) / repeticoes
+
+    validas = 0
+    rotulados = 0
+    acertos = 0
+    for (_, rotulo), (texto, confianca) in zip(recortes, resultados):
+        placa, _ = validar_placa(texto)
+        if placa and confianca >= CONFIANCA_MINIMA:
+            validas += 1
+        if rotulo:
+            rotulados += 1
+            acertos += int(placa == rotulo)
+
+    return {
+        'ms_por_recorte': duracao / len(imagens) * 1000,
+        'validas': validas / len(imagens),
+        'acerto': acertos / rotulados if rotulados else None,
+        'resultados': resultados
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o reconhecedor geral com o reconhecedor de placas")
+    parser.add_argument('--pastas', default=f"{PASTA_PLACAS_CONHECIDAS},{PASTA_PLACAS_DESCONHECIDAS}")
+    parser.add_argument('--video', default=ARQUIVO_VIDEO)
+    parser.add_argument('--frames', type=int, default=100, help="Frames do vídeo usados (0 = não usar vídeo)")
+    parser.add_argument('--passo', type=int, default=5)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    # Sem cache: mede a rede em todo recorte
+    config = dict(carregar_config_ocr(), reconhecedor='geral', cache_tamanho=0)
+    ocr = criar_ocr(config)
+    geral = ocr.text_recognizer
+    placas = ReconhecedorPlacas(geral)
+
+    recortes = recortes_das_pastas([p for p in args.pastas.split(',') if p])
+    if args.frames:
+        recortes += recortes_do_video(ocr, args.video, args.frames, args.passo)
+    if not recortes:
+        raise SystemExit("❌ Nenhum recorte para avaliar")
+
+    rotulados = sum(1 for _, r in recortes if r)
+    print(f"📊 {len(recortes)} recortes ({rotulados} com rótulo)\n")
+
+    resultado_geral = medir(geral, recortes, args.repeticoes)
+    resultado_placas = medir(placas, recortes, args.repeticoes)
+
+    print(f"{'':<22}{'geral':>12}{'placas':>12}")
+    print(f"{'ms por recorte':<22}{resultado_geral['ms_por_recorte']:>12.2f}{resultado_placas['ms_por_recorte']:>12.2f}")
+    print(f"{'leituras válidas':<22}{resultado_geral['validas']:>12.1%}{resultado_placas['validas']:>12.1%}")
+    if rotulados:
+        print(f"{'acerto (rotulados)':<22}{resultado_geral['acerto']:>12.1%}{resultado_placas['acerto']:>12.1%}")
+
+    divergencias = [(g[0], p[0]) for g, p in zip(resultado_geral['resultados'], resultado_placas['resultados'])
+                    if g[0] != p[0] and validar_placa(p[0])[0]]
+    if divergencias:
+        print("\nExemplos de leituras corrigidas pela gramática:")
+        for g, p in divergencias[:10]:
+            print(f"  {g!r:>16} -> {p}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Cache de reconhecimento por recorte, indexado por hash perceptual
+Um carro parado na cancela gera centenas de recortes quase idênticos; o cache devolve
+o texto e a confiança já reconhecidos quando o hash do recorte está a até N bits de distância.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from metricas import CACHE_OCR, CACHE_OCR_ECONOMIA, CACHE_OCR_TAMANHO
+from motor_ocr import parece_placa
+
+# Recorte normalizado: largura maior que altura para separar os caracteres da placa
+LARGURA_HASH = 128
+ALTURA_HASH = 32
+# Bloco de baixa frequência usado no hash (linhas x colunas da DCT) = 256 bits
+BLOCO_HASH = (8, 32)
+
+# Só leituras confiantes entram no cache (evita repetir uma leitura ruim de um recorte borrado)
+CONFIANCA_MINIMA_CACHE = 0.9
+
+
+def hash_perceptual(recorte) -> int:
+    """pHash do recorte: tons de cinza, tamanho fixo, contraste normalizado e DCT"""
+    if recorte.ndim == 3:
+        recorte = cv2.cvtColor(recorte, cv2.COLOR_BGR2GRAY)
+    normalizado = cv2.resize(recorte, (LARGURA_HASH, ALTURA_HASH), interpolation=cv2.INTER_AREA)
+    normalizado = cv2.normalize(normalizado.astype(np.float32), None, 0, 1, cv2.NORM_MINMAX)
+
+    frequencias = cv2.dct(normalizado)[:BLOCO_HASH[0], :BLOCO_HASH[1]].flatten()
+    # Ignora o componente DC (brilho médio) ao calcular a mediana
+    bits = frequencias > np.median(frequencias[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class CacheOCRPerceptual:
+    """LRU limitado de resultados de reconhecimento com tolerância de distância de Hamming"""
+
+    def __init__(self, capacidade: int = 256, distancia_maxima: int = 8):
+        self.capacidade = capacidade
+        self.distancia_maxima = distancia_maxima
+        self.entradas = OrderedDict()
+        self.lock = threading.Lock()
+        self.acertos = 0
+        self.erros = 0
+
+    def buscar(self, chave: int):
+        """Retorna (texto, confianca) da entrada mais próxima dentro da tolerância, ou None"""
+        with self.lock:
+            resultado = self.entradas.get(chave)
+            encontrada = chave if resultado is not None else None
+
+            if encontrada is None and self.distancia_maxima > 0:
+                melhor = self.distancia_maxima + 1
+                for outra, valor in self.entradas.items():
+                    distancia = (outra ^ chave).bit_count()
+                    if distancia < melhor:
+                        melhor, encontrada, resultado = distancia, outra, valor
+
+            if encontrada is None:
+                self.erros += 1
+                return None
+
+            self.entradas.move_to_end(encontrada)
+            self.acertos += 1
+            return resultado
+
+    def guardar(self, chave: int, resultado: tuple):
+        with self.lock:
+            self.entradas[chave] = resultado
+            self.entradas.move_to_end(chave)
+            while len(self.entradas) > self.capacidade:
+                self.entradas.popitem(last=False)
+
+    def limpar(self):
+        with self.lock:
+            self.entradas.clear()
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.erros
+        return {
+            'tamanho': len(self.entradas),
+            'acertos': self.acertos,
+            'erros': self.erros,
+            'taxa_acerto': self.acertos / total if total else 0.0
+        }
+
+
+class ReconhecedorComCache:
+    """
+    Envolve um text_recognizer (mesma interface: recortes -> (resultados, tempo)).
+    Recortes com hash no cache pulam o reconhecimento.
+    """
+
+    def __init__(self, reconhecedor_base, cache: CacheOCRPerceptual):
+        self.base = reconhecedor_base
+        self.cache = cache
+        self.tempo_medio_recorte = 0.0  # Média móvel do reconhecimento por recorte (estimativa da economia)
+        CACHE_OCR_TAMANHO.set_funcao(lambda: len(self.cache))
+
+    def __getattr__(self, nome):
+        # Demais atributos (rec_batch_num, postprocess_op...) vêm do reconhecedor original
+        return getattr(self.base, nome)
+
+    def __call__(self, recortes: list):
+        inicio = time.perf_counter()
+        resultados = [None] * len(recortes)
+        chaves = [hash_perceptual(recorte) for recorte in recortes]
+
+        pendentes = []
+        for i, chave in enumerate(chaves):
+            resultado = self.cache.buscar(chave)
+            if resultado is None:
+                CACHE_OCR.rotulo('erro').inc()
+                pendentes.append(i)
+            else:
+                CACHE_OCR.rotulo('acerto').inc()
+                CACHE_OCR_ECONOMIA.inc(self.tempo_medio_recorte)
+                resultados[i] = resultado
+
+        if pendentes:
+            inicio_rec = time.perf_counter()
+            novos, _ = self.base([recortes[i] for i in pendentes])
+            por_recorte = (time.perf_counter() - inicio_rec) / len(pendentes)
+            self.tempo_medio_recorte = (por_recorte if not self.tempo_medio_recorte
+                                        else 0.9 * self.tempo_medio_recorte + 0.1 * por_recorte)
+
+            for i, novo in zip(pendentes, novos):
+                resultados[i] = novo
+                if novo[1] >= CONFIANCA_MINIMA_CACHE and parece_placa(novo[0]):
+                    self.cache.guardar(chaves[i], tuple(novo))
+
+        return resultados, time.perf_counter() - inicio
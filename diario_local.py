@@ -0,0 +1,321 @@
+"""
+Diário local de eventos (SQLite em modo WAL) com sincronização em background para o banco principal
+- DiarioLocal: cada detecção/alerta é gravado primeiro num arquivo local (fsync no commit), então um
+  banco fora do ar ou lento não perde eventos nem trava o laço de captura
+- SincronizadorDiario: thread que drena o diário em lotes (uma transação por lote) e remove o que foi
+  gravado. Sem banco, tenta de novo com espera crescente; ao voltar, esvazia o atraso lote após lote
+
+Cada evento tem uma chave única gerada na captura. Os aplicadores usam a chave como restrição única no
+banco (ON CONFLICT DO NOTHING / ON DUPLICATE KEY): reenviar um lote cujo commit não chegou a ser confirmado
+no diário não duplica linhas nem conta duas vezes nas estatísticas.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from itertools import groupby
+
+from metricas import DB_FALHAS, DB_LATENCIA, DIARIO_ATRASO, DIARIO_SINCRONIZADOS, FILA_PROFUNDIDADE
+
+CONFIG_DIARIO_PADRAO = {
+    'caminho': 'diario_eventos.db',
+    'tamanho_lote': 500,  # Eventos por transação no banco principal
+    'intervalo_segundos': 2,  # Espera máxima sem eventos novos (um evento novo acorda a thread na hora)
+    'espera_maxima_segundos': 60,  # Teto da espera entre tentativas com o banco fora do ar
+    'tentativas_maximas': 5,  # Evento rejeitado pelo banco é deixado de lado após N tentativas
+}
+
+
+def validar_config_diario(config: dict = None) -> dict:
+    """
+    Completa a configuração com os valores padrão e valida os limites
+
+    Raises:
+        ValueError: se algum campo for desconhecido ou inválido
+    """
+    final = dict(CONFIG_DIARIO_PADRAO)
+    final.update(config or {})
+
+    desconhecidos = set(final) - set(CONFIG_DIARIO_PADRAO)
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos na configuração do diário: {', '.join(sorted(desconhecidos))}")
+
+    erros = []
+    if not final['caminho']:
+        erros.append("caminho não pode ser vazio")
+    if final['tamanho_lote'] < 1:
+        erros.append("tamanho_lote deve ser ao menos 1")
+    if final['intervalo_segundos'] <= 0:
+        erros.append("intervalo_segundos deve ser positivo")
+    if final['espera_maxima_segundos'] < final['intervalo_segundos']:
+        erros.append("espera_maxima_segundos não pode ser menor que intervalo_segundos")
+    if final['tentativas_maximas'] < 1:
+        erros.append("tentativas_maximas deve ser ao menos 1")
+    if erros:
+        raise ValueError("Configuração do diário inválida: " + "; ".join(erros))
+    return final
+
+
+def nova_chave() -> str:
+    """Chave de idempotência de um evento (32 caracteres hexadecimais)"""
+    return uuid.uuid4().hex
+
+
+class DiarioLocal:
+    """
+    Fila durável de eventos num arquivo SQLite (compartilhada entre threads)
+
+    Args:
+        caminho: arquivo do diário (criado se não existir)
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.lock = threading.Lock()
+        self.novo_evento = threading.Event()
+        self.conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        # WAL: gravar não bloqueia a leitura do sincronizador; FULL: o evento sobrevive a queda de energia
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS eventos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chave TEXT NOT NULL UNIQUE,
+                tipo TEXT NOT NULL,
+                dados TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                erro TEXT
+            )
+        """)
+
+    def registrar(self, tipo: str, dados: dict, chave: str = None) -> str:
+        """Grava o evento (durável ao retornar) e acorda o sincronizador; retorna a chave"""
+        chave = chave or nova_chave()
+        with self.lock:
+            self.conn.execute("INSERT INTO eventos (chave, tipo, dados, criado_em) VALUES (?, ?, ?, ?)",
+                              (chave, tipo, json.dumps(dados, ensure_ascii=False), time.time()))
+        self.novo_evento.set()
+        return chave
+
+    def pendentes(self, limite: int, tentativas_maximas: int) -> list:
+        """Eventos mais antigos ainda não sincronizados: lista de (id, chave, tipo, dados)"""
+        with self.lock:
+            linhas = self.conn.execute("""
+                SELECT id, chave, tipo, dados FROM eventos
+                WHERE tentativas < ? ORDER BY id LIMIT ?
+            """, (tentativas_maximas, limite)).fetchall()
+        return [(id_, chave, tipo, json.loads(dados)) for id_, chave, tipo, dados in linhas]
+
+    def remover(self, ids: list):
+        """Remove eventos já gravados no banco principal"""
+        if not ids:
+            return
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("DELETE FROM eventos WHERE id = ?", [(i,) for i in ids])
+            self.conn.execute("COMMIT")
+
+    def falhar(self, id_: int, erro: str):
+        """Registra uma rejeição do banco (o evento volta a ser tentado até tentativas_maximas)"""
+        with self.lock:
+            self.conn.execute("UPDATE eventos SET tentativas = tentativas + 1, erro = ? WHERE id = ?",
+                              (erro[:500], id_))
+
+    def contar(self, tentativas_maximas: int) -> dict:
+        """Eventos aguardando, eventos deixados de lado e idade do mais antigo (segundos)"""
+        with self.lock:
+            pendentes, mais_antigo = self.conn.execute(
+                "SELECT COUNT(*), MIN(criado_em) FROM eventos WHERE tentativas < ?", (tentativas_maximas,)
+            ).fetchone()
+            rejeitados = self.conn.execute(
+                "SELECT COUNT(*) FROM eventos WHERE tentativas >= ?", (tentativas_maximas,)
+            ).fetchone()[0]
+        return {
+            'pendentes': pendentes,
+            'rejeitados': rejeitados,
+            'atraso_segundos': round(time.time() - mais_antigo, 1) if mais_antigo else 0,
+        }
+
+    def fechar(self):
+        with self.lock:
+            self.conn.close()
+
+
+class SincronizadorDiario:
+    """
+    Drena o diário para o banco principal em background
+
+    Args:
+        diario: DiarioLocal
+        conectar: função que abre uma conexão nova com o esquema pronto (não compartilha a da aplicação)
+        aplicadores: tipo do evento -> função(conn, chave, dados) que grava o evento de forma idempotente
+            (sem commit; ver Armazenamento.aplicadores_diario)
+        aplicadores_lote: tipo -> função(conn, [(chave, dados)]) para eventos consecutivos do mesmo tipo
+            (opcional; acelera o esvaziamento do atraso acumulado numa queda do banco)
+    """
+
+    def __init__(self, diario: DiarioLocal, conectar, aplicadores: dict, config: dict = None,
+                 aplicadores_lote: dict = None):
+        self.diario = diario
+        self.conectar = conectar
+        self.aplicadores = aplicadores
+        self.aplicadores_lote = aplicadores_lote or {}
+        self.config = validar_config_diario(config)
+        self.conn = None
+        self.ultima_sincronizacao = None
+        self.ultimo_erro = None
+        self.parar_evento = threading.Event()
+        self.thread = None
+        FILA_PROFUNDIDADE.rotulo('diario').set_funcao(lambda: self.contar()['pendentes'])
+        DIARIO_ATRASO.set_funcao(lambda: self.contar()['atraso_segundos'])
+
+    def iniciar(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._laco, name='sincronizador-diario', daemon=True)
+            self.thread.start()
+        return self
+
+    def parar(self, aguardar: float = None):
+        """Interrompe a thread (com aguardar, espera o lote em andamento terminar)"""
+        self.parar_evento.set()
+        self.diario.novo_evento.set()
+        if aguardar and self.thread is not None:
+            self.thread.join(aguardar)
+
+    def _laco(self):
+        espera = self.config['intervalo_segundos']
+        while not self.parar_evento.is_set():
+            # Limpo antes de ler: um evento gravado durante o lote acorda a próxima espera
+            self.diario.novo_evento.clear()
+            try:
+                enviados = self.drenar()
+            except Exception as e:
+                DB_FALHAS.rotulo('sincronizar_diario').inc()
+                if self.ultimo_erro is None:
+                    print(f"⚠️  Banco indisponível, eventos ficam no diário local: {e}")
+                self.ultimo_erro = str(e)
+                self._descartar_conexao()
+                self.parar_evento.wait(espera)
+                espera = min(espera * 2, self.config['espera_maxima_segundos'])
+                continue
+
+            if self.ultimo_erro is not None:
+                print("✓ Banco de volta: sincronizando o diário local")
+                self.ultimo_erro = None
+            espera = self.config['intervalo_segundos']
+            # Lote cheio: ainda há atraso, segue sem esperar
+            if enviados < self.config['tamanho_lote']:
+                self.diario.novo_evento.wait(espera)
+        self._descartar_conexao()
+
+    def _descartar_conexao(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+    def _conexao_ativa(self) -> bool:
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            self.conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _aplicar(self, tipo: str, chave: str, dados: dict):
+        aplicador = self.aplicadores.get(tipo)
+        if aplicador is None:
+            raise ValueError(f"Tipo de evento desconhecido no diário: {tipo}")
+        with DB_LATENCIA.rotulo(f'diario_{tipo}').cronometrar():
+            aplicador(self.conn, chave, dados)
+
+    def drenar(self) -> int:
+        """
+        Envia um lote do diário ao banco
+
+        Returns:
+            Quantidade de eventos processados (gravados ou rejeitados)
+
+        Raises:
+            Exception: banco inacessível (os eventos continuam no diário)
+        """
+        eventos = self.diario.pendentes(self.config['tamanho_lote'], self.config['tentativas_maximas'])
+        if not eventos:
+            return 0
+        if self.conn is None:
+            self.conn = self.conectar()
+
+        try:
+            # Ordem do diário preservada: cada sequência de eventos do mesmo tipo vai junta, se possível
+            for tipo, sequencia in groupby(eventos, key=lambda evento: evento[2]):
+                sequencia = [(chave, dados) for _, chave, _, dados in sequencia]
+                aplicar_lote = self.aplicadores_lote.get(tipo)
+                if aplicar_lote is not None and len(sequencia) > 1:
+                    with DB_LATENCIA.rotulo(f'diario_{tipo}_lote').cronometrar():
+                        aplicar_lote(self.conn, sequencia)
+                else:
+                    for chave, dados in sequencia:
+                        self._aplicar(tipo, chave, dados)
+            self.conn.commit()
+        except Exception as e:
+            erro = e
+        else:
+            self._concluir(eventos)
+            return len(eventos)
+
+        # Lote recusado: se a conexão caiu, tenta tudo de novo depois; se não, isola o evento com problema
+        try:
+            self.conn.rollback()
+        except Exception:
+            raise erro
+        if not self._conexao_ativa():
+            raise erro
+        return self._drenar_um_a_um(eventos)
+
+    def _drenar_um_a_um(self, eventos: list) -> int:
+        gravados = []
+        for evento in eventos:
+            id_, chave, tipo, dados = evento
+            try:
+                self._aplicar(tipo, chave, dados)
+                self.conn.commit()
+                gravados.append(evento)
+            except Exception as e:
+                try:
+                    self.conn.rollback()
+                except Exception:
+                    pass
+                if not self._conexao_ativa():
+                    self._concluir(gravados)
+                    raise
+                DB_FALHAS.rotulo('evento_diario').inc()
+                print(f"❌ Evento {tipo} {chave} recusado pelo banco: {e}")
+                self.diario.falhar(id_, str(e))
+        self._concluir(gravados)
+        return len(eventos)
+
+    def _concluir(self, eventos: list):
+        self.diario.remover([evento[0] for evento in eventos])
+        for _, _, tipo, _ in eventos:
+            DIARIO_SINCRONIZADOS.rotulo(tipo).inc()
+        if eventos:
+            self.ultima_sincronizacao = datetime.now()
+
+    def contar(self) -> dict:
+        return self.diario.contar(self.config['tentativas_maximas'])
+
+    def status(self) -> dict:
+        return {
+            **self.contar(),
+            'ultima_sincronizacao': self.ultima_sincronizacao.isoformat() if self.ultima_sincronizacao else None,
+            'erro': self.ultimo_erro,
+        }
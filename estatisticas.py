@@ -0,0 +1,438 @@
+"""
+Estatísticas pré-agregadas (rollups) por hora/dia e câmera
+As tabelas estatisticas_* são atualizadas na mesma transação de cada detecção/alerta
+(registrar_deteccao, registrar_alerta), então relatórios e painéis leem poucas linhas
+por chave primária em vez de varrer o histórico. Funciona em PostgreSQL, MySQL e SQLite (dialeto).
+As placas únicas de todas as câmeras têm contador próprio (estatisticas_geral_dia): a mesma placa em
+duas câmeras conta uma vez, sem COUNT(DISTINCT) na leitura.
+
+Reconstrução (backfill) a partir das tabelas de origem:
+    python estatisticas.py --desde 2025-01-01
+    python estatisticas.py --banco detector --desde 2025-01-01 --ate 2025-02-01
+"""
+
+import argparse
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+TABELAS = {
+    'estatisticas_hora': """
+        hora {momento} NOT NULL,
+        camera VARCHAR(50) NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        conhecidas INTEGER NOT NULL DEFAULT 0,
+        desconhecidas INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (hora, camera)
+    """,
+    'estatisticas_dia': """
+        dia DATE NOT NULL,
+        camera VARCHAR(50) NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        placas_unicas INTEGER NOT NULL DEFAULT 0,
+        conhecidas INTEGER NOT NULL DEFAULT 0,
+        desconhecidas INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, camera)
+    """,
+    'estatisticas_placas_dia': """
+        dia DATE NOT NULL,
+        camera VARCHAR(50) NOT NULL,
+        placa VARCHAR(10) NOT NULL,
+        deteccoes INTEGER NOT NULL DEFAULT 0,
+        primeira {momento} NOT NULL,
+        ultima {momento} NOT NULL,
+        PRIMARY KEY (dia, camera, placa)
+    """,
+    'estatisticas_alertas_dia': """
+        dia DATE NOT NULL,
+        camera VARCHAR(50) NOT NULL,
+        tipo_alerta VARCHAR(50) NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, camera, tipo_alerta)
+    """,
+    # Todas as câmeras: câmeras que viram a placa no dia; a placa nova incrementa estatisticas_geral_dia
+    'estatisticas_placas_geral_dia': """
+        dia DATE NOT NULL,
+        placa VARCHAR(10) NOT NULL,
+        cameras INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, placa)
+    """,
+    'estatisticas_geral_dia': """
+        dia DATE NOT NULL,
+        placas_unicas INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia)
+    """,
+}
+
+# INSERT que ignora chaves já existentes, por dialeto (prefixo, sufixo)
+INSERT_IGNORANDO = {
+    'postgres': ("INSERT INTO", " ON CONFLICT DO NOTHING"),
+    'mysql': ("INSERT IGNORE INTO", ""),
+    'sqlite': ("INSERT OR IGNORE INTO", ""),
+}
+
+# Origem das estatísticas para a reconstrução: subconsultas com as colunas
+# (momento, camera, placa, conhecida, desconhecida) e (momento, camera, tipo_alerta); o %s é a câmera padrão
+# (linhas sem câmera). conhecida/desconhecida são 0/1 (ambas 0 quando a origem não sabe se o veículo é cadastrado)
+FonteEstatisticas = namedtuple('FonteEstatisticas', ['deteccoes', 'alertas'])
+FONTES = {
+    # Mesmo esquema no web_app_placas e no detectar_placas_video (ver armazenamento.py)
+    'acessos': FonteEstatisticas(
+        deteccoes="""SELECT data_acesso AS momento, COALESCE(camera, %s) AS camera, placa,
+                            CASE WHEN veiculo_id IS NOT NULL THEN 1 ELSE 0 END AS conhecida,
+                            CASE WHEN veiculo_id IS NULL THEN 1 ELSE 0 END AS desconhecida
+                     FROM acessos""",
+        alertas="SELECT data_alerta AS momento, COALESCE(camera, %s) AS camera, tipo_alerta FROM alertas",
+    ),
+}
+
+# Hora cheia e dia de `momento` na reconstrução, por dialeto
+EXPRESSOES_DATA = {
+    'postgres': ("date_trunc('hour', momento)", "CAST(momento AS DATE)"),
+    'mysql': ("DATE_FORMAT(momento, '%%Y-%%m-%%d %%H:00:00')", "CAST(momento AS DATE)"),
+    'sqlite': ("strftime('%%Y-%%m-%%d %%H:00:00', momento)", "date(momento)"),
+}
+
+
+def criar_tabelas(cursor, dialeto: str = 'postgres'):
+    """Cria as tabelas de estatísticas (idempotente)"""
+    momento = 'DATETIME' if dialeto == 'mysql' else 'TIMESTAMP'
+    sufixo = ' ENGINE=InnoDB DEFAULT CHARSET=utf8mb4' if dialeto == 'mysql' else ''
+    for tabela, colunas in TABELAS.items():
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {tabela} ({colunas.format(momento=momento)}){sufixo}")
+    _preencher_geral(cursor, dialeto)
+
+
+def _preencher_geral(cursor, dialeto: str):
+    """Contadores de todas as câmeras criados num banco que já tinha estatísticas: preenche a partir delas"""
+    cursor.execute("SELECT 1 FROM estatisticas_geral_dia LIMIT 1")
+    if cursor.fetchall():
+        return
+    inserir, ignorar = INSERT_IGNORANDO[dialeto]
+    cursor.execute(f"""
+        {inserir} estatisticas_placas_geral_dia (dia, placa, cameras)
+        SELECT dia, placa, COUNT(*) FROM estatisticas_placas_dia GROUP BY dia, placa{ignorar}
+    """)
+    cursor.execute(f"""
+        {inserir} estatisticas_geral_dia (dia, placas_unicas)
+        SELECT dia, COUNT(*) FROM estatisticas_placas_geral_dia GROUP BY dia{ignorar}
+    """)
+
+
+def _upsert(cursor, tabela: str, chaves: dict, valores: dict, dialeto: str, somar=(), maior=(), retornar_nova=False):
+    """
+    INSERT da linha ou, se a chave já existir, soma as colunas `somar` e mantém o maior valor das colunas `maior`
+
+    Returns:
+        Com retornar_nova=True, se a linha foi inserida (chave nova)
+    """
+    colunas = list(chaves) + list(valores)
+    marcadores = ', '.join(['%s'] * len(colunas))
+    if dialeto == 'sqlite' and retornar_nova:
+        # Sem RETURNING que distinga inserção de atualização: INSERT OR IGNORE e, se já existia, UPDATE
+        cursor.execute(f"INSERT OR IGNORE INTO {tabela} ({', '.join(colunas)}) VALUES ({marcadores})",
+                       list(chaves.values()) + list(valores.values()))
+        if cursor.rowcount == 1:
+            return True
+        atualizacoes = [f"{c} = {c} + %s" for c in somar] + [f"{c} = MAX({c}, %s)" for c in maior]
+        condicao = ' AND '.join(f"{c} = %s" for c in chaves)
+        cursor.execute(f"UPDATE {tabela} SET {', '.join(atualizacoes)} WHERE {condicao}",
+                       [valores[c] for c in somar] + [valores[c] for c in maior] + list(chaves.values()))
+        return False
+    if dialeto == 'sqlite':
+        atualizacoes = [f"{c} = {tabela}.{c} + excluded.{c}" for c in somar]
+        atualizacoes += [f"{c} = MAX({tabela}.{c}, excluded.{c})" for c in maior]
+        consulta = (f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({marcadores}) "
+                    f"ON CONFLICT ({', '.join(chaves)}) DO UPDATE SET {', '.join(atualizacoes)}")
+    elif dialeto == 'postgres':
+        atualizacoes = [f"{c} = {tabela}.{c} + EXCLUDED.{c}" for c in somar]
+        atualizacoes += [f"{c} = GREATEST({tabela}.{c}, EXCLUDED.{c})" for c in maior]
+        consulta = (f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({marcadores}) "
+                    f"ON CONFLICT ({', '.join(chaves)}) DO UPDATE SET {', '.join(atualizacoes)}")
+        if retornar_nova:
+            consulta += " RETURNING (xmax = 0)"
+    else:
+        atualizacoes = [f"{c} = {c} + VALUES({c})" for c in somar]
+        atualizacoes += [f"{c} = GREATEST({c}, VALUES({c}))" for c in maior]
+        consulta = (f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({marcadores}) "
+                    f"ON DUPLICATE KEY UPDATE {', '.join(atualizacoes)}")
+    cursor.execute(consulta, list(chaves.values()) + list(valores.values()))
+
+    if not retornar_nova:
+        return None
+    if dialeto == 'postgres':
+        return cursor.fetchone()[0]
+    return cursor.rowcount == 1  # MySQL: 1 = inserida, 2 = atualizada
+
+
+# --- Atualização incremental ---
+def registrar_deteccao(cursor, momento: datetime, camera: str, placa: str, conhecida: bool = None,
+                       dialeto: str = 'postgres'):
+    """
+    Conta uma detecção nos rollups (chamar na mesma transação do INSERT da detecção)
+
+    Args:
+        conhecida: veículo cadastrado (True/False) ou None quando a origem não sabe
+    """
+    hora = momento.replace(minute=0, second=0, microsecond=0)
+    dia = momento.date()
+    conhecidas = 1 if conhecida else 0
+    desconhecidas = 1 if conhecida is False else 0
+
+    _upsert(cursor, 'estatisticas_hora', {'hora': hora, 'camera': camera},
+            {'total': 1, 'conhecidas': conhecidas, 'desconhecidas': desconhecidas},
+            dialeto, somar=('total', 'conhecidas', 'desconhecidas'))
+    nova = _upsert(cursor, 'estatisticas_placas_dia', {'dia': dia, 'camera': camera, 'placa': placa},
+                   {'deteccoes': 1, 'primeira': momento, 'ultima': momento},
+                   dialeto, somar=('deteccoes',), maior=('ultima',), retornar_nova=True)
+    _upsert(cursor, 'estatisticas_dia', {'dia': dia, 'camera': camera},
+            {'total': 1, 'placas_unicas': 1 if nova else 0, 'conhecidas': conhecidas, 'desconhecidas': desconhecidas},
+            dialeto, somar=('total', 'placas_unicas', 'conhecidas', 'desconhecidas'))
+    if nova:
+        # Placa já vista no dia em outra câmera não conta de novo no total geral
+        _registrar_placas_geral(cursor, {(dia, placa): 1}, dialeto)
+
+
+def _registrar_placas_geral(cursor, placas: dict, dialeto: str):
+    """Conta {(dia, placa): câmeras em que a placa é nova} nas placas de todas as câmeras e as novas no dia"""
+    novas = {}
+    for (dia, placa), quantidade in placas.items():
+        if _upsert(cursor, 'estatisticas_placas_geral_dia', {'dia': dia, 'placa': placa}, {'cameras': quantidade},
+                   dialeto, somar=('cameras',), retornar_nova=True):
+            novas[dia] = novas.get(dia, 0) + 1
+    for dia, quantidade in novas.items():
+        _upsert(cursor, 'estatisticas_geral_dia', {'dia': dia}, {'placas_unicas': quantidade},
+                dialeto, somar=('placas_unicas',))
+
+
+def registrar_deteccoes(cursor, deteccoes, dialeto: str = 'postgres'):
+    """
+    Conta um lote de detecções [(momento, camera, placa, conhecida)] com um upsert por hora, placa e dia
+    (mesmos totais de registrar_deteccao linha a linha; usado ao esvaziar o diário local)
+    """
+    horas = {}
+    placas = {}
+    dias = {}
+    for momento, camera, placa, conhecida in deteccoes:
+        contagem = (1, 1 if conhecida else 0, 1 if conhecida is False else 0)
+        hora = momento.replace(minute=0, second=0, microsecond=0)
+        horas[(hora, camera)] = [a + b for a, b in zip(horas.get((hora, camera), (0, 0, 0)), contagem)]
+        dias[(momento.date(), camera)] = [a + b for a, b in zip(dias.get((momento.date(), camera), (0, 0, 0)),
+                                                                contagem)]
+        atual = placas.get((momento.date(), camera, placa))
+        placas[(momento.date(), camera, placa)] = ((1, momento, momento) if atual is None else
+                                                  (atual[0] + 1, min(atual[1], momento), max(atual[2], momento)))
+
+    for (hora, camera), (total, conhecidas, desconhecidas) in horas.items():
+        _upsert(cursor, 'estatisticas_hora', {'hora': hora, 'camera': camera},
+                {'total': total, 'conhecidas': conhecidas, 'desconhecidas': desconhecidas},
+                dialeto, somar=('total', 'conhecidas', 'desconhecidas'))
+    novas = {}
+    geral = {}
+    for (dia, camera, placa), (quantidade, primeira, ultima) in placas.items():
+        if _upsert(cursor, 'estatisticas_placas_dia', {'dia': dia, 'camera': camera, 'placa': placa},
+                   {'deteccoes': quantidade, 'primeira': primeira, 'ultima': ultima},
+                   dialeto, somar=('deteccoes',), maior=('ultima',), retornar_nova=True):
+            novas[(dia, camera)] = novas.get((dia, camera), 0) + 1
+            geral[(dia, placa)] = geral.get((dia, placa), 0) + 1
+    _registrar_placas_geral(cursor, geral, dialeto)
+    for (dia, camera), (total, conhecidas, desconhecidas) in dias.items():
+        _upsert(cursor, 'estatisticas_dia', {'dia': dia, 'camera': camera},
+                {'total': total, 'placas_unicas': novas.get((dia, camera), 0),
+                 'conhecidas': conhecidas, 'desconhecidas': desconhecidas},
+                dialeto, somar=('total', 'placas_unicas', 'conhecidas', 'desconhecidas'))
+
+
+def registrar_alerta(cursor, momento: datetime, camera: str, tipo_alerta: str, dialeto: str = 'postgres'):
+    """Conta um alerta nos rollups (mesma transação do INSERT do alerta)"""
+    _upsert(cursor, 'estatisticas_alertas_dia', {'dia': momento.date(), 'camera': camera, 'tipo_alerta': tipo_alerta},
+            {'total': 1}, dialeto, somar=('total',))
+
+
+# --- Leitura ---
+def _filtro_camera(camera):
+    return (" AND camera = %s", [camera]) if camera else ("", [])
+
+
+def resumo_dia(cursor, dia: date = None, camera: str = None, com_alertas: bool = True) -> dict:
+    """
+    Totais do dia (todas as câmeras se camera=None) numa consulta; com_alertas acrescenta os alertas por
+    tipo (uma segunda consulta)
+    """
+    dia = dia or date.today()
+    filtro, parametros = _filtro_camera(camera)
+    # A mesma placa pode ter passado por mais de uma câmera: sem filtro, vale o contador geral
+    unicas = ("COALESCE(SUM(placas_unicas), 0)" if camera else
+              "COALESCE((SELECT placas_unicas FROM estatisticas_geral_dia WHERE dia = %s), 0)")
+
+    cursor.execute(f"""
+        SELECT COALESCE(SUM(total), 0), COALESCE(SUM(conhecidas), 0), COALESCE(SUM(desconhecidas), 0), {unicas}
+        FROM estatisticas_dia WHERE dia = %s{filtro}
+    """, ([] if camera else [dia]) + [dia] + parametros)
+    total, conhecidas, desconhecidas, placas_unicas = (int(v) for v in cursor.fetchone())
+
+    resumo = {
+        'dia': dia,
+        'camera': camera,
+        'total': total,
+        'placas_unicas': placas_unicas,
+        'conhecidas': conhecidas,
+        'desconhecidas': desconhecidas,
+    }
+    if com_alertas:
+        resumo['alertas'] = alertas_dia(cursor, dia, camera)
+    return resumo
+
+
+def alertas_dia(cursor, dia: date = None, camera: str = None) -> dict:
+    """{tipo_alerta: total} do dia"""
+    filtro, parametros = _filtro_camera(camera)
+    cursor.execute(f"""
+        SELECT tipo_alerta, SUM(total) FROM estatisticas_alertas_dia
+        WHERE dia = %s{filtro} GROUP BY tipo_alerta ORDER BY tipo_alerta
+    """, [dia or date.today()] + parametros)
+    return {tipo: int(total) for tipo, total in cursor.fetchall()}
+
+
+def placas_do_dia(cursor, dia: date = None, camera: str = None) -> list:
+    """Placas distintas do dia com quantidade de detecções e primeiro/último horário, em ordem alfabética"""
+    filtro, parametros = _filtro_camera(camera)
+    cursor.execute(f"""
+        SELECT placa, SUM(deteccoes), MIN(primeira), MAX(ultima)
+        FROM estatisticas_placas_dia WHERE dia = %s{filtro}
+        GROUP BY placa ORDER BY placa
+    """, [dia or date.today()] + parametros)
+    # SQLite devolve as agregações de data como texto
+    return [{'placa': placa, 'deteccoes': int(deteccoes),
+             'primeira': datetime.fromisoformat(primeira) if isinstance(primeira, str) else primeira,
+             'ultima': datetime.fromisoformat(ultima) if isinstance(ultima, str) else ultima}
+            for placa, deteccoes, primeira, ultima in cursor.fetchall()]
+
+
+def serie_horaria(cursor, dia: date = None, camera: str = None) -> list:
+    """Detecções por hora do dia: [{'hora', 'total', 'conhecidas', 'desconhecidas'}]"""
+    dia = dia or date.today()
+    inicio = datetime(dia.year, dia.month, dia.day)
+    filtro, parametros = _filtro_camera(camera)
+    cursor.execute(f"""
+        SELECT hora, SUM(total), SUM(conhecidas), SUM(desconhecidas)
+        FROM estatisticas_hora WHERE hora >= %s AND hora < %s{filtro}
+        GROUP BY hora ORDER BY hora
+    """, [inicio, inicio + timedelta(days=1)] + parametros)
+    return [{'hora': hora, 'total': int(total), 'conhecidas': int(conhecidas), 'desconhecidas': int(desconhecidas)}
+            for hora, total, conhecidas, desconhecidas in cursor.fetchall()]
+
+
+# --- Reconstrução ---
+def reconstruir(cursor, fonte: FonteEstatisticas, desde: date, ate: date, camera_padrao: str,
+                dialeto: str = 'postgres') -> dict:
+    """
+    Recalcula os rollups dos dias [desde, ate) a partir da origem, com consultas agregadas (sem linha a linha)
+    Apenas as câmeras presentes na origem (e a câmera padrão) são apagadas e refeitas.
+
+    Returns:
+        Quantidade de linhas gravadas por tabela
+    """
+    inicio = datetime(desde.year, desde.month, desde.day)
+    fim = datetime(ate.year, ate.month, ate.day)
+    hora, dia = EXPRESSOES_DATA[dialeto]
+    deteccoes = f"({fonte.deteccoes}) AS f WHERE momento >= %s AND momento < %s"
+    alertas = f"({fonte.alertas}) AS f WHERE momento >= %s AND momento < %s" if fonte.alertas else None
+    parametros = [camera_padrao, inicio, fim]
+
+    cursor.execute(f"SELECT DISTINCT camera FROM {deteccoes}", parametros)
+    cameras = {camera_padrao} | {linha[0] for linha in cursor.fetchall()}
+    if alertas:
+        cursor.execute(f"SELECT DISTINCT camera FROM {alertas}", parametros)
+        cameras |= {linha[0] for linha in cursor.fetchall()}
+    lista_cameras = ', '.join(['%s'] * len(cameras))
+
+    for tabela, coluna, limites in (('estatisticas_hora', 'hora', (inicio, fim)),
+                                    ('estatisticas_dia', 'dia', (desde, ate)),
+                                    ('estatisticas_placas_dia', 'dia', (desde, ate)),
+                                    ('estatisticas_alertas_dia', 'dia', (desde, ate))):
+        cursor.execute(f"DELETE FROM {tabela} WHERE {coluna} >= %s AND {coluna} < %s AND camera IN ({lista_cameras})",
+                       list(limites) + sorted(cameras))
+    # Contadores de todas as câmeras: refeitos a partir das placas por câmera (inclusive as que não estão na origem)
+    for tabela in ('estatisticas_placas_geral_dia', 'estatisticas_geral_dia'):
+        cursor.execute(f"DELETE FROM {tabela} WHERE dia >= %s AND dia < %s", (desde, ate))
+
+    contagem = {}
+    conhecidas, desconhecidas = "SUM(conhecida)", "SUM(desconhecida)"
+    cursor.execute(f"""
+        INSERT INTO estatisticas_hora (hora, camera, total, conhecidas, desconhecidas)
+        SELECT {hora}, camera, COUNT(*), {conhecidas}, {desconhecidas} FROM {deteccoes} GROUP BY 1, 2
+    """, parametros)
+    contagem['estatisticas_hora'] = cursor.rowcount
+    cursor.execute(f"""
+        INSERT INTO estatisticas_dia (dia, camera, total, placas_unicas, conhecidas, desconhecidas)
+        SELECT {dia}, camera, COUNT(*), COUNT(DISTINCT placa), {conhecidas}, {desconhecidas}
+        FROM {deteccoes} GROUP BY 1, 2
+    """, parametros)
+    contagem['estatisticas_dia'] = cursor.rowcount
+    cursor.execute(f"""
+        INSERT INTO estatisticas_placas_dia (dia, camera, placa, deteccoes, primeira, ultima)
+        SELECT {dia}, camera, placa, COUNT(*), MIN(momento), MAX(momento)
+        FROM {deteccoes} GROUP BY 1, 2, 3
+    """, parametros)
+    contagem['estatisticas_placas_dia'] = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO estatisticas_placas_geral_dia (dia, placa, cameras)
+        SELECT dia, placa, COUNT(*) FROM estatisticas_placas_dia
+        WHERE dia >= %s AND dia < %s GROUP BY dia, placa
+    """, (desde, ate))
+    contagem['estatisticas_placas_geral_dia'] = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO estatisticas_geral_dia (dia, placas_unicas)
+        SELECT dia, COUNT(*) FROM estatisticas_placas_geral_dia
+        WHERE dia >= %s AND dia < %s GROUP BY dia
+    """, (desde, ate))
+    contagem['estatisticas_geral_dia'] = cursor.rowcount
+    if alertas:
+        cursor.execute(f"""
+            INSERT INTO estatisticas_alertas_dia (dia, camera, tipo_alerta, total)
+            SELECT {dia}, camera, tipo_alerta, COUNT(*) FROM {alertas} GROUP BY 1, 2, 3
+        """, parametros)
+        contagem['estatisticas_alertas_dia'] = cursor.rowcount
+    return contagem
+
+
+def _data(texto: str) -> date:
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrói as estatísticas pré-agregadas a partir do histórico")
+    parser.add_argument('--banco', choices=('web', 'detector'), default='web',
+                        help="Usa o banco configurado no web_app_placas ou no detectar_placas_video")
+    parser.add_argument('--desde', type=_data, default=date(2000, 1, 1), help="Primeiro dia (AAAA-MM-DD)")
+    parser.add_argument('--ate', type=_data, default=date.today() + timedelta(days=1),
+                        help="Dia seguinte ao último (AAAA-MM-DD, exclusivo)")
+    args = parser.parse_args()
+
+    # Usa a configuração de banco do script escolhido
+    if args.banco == 'web':
+        import configuracao as origem
+        armazenamento, camera_padrao = origem.armazenamento, origem.NOME_CAMERA
+    else:
+        import detectar_placas_video as origem
+        armazenamento, camera_padrao = origem.armazenamento_configurado(), origem.ORIGEM_DETECCOES
+    conn = armazenamento.conectar()
+
+    try:
+        cursor = conn.cursor()
+        criar_tabelas(cursor, armazenamento.dialeto)
+        contagem = reconstruir(cursor, FONTES['acessos'], args.desde, args.ate, camera_padrao, armazenamento.dialeto)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"✅ Estatísticas reconstruídas de {args.desde} a {args.ate} (exclusivo):")
+    for tabela, linhas in contagem.items():
+        print(f"   {tabela}: {linhas} linhas")
+
+
+if __name__ == '__main__':
+    main()
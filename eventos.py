@@ -0,0 +1,146 @@
+"""
+Barramento de eventos em tempo real (Server-Sent Events)
+Cada evento é serializado uma única vez e distribuído para todos os painéis abertos,
+sejam eles threads do servidor Flask (stream) ou corrotinas do servidor assíncrono (stream_async)
+"""
+
+import asyncio
+import itertools
+import json
+import queue
+import threading
+from datetime import datetime, date
+from decimal import Decimal
+
+
+def _serializar(valor):
+    """Converte tipos não suportados pelo JSON (datas, decimais)"""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+
+def para_json(dados) -> str:
+    """Serializa em JSON aceitando datas e decimais"""
+    return json.dumps(dados, default=_serializar, ensure_ascii=False)
+
+
+def formatar_evento(tipo: str, dados: dict, evento_id: int = None) -> bytes:
+    """Formata um evento no protocolo text/event-stream"""
+    linhas = []
+    if evento_id is not None:
+        linhas.append(f"id: {evento_id}")
+    linhas.append(f"event: {tipo}")
+    linhas.append("data: " + para_json(dados))
+    return ("\n".join(linhas) + "\n\n").encode('utf-8')
+
+
+class BroadcasterEventos:
+    """Distribui eventos para todos os assinantes (fan-out)"""
+
+    def __init__(self, tamanho_fila: int = 100, intervalo_heartbeat: float = 15.0):
+        self.tamanho_fila = tamanho_fila
+        self.intervalo_heartbeat = intervalo_heartbeat
+        self.assinantes = set()
+        self.assinantes_async = {}  # event loop -> filas asyncio dos clientes nele
+        self.lock = threading.Lock()
+        self.sequencia = itertools.count(1)
+
+    def assinar(self) -> queue.Queue:
+        """Registra um novo assinante e retorna sua fila"""
+        fila = queue.Queue(maxsize=self.tamanho_fila)
+        with self.lock:
+            self.assinantes.add(fila)
+        return fila
+
+    def cancelar(self, fila: queue.Queue):
+        """Remove um assinante"""
+        with self.lock:
+            self.assinantes.discard(fila)
+
+    def total_assinantes(self) -> int:
+        """Quantidade de painéis conectados"""
+        with self.lock:
+            return len(self.assinantes) + sum(len(filas) for filas in self.assinantes_async.values())
+
+    def total_pendentes(self) -> int:
+        """Soma dos eventos ainda não entregues em todas as filas"""
+        with self.lock:
+            filas = list(self.assinantes)
+            for filas_loop in self.assinantes_async.values():
+                filas.extend(filas_loop)
+        return sum(fila.qsize() for fila in filas)
+
+    def publicar(self, tipo: str, dados: dict):
+        """Serializa o evento uma vez e entrega para todas as filas"""
+        mensagem = formatar_evento(tipo, dados, next(self.sequencia))
+
+        with self.lock:
+            assinantes = list(self.assinantes)
+            assinantes_async = [(loop, list(filas)) for loop, filas in self.assinantes_async.items()]
+
+        # Filas asyncio só podem ser tocadas pelo próprio loop: uma chamada por loop entrega a todas
+        for loop, filas in assinantes_async:
+            try:
+                loop.call_soon_threadsafe(self._entregar_async, filas, mensagem)
+            except RuntimeError:
+                pass  # Loop já encerrado
+
+        for fila in assinantes:
+            try:
+                fila.put_nowait(mensagem)
+            except queue.Full:
+                # Cliente lento: descarta o evento mais antigo para não travar a captura
+                try:
+                    fila.get_nowait()
+                    fila.put_nowait(mensagem)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def stream(self):
+        """Gerador para a resposta HTTP de um assinante"""
+        fila = self.assinar()
+        try:
+            # Sugere ao navegador o intervalo de reconexão
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    yield fila.get(timeout=self.intervalo_heartbeat)
+                except queue.Empty:
+                    # Comentário SSE mantém a conexão viva através de proxies
+                    yield b": ping\n\n"
+        finally:
+            self.cancelar(fila)
+
+    @staticmethod
+    def _entregar_async(filas: list, mensagem: bytes):
+        """Executado no event loop dos assinantes (mesma política de descarte de publicar)"""
+        for fila in filas:
+            try:
+                fila.put_nowait(mensagem)
+            except asyncio.QueueFull:
+                fila.get_nowait()
+                fila.put_nowait(mensagem)
+
+    async def stream_async(self):
+        """Gerador assíncrono para a resposta HTTP de um assinante (servidor ASGI)"""
+        loop = asyncio.get_running_loop()
+        fila = asyncio.Queue(maxsize=self.tamanho_fila)
+        with self.lock:
+            self.assinantes_async.setdefault(loop, set()).add(fila)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(fila.get(), self.intervalo_heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+        finally:
+            with self.lock:
+                filas = self.assinantes_async.get(loop)
+                if filas is not None:
+                    filas.discard(fila)
+                    if not filas:
+                        del self.assinantes_async[loop]
@@ -0,0 +1,314 @@
+"""
+Exportação do histórico (acessos, alertas) para auditoria, em streaming
+- CSV: COPY ... TO STDOUT executado numa thread e entregue em blocos por uma fila limitada
+- Parquet: cursor nomeado (no servidor) lido em lotes; cada lote vira um row group
+
+A memória não depende da quantidade de linhas: o COPY e o cursor esperam quando quem consome
+(cliente HTTP ou arquivo) atrasa. Cada exportação usa conexão própria em transação somente leitura
+(um snapshot consistente que não bloqueia as gravações do reconhecimento).
+Parquet requer pyarrow (pip install pyarrow).
+
+Uso:
+    python exportacao.py acessos --desde 2025-01-01 --ate 2025-07-01 --saida acessos_1s.csv
+    python exportacao.py alertas --placa ABC1D23 --formato parquet --saida alertas.parquet
+"""
+
+import argparse
+import queue
+import sys
+import threading
+from datetime import date, datetime
+
+from psycopg2 import sql
+
+from metricas import EXPORTACAO_BYTES
+
+TAMANHO_BLOCO_CSV = 256 * 1024  # Bytes por bloco entregue ao cliente
+BLOCOS_EM_FILA = 8  # Blocos prontos aguardando o cliente (limita a memória por exportação)
+TAMANHO_LOTE_PARQUET = 50000  # Linhas por ida ao servidor e por row group
+EXPORTACOES_SIMULTANEAS = 2  # Exportações pela web ao mesmo tempo (as demais recebem 429)
+
+FORMATOS_EXPORTACAO = ('csv', 'parquet')
+
+# Colunas exportadas e tipo de cada uma no Parquet
+TABELAS_EXPORTACAO = {
+    'acessos': {
+        'coluna_data': 'data_acesso',
+        'colunas': {
+            'id': 'int', 'veiculo_id': 'int', 'placa': 'texto', 'tipo_placa': 'texto', 'tipo_evento': 'texto',
+            'confianca': 'decimal', 'imagem_path': 'texto', 'camera': 'texto', 'data_acesso': 'data_hora',
+        },
+    },
+    'alertas': {
+        'coluna_data': 'data_alerta',
+        'colunas': {
+            'id': 'int', 'veiculo_id': 'int', 'placa': 'texto', 'tipo_alerta': 'texto', 'mensagem': 'texto',
+            'resolvido': 'booleano', 'clipe': 'texto', 'camera': 'texto', 'data_alerta': 'data_hora',
+        },
+    },
+}
+
+vagas_exportacao = threading.BoundedSemaphore(EXPORTACOES_SIMULTANEAS)
+
+
+def montar_consulta(tabela: str, desde: date = None, ate: date = None, placa: str = None, camera: str = None):
+    """
+    SELECT da exportação com os filtros (ate é exclusivo), em ordem de data
+
+    Returns:
+        (consulta, parâmetros)
+
+    Raises:
+        ValueError: tabela desconhecida ou intervalo vazio
+    """
+    if tabela not in TABELAS_EXPORTACAO:
+        raise ValueError(f"Tabela não exportável: {tabela} (use {', '.join(sorted(TABELAS_EXPORTACAO))})")
+    if desde and ate and ate <= desde:
+        raise ValueError("ate deve ser posterior a desde")
+
+    definicao = TABELAS_EXPORTACAO[tabela]
+    coluna_data = sql.Identifier(definicao['coluna_data'])
+    condicoes, parametros = [], []
+    if desde:
+        condicoes.append(sql.SQL("{} >= %s").format(coluna_data))
+        parametros.append(desde)
+    if ate:
+        condicoes.append(sql.SQL("{} < %s").format(coluna_data))
+        parametros.append(ate)
+    if placa:
+        condicoes.append(sql.SQL("placa = %s"))
+        parametros.append(placa.upper())
+    if camera:
+        condicoes.append(sql.SQL("camera = %s"))
+        parametros.append(camera)
+
+    consulta = sql.SQL("SELECT {colunas} FROM {tabela}{filtro} ORDER BY {data}").format(
+        colunas=sql.SQL(', ').join(map(sql.Identifier, definicao['colunas'])),
+        tabela=sql.Identifier(tabela),
+        filtro=sql.SQL(' WHERE ') + sql.SQL(' AND ').join(condicoes) if condicoes else sql.SQL(''),
+        data=coluna_data,
+    )
+    return consulta, parametros
+
+
+def abrir_conexao(conectar):
+    """Conexão dedicada à exportação, em transação somente leitura com snapshot único"""
+    conn = conectar()
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    return conn
+
+
+def nome_arquivo(tabela: str, formato: str, desde: date = None, ate: date = None) -> str:
+    partes = [tabela] + [f"{dia:%Y%m%d}" for dia in (desde, ate) if dia]
+    return f"{'_'.join(partes)}.{formato}"
+
+
+# --- CSV ---
+class _FilaBlocos:
+    """Destino do COPY: agrupa a saída em blocos e os entrega a uma fila limitada"""
+
+    _FIM = object()
+
+    def __init__(self, tamanho_bloco: int, blocos: int):
+        self.tamanho_bloco = tamanho_bloco
+        self.fila = queue.Queue(blocos)
+        self.buffer = bytearray()
+        self.cancelado = threading.Event()
+
+    def write(self, dados):
+        self.buffer += dados.encode('utf-8') if isinstance(dados, str) else dados
+        if len(self.buffer) >= self.tamanho_bloco:
+            bloco, self.buffer = bytes(self.buffer), bytearray()
+            if not self.entregar(bloco):
+                raise InterruptedError("Exportação cancelada")
+
+    def entregar(self, item) -> bool:
+        """Espera espaço na fila (contrapressão); False se o consumidor desistiu"""
+        while not self.cancelado.is_set():
+            try:
+                self.fila.put(item, timeout=1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def finalizar(self, erro: Exception = None):
+        if erro is None and self.buffer:
+            self.entregar(bytes(self.buffer))
+        self.entregar(erro if erro is not None else self._FIM)
+
+
+def exportar_csv(conn, consulta, parametros, tamanho_bloco: int = TAMANHO_BLOCO_CSV):
+    """Gera blocos de bytes do CSV (com cabeçalho); fecha a conexão ao terminar ou ser interrompido"""
+    saida = _FilaBlocos(tamanho_bloco, BLOCOS_EM_FILA)
+    thread = None
+    try:
+        with conn.cursor() as cursor:
+            selecao = cursor.mogrify(consulta, parametros).decode('utf-8')
+        comando = f"COPY ({selecao}) TO STDOUT WITH (FORMAT csv, HEADER)"
+
+        def copiar():
+            try:
+                with conn.cursor() as cursor:
+                    cursor.copy_expert(comando, saida)
+                saida.finalizar()
+            except Exception as e:
+                saida.finalizar(e)
+
+        thread = threading.Thread(target=copiar, name='exportacao-csv', daemon=True)
+        thread.start()
+        while True:
+            item = saida.fila.get()
+            if item is _FilaBlocos._FIM:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        saida.cancelado.set()
+        if thread is not None and thread.is_alive():
+            conn.cancel()
+            thread.join()
+        conn.close()
+
+
+# --- Parquet ---
+class _SaidaBytes:
+    """Arquivo de escrita em memória esvaziado a cada row group (o gerador entrega o que acumulou)"""
+
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def esvaziar(self) -> bytes:
+        dados, self.partes = b''.join(self.partes), []
+        return dados
+
+
+def _esquema_parquet(tabela: str):
+    import pyarrow as pa
+    tipos = {
+        'int': pa.int64(),
+        'texto': pa.string(),
+        'decimal': pa.decimal128(5, 4),
+        'booleano': pa.bool_(),
+        'data_hora': pa.timestamp('us'),
+    }
+    return pa.schema([(coluna, tipos[tipo]) for coluna, tipo in TABELAS_EXPORTACAO[tabela]['colunas'].items()])
+
+
+def exportar_parquet(conn, tabela: str, consulta, parametros, tamanho_lote: int = TAMANHO_LOTE_PARQUET):
+    """Gera os bytes do arquivo Parquet, um row group por lote do cursor; fecha a conexão ao terminar"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        esquema = _esquema_parquet(tabela)
+        saida = _SaidaBytes()
+        cursor = conn.cursor(name=f'exportacao_{tabela}')
+        cursor.itersize = tamanho_lote
+        cursor.execute(consulta, parametros)
+        with pq.ParquetWriter(saida, esquema, compression='zstd') as escritor:
+            while True:
+                linhas = cursor.fetchmany(tamanho_lote)
+                if not linhas:
+                    break
+                colunas = list(zip(*linhas))
+                escritor.write_table(pa.table(
+                    [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, esquema)],
+                    schema=esquema))
+                yield saida.esvaziar()
+        yield saida.esvaziar()
+    finally:
+        conn.close()
+
+
+def parquet_disponivel() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def exportar(conn, tabela: str, formato: str = 'csv', **filtros):
+    """
+    Gerador de bytes da exportação no formato pedido (a conexão é fechada pelo gerador)
+
+    Raises:
+        ValueError: formato, tabela ou filtros inválidos
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS_EXPORTACAO)})")
+    consulta, parametros = montar_consulta(tabela, **filtros)
+    if formato == 'parquet':
+        gerador = exportar_parquet(conn, tabela, consulta, parametros)
+    else:
+        gerador = exportar_csv(conn, consulta, parametros)
+    return _contar_bytes(gerador, EXPORTACAO_BYTES.rotulo(tabela, formato))
+
+
+def _contar_bytes(gerador, contador):
+    try:
+        for bloco in gerador:
+            contador.inc(len(bloco))
+            yield bloco
+    finally:
+        gerador.close()
+
+
+def _data(texto: str) -> date:
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o histórico de acessos/alertas (web_app_placas)")
+    parser.add_argument('tabela', choices=sorted(TABELAS_EXPORTACAO))
+    parser.add_argument('--desde', type=_data, help="Primeiro dia (AAAA-MM-DD)")
+    parser.add_argument('--ate', type=_data, help="Dia seguinte ao último (AAAA-MM-DD, exclusivo)")
+    parser.add_argument('--placa')
+    parser.add_argument('--camera')
+    parser.add_argument('--formato', choices=FORMATOS_EXPORTACAO, default='csv')
+    parser.add_argument('--saida', help="Arquivo de saída (padrão: nome derivado dos filtros; '-' para saída padrão)")
+    args = parser.parse_args()
+
+    if args.formato == 'parquet' and not parquet_disponivel():
+        parser.error("Parquet requer pyarrow (pip install pyarrow)")
+    saida = args.saida or nome_arquivo(args.tabela, args.formato, args.desde, args.ate)
+
+    import psycopg2
+    import configuracao as origem
+    conn = abrir_conexao(lambda: psycopg2.connect(**origem.POSTGRES_CONFIG))
+    gerador = exportar(conn, args.tabela, args.formato, desde=args.desde, ate=args.ate,
+                       placa=args.placa, camera=args.camera)
+
+    total = 0
+    arquivo = sys.stdout.buffer if saida == '-' else open(saida, 'wb')
+    try:
+        for bloco in gerador:
+            arquivo.write(bloco)
+            total += len(bloco)
+    finally:
+        gerador.close()
+        if arquivo is not sys.stdout.buffer:
+            arquivo.close()
+    print(f"✅ {args.tabela} exportado para {saida} ({total / 1024 / 1024:.1f} MB)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+"""
+Fonte de vídeo resiliente: webcam, arquivo ou stream RTSP/HTTP
+- Reconexão com backoff exponencial (sem laço ocupado enquanto a câmera está fora ou abre sem entregar frames)
+- Buffer mínimo de captura: uma thread lê continuamente e guarda só o frame mais recente
+- Cada frame leva o instante de captura e a posição informada pela fonte
+- Estado de saúde (conectando, conectado, reconectando, finalizado) para o painel e o /health
+- Opcionalmente lê cada frame direto em um slot do BarramentoFrames (sem alocar por frame)
+"""
+
+import random
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from barramento_frames import BarramentoFrames
+from instantaneo import ValorVersionado
+from metricas import BARRAMENTO_ALOCACOES, CAMERA_CONECTADA, CAMERA_RECONEXOES, FRAMES_DESCARTADOS
+
+# Estados da fonte
+ESTADO_CONECTANDO = 'conectando'
+ESTADO_CONECTADO = 'conectado'
+ESTADO_RECONECTANDO = 'reconectando'
+ESTADO_FINALIZADO = 'finalizado'
+ESTADO_PARADO = 'parado'
+
+BACKOFF_INICIAL = 0.5  # Segundos até a primeira nova tentativa
+BACKOFF_MAXIMO = 30.0
+FALHAS_LEITURA_SEM_ESPERA = 3  # Falhas de leitura seguidas reconectadas na hora; a partir daí, com backoff
+
+# frame: imagem BGR | indice: sequência na fonte | capturado_em: time.perf_counter() da leitura
+# momento: time.time() da leitura | posicao_ms: posição informada pela fonte (arquivo/stream)
+# slot: (barramento, índice) quando o frame é uma view somente leitura do barramento
+Quadro = namedtuple('Quadro', ['frame', 'indice', 'capturado_em', 'momento', 'posicao_ms', 'slot'],
+                    defaults=(None,))
+
+
+def identificar_tipo(origem) -> str:
+    """'webcam' (índice), 'stream' (URL rtsp/http) ou 'arquivo'"""
+    if isinstance(origem, int) or str(origem).isdigit():
+        return 'webcam'
+    if '://' in str(origem):
+        return 'stream'
+    return 'arquivo'
+
+
+class FonteCamera:
+    """
+    Fonte de frames com reconexão automática
+
+    Com `tempo_real=True` uma thread lê a fonte continuamente (arquivos no ritmo do FPS)
+    e ler() devolve sempre o frame mais recente; vários leitores podem compartilhar a fonte.
+    Com `tempo_real=False` ler() lê o próximo frame diretamente (processamento offline de arquivo).
+
+    Com `slots_barramento > 0` os frames são views somente leitura de um BarramentoFrames:
+    cada Quadro retornado por ler() deve ser devolvido com liberar() ao fim do processamento.
+    """
+
+    def __init__(self, origem, repetir: bool = False, tempo_real: bool = True, nome: str = 'camera',
+                 backoff_inicial: float = BACKOFF_INICIAL, backoff_maximo: float = BACKOFF_MAXIMO,
+                 ao_mudar_estado=None, slots_barramento: int = 0):
+        self.origem = int(origem) if identificar_tipo(origem) == 'webcam' else origem
+        self.tipo = identificar_tipo(origem)
+        self.repetir = repetir
+        self.tempo_real = tempo_real
+        self.nome = nome
+        self.backoff_inicial = backoff_inicial
+        self.backoff_maximo = backoff_maximo
+        self.ao_mudar_estado = ao_mudar_estado
+        self.slots_barramento = slots_barramento
+        self.barramento = None  # Criado no primeiro frame, no formato da fonte
+
+        self.cap = None
+        self.estado = ESTADO_PARADO
+        self.erro = None
+        self.tentativas = 0
+        self.reconexoes = 0
+        self.fps = 0.0
+        self.resolucao = None
+        self.frames_lidos = 0
+        self.falhas_leitura = 0  # Falhas de leitura seguidas (zera a cada frame lido)
+        self.rebobinou = False  # Arquivo voltou ao início e ainda não entregou frame
+        self.ultimo = None  # Último Quadro lido
+
+        self.parar_evento = threading.Event()
+        self.condicao = threading.Condition()
+        self.indices = ValorVersionado()  # Índice do último quadro (modo tempo real), aguardado por corrotinas
+        self.thread = None
+
+    # --- Ciclo de vida ---
+    def iniciar(self):
+        """Inicia a leitura em background (apenas no modo tempo real; chamadas repetidas são ignoradas)"""
+        with self.condicao:
+            if not self.tempo_real or self.thread is not None:
+                return self
+            self.parar_evento.clear()
+            self.thread = threading.Thread(target=self._laco_captura, name=f'fonte-{self.nome}', daemon=True)
+            self.thread.start()
+        return self
+
+    def parar(self):
+        self.parar_evento.set()
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.thread = None
+        self._liberar()
+        with self.condicao:
+            ultimo, self.ultimo = self.ultimo, None
+        if ultimo is not None:
+            self.liberar(ultimo)
+        if self.barramento is not None:
+            self.barramento.aposentar()
+            self.barramento = None
+        self._mudar_estado(ESTADO_PARADO)
+
+    @property
+    def ativa(self) -> bool:
+        return self.estado not in (ESTADO_FINALIZADO, ESTADO_PARADO)
+
+    # --- Leitura ---
+    def ler(self, apos: int = -1, timeout: float = 1.0):
+        """
+        Retorna o próximo Quadro
+
+        Args:
+            apos: índice do último quadro já consumido por este leitor (modo tempo real);
+                  a diferença para o índice retornado menos 1 são os frames que o leitor perdeu
+            timeout: espera máxima por um quadro novo (modo tempo real)
+
+        Returns:
+            Quadro, ou None se não houver frame novo no tempo (fonte reconectando ou finalizada)
+        """
+        if not self.tempo_real:
+            quadro = self._ler_direto()
+            if quadro is not None:
+                self._adquirir(quadro)
+            return quadro
+
+        self.iniciar()
+        limite = time.monotonic() + timeout
+        with self.condicao:
+            while self.ultimo is None or self.ultimo.indice <= apos:
+                restante = limite - time.monotonic()
+                if restante <= 0 or not self.ativa:
+                    return None
+                self.condicao.wait(restante)
+            # A referência é tomada sob o lock: a captura não recicla o slot entre a escolha e o uso
+            self._adquirir(self.ultimo)
+            return self.ultimo
+
+    @staticmethod
+    def _adquirir(quadro):
+        if quadro.slot is not None:
+            barramento, indice = quadro.slot
+            barramento.adquirir(indice)
+
+    @staticmethod
+    def liberar(quadro):
+        """Devolve o slot do barramento usado pelo quadro (sem efeito para frames alocados)"""
+        if quadro is not None and quadro.slot is not None:
+            barramento, indice = quadro.slot
+            barramento.liberar(indice)
+
+    def _ler_direto(self):
+        """Lê o próximo frame na thread do chamador, reconectando com backoff quando necessário"""
+        while not self.parar_evento.is_set():
+            if self.cap is None and not self._conectar():
+                return None
+            quadro = self._capturar()
+            if quadro is not None:
+                return quadro
+            if not self._tratar_falha():
+                return None
+        return None
+
+    # --- Captura ---
+    def _laco_captura(self):
+        intervalo = 0.0
+        proximo = time.perf_counter()
+        while not self.parar_evento.is_set():
+            if self.cap is None:
+                if not self._conectar():
+                    break
+                # Arquivos são reproduzidos no ritmo original para se comportarem como câmera
+                intervalo = 1.0 / self.fps if self.tipo == 'arquivo' and self.fps else 0.0
+                proximo = time.perf_counter()
+
+            quadro = self._capturar()
+            if quadro is None:
+                if not self._tratar_falha():
+                    break
+                continue
+
+            with self.condicao:
+                self.condicao.notify_all()
+            self.indices.publicar(quadro.indice)
+
+            if intervalo:
+                proximo += intervalo
+                espera = proximo - time.perf_counter()
+                if espera > 0:
+                    self.parar_evento.wait(espera)
+                else:
+                    proximo = time.perf_counter()
+
+        with self.condicao:
+            self.condicao.notify_all()
+        self.indices.publicar(None)
+
+    def _conectar(self) -> bool:
+        """Abre a fonte, tentando com backoff exponencial até conseguir ou a fonte ser parada"""
+        espera = self.backoff_inicial
+        self._mudar_estado(ESTADO_RECONECTANDO if self.frames_lidos else ESTADO_CONECTANDO)
+
+        while not self.parar_evento.is_set():
+            self.tentativas += 1
+            cap = self._abrir()
+            if cap is not None:
+                self.cap = cap
+                self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+                self.resolucao = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+                self.erro = None
+                self._mudar_estado(ESTADO_CONECTADO)
+                print(f"📹 Fonte {self.nome} conectada ({self.tipo}: {self._descricao()}) - "
+                      f"{self.resolucao[0]}x{self.resolucao[1]} @ {self.fps:.1f} FPS")
+                return True
+
+            self.erro = f"Não foi possível abrir {self._descricao()}"
+            if self.tipo == 'arquivo' and not self.repetir:
+                # Arquivo ausente não vai aparecer sozinho
+                print(f"❌ {self.erro}")
+                self._mudar_estado(ESTADO_FINALIZADO)
+                return False
+
+            print(f"⚠️  {self.erro}; nova tentativa em {self._aguardar(espera):.1f}s")
+            espera = min(espera * 2, self.backoff_maximo)
+        return False
+
+    def _aguardar(self, espera: float) -> float:
+        """Espera `espera` segundos com jitter (interrompida ao parar a fonte); retorna o atraso usado"""
+        # Jitter evita que várias câmeras reconectem no mesmo instante
+        atraso = espera * random.uniform(0.8, 1.2)
+        self.parar_evento.wait(atraso)
+        return atraso
+
+    def _abrir(self):
+        if self.tipo == 'stream':
+            cap = cv2.VideoCapture(self.origem, cv2.CAP_FFMPEG)
+        else:
+            cap = cv2.VideoCapture(self.origem)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        # Buffer mínimo: a leitura devolve o frame ao vivo e não um acumulado antigo
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _capturar(self):
+        frame, slot = self._ler_frame()
+        if frame is None:
+            return None
+        self.frames_lidos += 1
+        self.falhas_leitura = 0
+        self.rebobinou = False
+        posicao = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        quadro = Quadro(frame, self.frames_lidos, time.perf_counter(), time.time(),
+                        posicao if posicao > 0 else None, slot)
+        # O último quadro mantém a referência do escritor até ser substituído
+        with self.condicao:
+            anterior, self.ultimo = self.ultimo, quadro
+        self.liberar(anterior)
+        return quadro
+
+    def _ler_frame(self):
+        """
+        Lê o próximo frame; com barramento, direto no próximo slot livre
+
+        Returns:
+            (frame, slot) ou (None, None) em caso de falha
+        """
+        barramento = self.barramento
+        indice = barramento.reservar() if barramento is not None else None
+
+        if indice is not None:
+            destino = barramento.slot(indice)
+            ret, frame = self.cap.read(destino)
+            if not ret or frame is None:
+                barramento.liberar(indice)
+                return None, None
+            if np.shares_memory(frame, destino):
+                return barramento.visao(indice), (barramento, indice)
+            # Resolução mudou: o OpenCV alocou outro buffer
+            barramento.liberar(indice)
+            return self._novo_barramento(frame)
+
+        ret, frame = self.cap.read()
+        if not ret or frame is None:
+            return None, None
+        if not self.slots_barramento:
+            return frame, None
+        if barramento is None or barramento.forma != frame.shape:
+            return self._novo_barramento(frame)
+        # Slots esgotados por leitores lentos: este frame fica fora do barramento
+        BARRAMENTO_ALOCACOES.inc()
+        return frame, None
+
+    def _novo_barramento(self, frame):
+        """Cria o barramento no formato do frame (primeiro frame ou nova resolução)"""
+        if self.barramento is not None:
+            self.barramento.aposentar()
+        BARRAMENTO_ALOCACOES.inc()
+        self.barramento = BarramentoFrames(self.slots_barramento, frame.shape)
+        indice = self.barramento.reservar()
+        self.barramento.slot(indice)[:] = frame
+        return self.barramento.visao(indice), (self.barramento, indice)
+
+    def _tratar_falha(self) -> bool:
+        """
+        Falha de leitura: fim do arquivo ou queda da câmera
+        Depois de FALHAS_LEITURA_SEM_ESPERA falhas seguidas (câmera que abre mas não entrega frames),
+        a reconexão espera com o mesmo backoff exponencial da abertura
+
+        Returns:
+            True se a leitura deve continuar (rebobinou ou vai reconectar)
+        """
+        FRAMES_DESCARTADOS.rotulo('falha_leitura').inc()
+        self.falhas_leitura += 1
+
+        if self.tipo == 'arquivo':
+            if self.repetir and self.rebobinou:
+                # Voltou ao início e nem o primeiro frame veio: arquivo vazio ou corrompido
+                self.erro = f"Nenhum frame lido de {self._descricao()}"
+                print(f"❌ {self.erro}")
+                self._liberar()
+                self._mudar_estado(ESTADO_FINALIZADO)
+                return False
+            if self.repetir and self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+                self.rebobinou = True
+                return True
+            if not self.repetir:
+                print(f"✓ Fim do vídeo {self._descricao()}")
+                self._liberar()
+                self._mudar_estado(ESTADO_FINALIZADO)
+                return False
+
+        self._liberar()
+        self.reconexoes += 1
+        CAMERA_RECONEXOES.rotulo(self.nome).inc()
+        excedentes = self.falhas_leitura - FALHAS_LEITURA_SEM_ESPERA
+        if excedentes <= 0:
+            print(f"⚠️  Fonte {self.nome} sem frames, reconectando...")
+        else:
+            self.erro = f"{self.falhas_leitura} leituras seguidas sem frame em {self._descricao()}"
+            espera = min(self.backoff_inicial * 2 ** (excedentes - 1), self.backoff_maximo)
+            print(f"⚠️  {self.erro}; nova tentativa em {self._aguardar(espera):.1f}s")
+        return not self.parar_evento.is_set()
+
+    def _liberar(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def _mudar_estado(self, estado: str):
+        if estado == self.estado:
+            return
+        self.estado = estado
+        CAMERA_CONECTADA.rotulo(self.nome).set(int(estado == ESTADO_CONECTADO))
+        if estado != ESTADO_CONECTADO:
+            with self.condicao:
+                self.condicao.notify_all()
+        if self.ao_mudar_estado:
+            try:
+                self.ao_mudar_estado(self.status())
+            except Exception as e:
+                print(f"⚠️  Erro ao notificar estado da fonte: {e}")
+
+    def _descricao(self) -> str:
+        # URLs de câmera costumam levar usuário e senha
+        if self.tipo == 'stream' and '@' in str(self.origem):
+            esquema, resto = str(self.origem).split('://', 1)
+            return f"{esquema}://***@{resto.split('@', 1)[1]}"
+        return str(self.origem)
+
+    def status(self) -> dict:
+        ultimo = self.ultimo
+        return {
+            'nome': self.nome,
+            'tipo': self.tipo,
+            'origem': self._descricao(),
+            'estado': self.estado,
+            'erro': self.erro,
+            'tentativas': self.tentativas,
+            'reconexoes': self.reconexoes,
+            'fps': round(self.fps, 2),
+            'resolucao': self.resolucao,
+            'frames_lidos': self.frames_lidos,
+            'idade_ultimo_frame': round(time.perf_counter() - ultimo.capturado_em, 3) if ultimo else None,
+            'posicao_ms': ultimo.posicao_ms if ultimo else None
+        }
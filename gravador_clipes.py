@@ -0,0 +1,161 @@
+"""
+Clipes de alerta: alguns segundos antes e depois do evento
+- BufferQuadros: anel em memória com os últimos N segundos de frames já codificados em JPEG
+- GravadorClipes: thread que espera o fim da janela do evento e grava o vídeo sem bloquear a captura
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from metricas import CLIPES_BUFFER_BYTES, CLIPES_GRAVADOS, FILA_PROFUNDIDADE
+
+CODEC_CLIPE = 'mp4v'
+EXTENSAO_CLIPE = '.mp4'
+BYTES_MAXIMO_BUFFER = 64 * 1024 * 1024  # Limite de memória do anel, além do limite de tempo
+
+
+class BufferQuadros:
+    """Últimos `segundos` de frames JPEG de uma câmera (cada frame da fonte entra uma única vez)"""
+
+    def __init__(self, segundos: float, bytes_maximo: int = BYTES_MAXIMO_BUFFER):
+        self.segundos = segundos
+        self.bytes_maximo = bytes_maximo
+        self.quadros = deque()  # (indice, capturado_em, jpeg)
+        self.total_bytes = 0
+        self.ultimo_indice = -1
+        self.lock = threading.Lock()
+        CLIPES_BUFFER_BYTES.set_funcao(lambda: self.total_bytes)
+
+    def adicionar(self, indice: int, capturado_em: float, jpeg: bytes):
+        """Guarda o frame codificado; índices já vistos (outro stream do mesmo frame) são ignorados"""
+        with self.lock:
+            if indice <= self.ultimo_indice:
+                return
+            self.ultimo_indice = indice
+            self.quadros.append((indice, capturado_em, jpeg))
+            self.total_bytes += len(jpeg)
+
+            limite = capturado_em - self.segundos
+            while self.quadros and (self.quadros[0][1] < limite or self.total_bytes > self.bytes_maximo):
+                self.total_bytes -= len(self.quadros.popleft()[2])
+
+    def janela(self, inicio: float, fim: float) -> list:
+        """Frames (capturado_em, jpeg) capturados entre inicio e fim (time.perf_counter)"""
+        with self.lock:
+            return [(t, jpeg) for _, t, jpeg in self.quadros if inicio <= t <= fim]
+
+
+class GravadorClipes:
+    """
+    Grava clipes em background a partir do BufferQuadros
+
+    solicitar() só enfileira o pedido; a thread aguarda os segundos posteriores ao evento,
+    copia a janela do anel, decodifica e grava o vídeo, e então chama ao_concluir(dados, caminho).
+    """
+
+    def __init__(self, buffer: BufferQuadros, pasta: str, segundos_antes: float = 5,
+                 segundos_depois: float = 5, ao_concluir=None):
+        self.buffer = buffer
+        self.pasta = pasta
+        self.segundos_antes = segundos_antes
+        self.segundos_depois = segundos_depois
+        self.ao_concluir = ao_concluir
+        self.pedidos = queue.Queue()
+        self.parar_evento = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+        os.makedirs(pasta, exist_ok=True)
+        FILA_PROFUNDIDADE.rotulo('clipes').set_funcao(self.pedidos.qsize)
+
+    def iniciar(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._laco, name='gravador-clipes', daemon=True)
+                self.thread.start()
+        return self
+
+    def parar(self):
+        self.parar_evento.set()
+        self.pedidos.put(None)
+
+    def solicitar(self, nome: str, momento_evento: float = None, dados=None) -> str:
+        """
+        Agenda o clipe do evento (não bloqueia)
+
+        Args:
+            nome: prefixo do arquivo (ex.: a placa)
+            momento_evento: time.perf_counter() da captura do frame do evento (padrão: agora)
+            dados: repassado a ao_concluir (ex.: ids dos alertas)
+
+        Returns:
+            Nome do arquivo que será gravado
+        """
+        self.iniciar()
+        momento_evento = momento_evento if momento_evento is not None else time.perf_counter()
+        arquivo = f"{nome}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{EXTENSAO_CLIPE}"
+        self.pedidos.put((momento_evento, arquivo, dados))
+        return arquivo
+
+    def _laco(self):
+        while not self.parar_evento.is_set():
+            pedido = self.pedidos.get()
+            if pedido is None:
+                break
+            momento_evento, arquivo, dados = pedido
+
+            # Espera o fim da janela posterior ao evento (pedidos chegam em ordem de tempo)
+            espera = momento_evento + self.segundos_depois - time.perf_counter()
+            if espera > 0 and self.parar_evento.wait(espera):
+                break
+
+            quadros = self.buffer.janela(momento_evento - self.segundos_antes,
+                                         momento_evento + self.segundos_depois)
+            caminho = os.path.join(self.pasta, arquivo)
+            try:
+                self._gravar(caminho, quadros)
+                CLIPES_GRAVADOS.rotulo('ok').inc()
+                print(f"🎞️  Clipe gravado: {caminho} ({len(quadros)} frames)")
+            except Exception as e:
+                CLIPES_GRAVADOS.rotulo('erro').inc()
+                print(f"❌ Erro ao gravar clipe {arquivo}: {e}")
+                continue
+
+            if self.ao_concluir:
+                try:
+                    self.ao_concluir(dados, arquivo)
+                except Exception as e:
+                    print(f"⚠️  Erro ao vincular clipe {arquivo}: {e}")
+
+    @staticmethod
+    def _gravar(caminho: str, quadros: list):
+        """Decodifica os JPEGs e grava o vídeo (arquivo temporário renomeado no fim)"""
+        if not quadros:
+            raise ValueError("Nenhum frame no buffer para a janela do evento")
+
+        duracao = quadros[-1][0] - quadros[0][0]
+        fps = (len(quadros) - 1) / duracao if duracao > 0 else 10.0
+        fps = min(max(fps, 1.0), 60.0)
+
+        primeiro = cv2.imdecode(np.frombuffer(quadros[0][1], np.uint8), cv2.IMREAD_COLOR)
+        altura, largura = primeiro.shape[:2]
+
+        temporario = caminho + '.parcial' + EXTENSAO_CLIPE
+        escritor = cv2.VideoWriter(temporario, cv2.VideoWriter_fourcc(*CODEC_CLIPE), fps, (largura, altura))
+        if not escritor.isOpened():
+            raise RuntimeError(f"Codec {CODEC_CLIPE} indisponível")
+        try:
+            escritor.write(primeiro)
+            for _, jpeg in quadros[1:]:
+                frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                if frame is not None and frame.shape[:2] == (altura, largura):
+                    escritor.write(frame)
+        finally:
+            escritor.release()
+        os.replace(temporario, caminho)
@@ -0,0 +1,332 @@
+"""
+Importação em lote de usuários e veículos (CSV)
+Cada linha do arquivo é um veículo e o seu responsável, como no formulário de cadastro. As linhas são
+validadas em Python (placa com as mesmas regras do reconhecimento, CPF, campos obrigatórios, repetições
+no arquivo), carregadas com COPY numa tabela temporária e aplicadas com upsert em usuarios/veiculos
+numa única transação. Linhas com erro não são importadas e voltam no relatório com o motivo, inclusive
+as de placas que já pertencem a outro CPF no banco (o veículo não troca de dono pela importação).
+
+Colunas opcionais vazias ou ausentes mantêm o valor já cadastrado; os padrões (tipo PARTICULAR,
+autorizado, tipo_veiculo CARRO) valem apenas para usuários e veículos novos.
+
+Colunas (cabeçalho obrigatório; as opcionais podem faltar):
+    nome, cpf, placa                           obrigatórias
+    telefone, tipo, autorizado, modelo, cor, tipo_veiculo, motivo_marcacao
+
+Uso:
+    python importacao.py funcionarios.csv
+    python importacao.py funcionarios.csv --simular     # só valida e mostra o relatório
+"""
+
+import argparse
+import csv
+import io
+import re
+import sys
+from datetime import datetime
+
+COLUNAS_OBRIGATORIAS = ('nome', 'cpf', 'placa')
+COLUNAS_OPCIONAIS = ('telefone', 'tipo', 'autorizado', 'modelo', 'cor', 'tipo_veiculo', 'motivo_marcacao')
+TIPOS_USUARIO = ('PARTICULAR', 'OFICIAL')
+TIPOS_VEICULO = ('CARRO', 'MOTO', 'CAMINHAO', 'OUTRO')
+VALORES_VERDADEIROS = ('1', 'S', 'SIM', 'TRUE', 'T', 'X')
+VALORES_FALSOS = ('0', 'N', 'NAO', 'NÃO', 'FALSE', 'F')
+LIMITES_TEXTO = {'nome': 100, 'telefone': 20, 'modelo': 100, 'cor': 50}
+CAMERA_PADRAO = 'camera'  # Câmera registrada nos alertas de marcação (o web app passa NOME_CAMERA)
+
+# Colunas da tabela temporária, na ordem do COPY
+COLUNAS_STAGING = ('linha', 'nome', 'cpf', 'telefone', 'tipo', 'autorizado', 'placa', 'tipo_placa',
+                   'modelo', 'cor', 'tipo_veiculo', 'motivo_marcacao')
+
+
+def normalizar_cpf(texto: str):
+    """CPF no formato 000.000.000-00, ou None se não tiver 11 dígitos com verificadores válidos"""
+    digitos = re.sub(r'\D', '', texto or '')
+    if len(digitos) != 11 or digitos == digitos[0] * 11:
+        return None
+    for tamanho in (9, 10):
+        soma = sum(int(digito) * peso for digito, peso in zip(digitos, range(tamanho + 1, 1, -1)))
+        if (soma * 10 % 11) % 10 != int(digitos[tamanho]):
+            return None
+    return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+
+
+def _booleano(texto: str, padrao: bool):
+    valor = (texto or '').strip().upper()
+    if not valor:
+        return padrao
+    if valor in VALORES_VERDADEIROS:
+        return True
+    if valor in VALORES_FALSOS:
+        return False
+    raise ValueError(f"valor '{texto}' não é sim/não")
+
+
+def validar_linhas(leitor, validar_placa):
+    """
+    Valida as linhas do CSV
+
+    Args:
+        leitor: csv.DictReader do arquivo
+        validar_placa: função do reconhecimento, texto -> (placa, tipo) ou (None, None)
+
+    Returns:
+        (linhas válidas, erros): erros como dicts {linha, campo, mensagem}
+
+    Raises:
+        ValueError: cabeçalho sem as colunas obrigatórias
+    """
+    cabecalho = [(coluna or '').strip().lower() for coluna in (leitor.fieldnames or [])]
+    faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in cabecalho]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes no cabeçalho: {', '.join(faltando)}")
+    leitor.fieldnames = cabecalho
+
+    validas, erros = [], []
+    placas_vistas = {}  # placa -> linha
+    usuarios_vistos = {}  # cpf -> (linha, nome)
+
+    # Linha 1 é o cabeçalho
+    for numero, registro in enumerate(leitor, 2):
+        campos = {coluna: (registro.get(coluna) or '').strip() for coluna in COLUNAS_OBRIGATORIAS + COLUNAS_OPCIONAIS}
+        problemas = []
+
+        if not campos['nome']:
+            problemas.append(('nome', "nome é obrigatório"))
+        for coluna, limite in LIMITES_TEXTO.items():
+            if len(campos[coluna]) > limite:
+                problemas.append((coluna, f"{coluna} excede {limite} caracteres"))
+
+        cpf = normalizar_cpf(campos['cpf'])
+        if cpf is None:
+            problemas.append(('cpf', f"CPF inválido: '{campos['cpf']}'"))
+        elif cpf in usuarios_vistos and usuarios_vistos[cpf][1].casefold() != campos['nome'].casefold():
+            problemas.append(('cpf', f"CPF repetido com outro nome (linha {usuarios_vistos[cpf][0]})"))
+
+        placa, tipo_placa = validar_placa(campos['placa']) if campos['placa'] else (None, None)
+        if placa is None:
+            problemas.append(('placa', f"Placa '{campos['placa']}' inválida. Use formato ABC1234 ou ABC1D23"))
+        elif placa in placas_vistas:
+            problemas.append(('placa', f"Placa repetida no arquivo (linha {placas_vistas[placa]})"))
+
+        # Vazios ficam None: o upsert mantém o valor cadastrado (ou usa o padrão no registro novo)
+        tipo = campos['tipo'].upper() or None
+        if tipo is not None and tipo not in TIPOS_USUARIO:
+            problemas.append(('tipo', f"tipo deve ser um de: {', '.join(TIPOS_USUARIO)}"))
+        tipo_veiculo = campos['tipo_veiculo'].upper() or None
+        if tipo_veiculo is not None and tipo_veiculo not in TIPOS_VEICULO:
+            problemas.append(('tipo_veiculo', f"tipo_veiculo deve ser um de: {', '.join(TIPOS_VEICULO)}"))
+        try:
+            autorizado = _booleano(campos['autorizado'], None)
+        except ValueError as e:
+            problemas.append(('autorizado', str(e)))
+            autorizado = None
+
+        if problemas:
+            erros.extend({'linha': numero, 'campo': campo, 'mensagem': mensagem} for campo, mensagem in problemas)
+            continue
+
+        placas_vistas[placa] = numero
+        usuarios_vistos.setdefault(cpf, (numero, campos['nome']))
+        validas.append({
+            'linha': numero, 'nome': campos['nome'], 'cpf': cpf, 'telefone': campos['telefone'] or None,
+            'tipo': tipo, 'autorizado': autorizado, 'placa': placa, 'tipo_placa': tipo_placa,
+            'modelo': campos['modelo'] or None, 'cor': campos['cor'] or None, 'tipo_veiculo': tipo_veiculo,
+            'motivo_marcacao': campos['motivo_marcacao'] or None,
+        })
+    return validas, erros
+
+
+def _copiar_para_staging(cursor, linhas: list):
+    """Cria a tabela temporária e a preenche com COPY (um único envio ao servidor)"""
+    cursor.execute("""
+        CREATE TEMP TABLE importacao_cadastros (
+            linha INTEGER,
+            nome VARCHAR(100),
+            cpf VARCHAR(14),
+            telefone VARCHAR(20),
+            tipo VARCHAR(20),
+            autorizado BOOLEAN,
+            placa VARCHAR(10),
+            tipo_placa VARCHAR(20),
+            modelo VARCHAR(100),
+            cor VARCHAR(50),
+            tipo_veiculo VARCHAR(20),
+            motivo_marcacao TEXT
+        ) ON COMMIT DROP
+    """)
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for linha in linhas:
+        escritor.writerow(['' if linha[coluna] is None else linha[coluna] for coluna in COLUNAS_STAGING])
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY importacao_cadastros ({', '.join(COLUNAS_STAGING)}) FROM STDIN WITH (FORMAT csv)",
+                       buffer)
+
+
+def _separar_conflitos(cursor) -> list:
+    """
+    Retira da tabela temporária as linhas cuja placa já pertence a outro CPF no banco
+
+    Returns:
+        Erros no formato de validar_linhas
+    """
+    cursor.execute("""
+        DELETE FROM importacao_cadastros s
+        USING veiculos v JOIN usuarios u ON u.id = v.usuario_id
+        WHERE v.placa = s.placa AND u.cpf <> s.cpf
+        RETURNING s.linha, s.placa
+    """)
+    return [{'linha': linha, 'campo': 'placa', 'mensagem': f"Placa {placa} já cadastrada para outro CPF"}
+            for linha, placa in sorted(cursor.fetchall())]
+
+
+def _aplicar(cursor, camera: str) -> dict:
+    """
+    Upsert de usuarios (por CPF) e veiculos (por placa) a partir da tabela temporária
+
+    Os padrões das colunas opcionais entram só na inserção; na atualização, o valor vazio (NULL na
+    tabela temporária) mantém o cadastrado. EXCLUDED já traz o padrão aplicado, então a atualização
+    lê o valor original da tabela temporária
+    """
+    momento = datetime.now()
+    # Um usuário pode aparecer em várias linhas (um veículo por linha): vale a primeira
+    cursor.execute("""
+        WITH primeiras AS (
+            SELECT DISTINCT ON (cpf) nome, cpf, telefone, tipo, autorizado
+            FROM importacao_cadastros
+            ORDER BY cpf, linha
+        )
+        INSERT INTO usuarios (nome, cpf, telefone, tipo, autorizado)
+        SELECT nome, cpf, telefone, COALESCE(tipo, 'PARTICULAR'), COALESCE(autorizado, TRUE)
+        FROM primeiras
+        ON CONFLICT (cpf) DO UPDATE
+        SET nome = EXCLUDED.nome,
+            telefone = COALESCE(EXCLUDED.telefone, usuarios.telefone),
+            tipo = COALESCE((SELECT p.tipo FROM primeiras p WHERE p.cpf = EXCLUDED.cpf), usuarios.tipo),
+            autorizado = COALESCE((SELECT p.autorizado FROM primeiras p WHERE p.cpf = EXCLUDED.cpf),
+                                  usuarios.autorizado)
+        RETURNING (xmax = 0)
+    """)
+    usuarios = [inserido for (inserido,) in cursor.fetchall()]
+
+    # Marcação já existente é mantida; a nova gera o alerta, como em marcar_veiculo, contado nas estatísticas.
+    # marcadas_antes lê o estado anterior ao upsert (todas as partes do WITH veem o mesmo snapshot)
+    cursor.execute("""
+        WITH marcadas_antes AS (
+            SELECT v.placa FROM veiculos v JOIN importacao_cadastros s ON s.placa = v.placa WHERE v.marcado
+        ), gravados AS (
+            INSERT INTO veiculos (placa, tipo_placa, usuario_id, modelo, cor, tipo_veiculo, marcado, motivo_marcacao)
+            SELECT s.placa, s.tipo_placa, u.id, s.modelo, s.cor, COALESCE(s.tipo_veiculo, 'CARRO'),
+                   s.motivo_marcacao IS NOT NULL, s.motivo_marcacao
+            FROM importacao_cadastros s
+            JOIN usuarios u ON u.cpf = s.cpf
+            ON CONFLICT (placa) DO UPDATE
+            SET tipo_placa = EXCLUDED.tipo_placa,
+                usuario_id = EXCLUDED.usuario_id,
+                modelo = COALESCE(EXCLUDED.modelo, veiculos.modelo),
+                cor = COALESCE(EXCLUDED.cor, veiculos.cor),
+                tipo_veiculo = COALESCE((SELECT s.tipo_veiculo FROM importacao_cadastros s
+                                         WHERE s.placa = EXCLUDED.placa), veiculos.tipo_veiculo),
+                marcado = veiculos.marcado OR EXCLUDED.marcado,
+                motivo_marcacao = COALESCE(EXCLUDED.motivo_marcacao, veiculos.motivo_marcacao)
+            RETURNING id, placa, marcado, motivo_marcacao, (xmax = 0) AS inserido
+        ), novos_alertas AS (
+            INSERT INTO alertas (veiculo_id, placa, tipo_alerta, mensagem, camera, data_alerta)
+            SELECT g.id, g.placa, 'VEICULO_MARCADO', g.motivo_marcacao, %(camera)s, %(momento)s
+            FROM gravados g
+            WHERE g.marcado AND g.placa NOT IN (SELECT placa FROM marcadas_antes)
+            RETURNING 1
+        ), por_alerta AS (
+            INSERT INTO estatisticas_alertas_dia (dia, camera, tipo_alerta, total)
+            SELECT %(dia)s, %(camera)s, 'VEICULO_MARCADO', COUNT(*) FROM novos_alertas HAVING COUNT(*) > 0
+            ON CONFLICT (dia, camera, tipo_alerta) DO UPDATE SET
+                total = estatisticas_alertas_dia.total + EXCLUDED.total
+        )
+        SELECT g.inserido, (SELECT COUNT(*) FROM novos_alertas) FROM gravados g
+    """, {'camera': camera, 'momento': momento, 'dia': momento.date()})
+    linhas = cursor.fetchall()
+    veiculos = [inserido for inserido, _ in linhas]
+    return {
+        'usuarios_inseridos': sum(usuarios),
+        'usuarios_atualizados': len(usuarios) - sum(usuarios),
+        'veiculos_inseridos': sum(veiculos),
+        'veiculos_atualizados': len(veiculos) - sum(veiculos),
+        'veiculos_marcados': linhas[0][1] if linhas else 0,
+    }
+
+
+def importar(conn, arquivo, validar_placa, simular: bool = False, camera: str = CAMERA_PADRAO) -> dict:
+    """
+    Importa o CSV (objeto de texto) numa única transação
+
+    Args:
+        camera: câmera dos alertas VEICULO_MARCADO das marcações novas (e da contagem nas estatísticas)
+
+    Returns:
+        Relatório: linhas lidas, importadas, contagens do upsert, placas importadas e erros por linha
+        (inclusive as placas que já pertencem a outro CPF)
+
+    Raises:
+        ValueError: cabeçalho inválido
+    """
+    validas, erros = validar_linhas(csv.DictReader(arquivo), validar_placa)
+    relatorio = {
+        'linhas': len(validas) + len({erro['linha'] for erro in erros}),
+        'importadas': 0,
+        'simulacao': simular,
+        'placas': [],
+        'erros': erros,
+    }
+    if not validas:
+        return relatorio
+
+    try:
+        with conn.cursor() as cursor:
+            _copiar_para_staging(cursor, validas)
+            conflitos = _separar_conflitos(cursor)
+            relatorio.update(_aplicar(cursor, camera))
+        if simular:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    recusadas = {erro['linha'] for erro in conflitos}
+    relatorio['erros'] = sorted(erros + conflitos, key=lambda erro: erro['linha'])
+    relatorio['importadas'] = len(validas) - len(recusadas)
+    relatorio['placas'] = [linha['placa'] for linha in validas if linha['linha'] not in recusadas]
+    return relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa usuários e veículos de um CSV (web_app_placas)")
+    parser.add_argument('arquivo', help="CSV com cabeçalho (UTF-8)")
+    parser.add_argument('--simular', action='store_true', help="Valida e aplica numa transação desfeita no fim")
+    args = parser.parse_args()
+
+    import psycopg2
+    import configuracao as origem
+    conn = psycopg2.connect(**origem.POSTGRES_CONFIG)
+    try:
+        with open(args.arquivo, newline='', encoding='utf-8-sig') as arquivo:
+            relatorio = importar(conn, arquivo, origem.validar_placa, args.simular, origem.NOME_CAMERA)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    for erro in relatorio['erros']:
+        print(f"⚠️  Linha {erro['linha']} ({erro['campo']}): {erro['mensagem']}")
+    prefixo = "🔎 Simulação:" if args.simular else "✅"
+    print(f"{prefixo} {relatorio['importadas']} de {relatorio['linhas']} linhas importadas "
+          f"({relatorio.get('usuarios_inseridos', 0)} usuários novos, {relatorio.get('usuarios_atualizados', 0)} "
+          f"atualizados; {relatorio.get('veiculos_inseridos', 0)} veículos novos, "
+          f"{relatorio.get('veiculos_atualizados', 0)} atualizados)")
+
+
+if __name__ == '__main__':
+    main()
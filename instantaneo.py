@@ -0,0 +1,144 @@
+"""
+Últimos valores servidos da memória para pollers HTTP (ETag e long-poll)
+- ValorVersionado: último valor já serializado com número de versão (ex.: última detecção em JSON,
+  frame MJPEG difundido); aguardado por threads ou por corrotinas (servidor assíncrono)
+- InstantaneoCamera: JPEG do frame mais recente, codificado no máximo uma vez por frame; aguardado por
+  threads ou por corrotinas
+"""
+
+import asyncio
+import threading
+import time
+
+import cv2
+
+QUALIDADE_JPEG = 80
+VALIDADE_ANOTADO = 1.0  # Segundos em que o frame anotado pelo stream é preferido ao frame cru
+
+
+def _resolver(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+class ValorVersionado:
+    """
+    Último valor publicado e sua versão
+    aguardar() bloqueia a thread até a versão mudar; aguardar_async() faz o mesmo sem bloquear o event loop
+    """
+
+    def __init__(self):
+        self.valor = None
+        self.versao = 0
+        self.condicao = threading.Condition()
+        self.futuros = {}  # event loop -> futuro resolvido na próxima publicação (compartilhado pelas corrotinas)
+
+    def publicar(self, valor):
+        with self.condicao:
+            self.valor = valor
+            self.versao += 1
+            self.condicao.notify_all()
+            futuros, self.futuros = self.futuros, {}
+        # Uma chamada por event loop, não importa quantos clientes aguardam nele
+        for loop, futuro in futuros.items():
+            try:
+                loop.call_soon_threadsafe(_resolver, futuro)
+            except RuntimeError:
+                pass  # Loop já encerrado
+
+    def obter(self) -> tuple:
+        with self.condicao:
+            return self.versao, self.valor
+
+    def aguardar(self, versao: int, timeout: float) -> tuple:
+        """Espera uma versão diferente de `versao` (até `timeout` segundos) e retorna (versao, valor)"""
+        with self.condicao:
+            self.condicao.wait_for(lambda: self.versao != versao, timeout)
+            return self.versao, self.valor
+
+    async def aguardar_async(self, versao: int, timeout: float) -> tuple:
+        """Versão de aguardar() para corrotinas"""
+        loop = asyncio.get_running_loop()
+        with self.condicao:
+            if self.versao != versao:
+                return self.versao, self.valor
+            futuro = self.futuros.get(loop)
+            if futuro is None:
+                futuro = self.futuros[loop] = loop.create_future()
+        try:
+            # shield: o timeout de um cliente não cancela o futuro dos demais
+            await asyncio.wait_for(asyncio.shield(futuro), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.obter()
+
+
+class InstantaneoCamera:
+    """
+    JPEG do frame mais recente da câmera
+
+    Com um stream MJPEG ativo, usa o frame já anotado e codificado por ele (publicar()).
+    Sem stream, codifica o frame cru da fonte uma única vez por índice, não importa quantos pollers.
+    """
+
+    def __init__(self, fonte, qualidade: int = QUALIDADE_JPEG, validade_anotado: float = VALIDADE_ANOTADO):
+        self.fonte = fonte
+        self.qualidade = qualidade
+        self.validade_anotado = validade_anotado
+        self.anotado = None  # (indice, jpeg, publicado_em)
+        self.cru = None  # (indice, jpeg)
+        self.lock = threading.Lock()
+
+    def publicar(self, indice: int, jpeg: bytes):
+        """Chamado pelo stream MJPEG com o frame que acabou de codificar"""
+        anterior = self.anotado
+        if anterior is None or indice >= anterior[0]:
+            self.anotado = (indice, jpeg, time.perf_counter())
+
+    def obter(self, timeout: float = 2.0) -> tuple:
+        """(indice, jpeg) do frame mais recente, ou (None, None) se a câmera não entregou nenhum"""
+        anotado = self.anotado
+        if anotado is not None and time.perf_counter() - anotado[2] < self.validade_anotado:
+            return anotado[0], anotado[1]
+
+        quadro = self.fonte.ler(timeout=timeout)
+        if quadro is None:
+            return (self.cru if self.cru else (None, None))
+        try:
+            # Um poller codifica, os demais esperam no lock e reaproveitam o resultado
+            with self.lock:
+                if self.cru is None or self.cru[0] != quadro.indice:
+                    ok, buffer = cv2.imencode('.jpg', quadro.frame, [cv2.IMWRITE_JPEG_QUALITY, self.qualidade])
+                    if ok:
+                        self.cru = (quadro.indice, buffer.tobytes())
+                return self.cru if self.cru else (None, None)
+        finally:
+            self.fonte.liberar(quadro)
+
+    def aguardar(self, indice: int, timeout: float) -> tuple:
+        """Espera um frame diferente de `indice` (até `timeout` segundos) e retorna (indice, jpeg)"""
+        limite = time.monotonic() + timeout
+        apos = indice
+        while True:
+            restante = limite - time.monotonic()
+            quadro = self.fonte.ler(apos=apos, timeout=restante) if restante > 0 else None
+            if quadro is None:
+                return self.obter(timeout=0)
+            apos = quadro.indice
+            self.fonte.liberar(quadro)
+            atual = self.obter(timeout=0)
+            # O frame anotado pode estar um pouco atrás da fonte: espera o próximo
+            if atual[0] != indice:
+                return atual
+
+    async def aguardar_async(self, indice: int, timeout: float) -> tuple:
+        """Versão de aguardar() para corrotinas (espera em fonte.indices; a codificação roda no executor)"""
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + timeout
+        versao = self.fonte.indices.obter()[0]
+        while True:
+            atual = await loop.run_in_executor(None, self.obter, 0)
+            restante = limite - loop.time()
+            if (atual[0] is not None and atual[0] != indice) or restante <= 0:
+                return atual
+            versao, _ = await self.fonte.indices.aguardar_async(versao, restante)
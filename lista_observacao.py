@@ -0,0 +1,171 @@
+"""
+Lista de observação com busca aproximada das placas marcadas e de usuários não autorizados
+O OCR troca caracteres parecidos (0/O/D, 1/I, 8/B, 5/S...) e uma leitura errada de uma placa marcada
+não bate com nenhum cadastro. Cada leitura é comparada com a lista por distância de edição com peso
+menor para essas trocas; leituras próximas (sem ser idênticas) viram alertas de possível correspondência.
+
+Índice: cada placa é reduzida à forma canônica (cada grupo de confusão vira um único caractere), e a
+forma canônica é guardada com todas as variantes de até N caracteres removidos (N = parte inteira de
+distancia_maxima). As trocas baratas somem na forma canônica e as demais edições custam 1, então uma placa a
+distância <= distancia_maxima da leitura compartilha com ela ao menos uma variante: a busca consulta as
+variantes da leitura no dicionário e calcula a distância exata só dessas candidatas, sem percorrer a lista.
+"""
+
+import threading
+
+from metricas import OBSERVACAO_BUSCA, OBSERVACAO_CORRESPONDENCIAS, OBSERVACAO_TAMANHO
+
+# Grupos (disjuntos) de caracteres que o OCR confunde entre si; trocas dentro do grupo custam CUSTO_CONFUSAO
+GRUPOS_CONFUSAO = ('0ODQ', '1IL', '2Z', '4A', '5S', '6G', '7T', '8B')
+CUSTO_CONFUSAO = 0.5
+
+CUSTOS_TROCA = {(a, b): CUSTO_CONFUSAO for grupo in GRUPOS_CONFUSAO for a in grupo for b in grupo if a != b}
+TABELA_CANONICA = str.maketrans({c: grupo[0] for grupo in GRUPOS_CONFUSAO for c in grupo[1:]})
+
+CONFIG_LISTA_OBSERVACAO_PADRAO = {
+    'distancia_maxima': 1.0,  # Leituras até esta distância de uma placa da lista geram alerta (0.5 = uma troca)
+}
+DISTANCIA_MAXIMA_INDICE = 2  # Acima disso as variantes por placa (remoções) crescem demais
+
+
+def validar_config_lista_observacao(config: dict = None) -> dict:
+    """
+    Completa a configuração com os valores padrão e valida os limites
+
+    Raises:
+        ValueError: se algum campo for desconhecido ou inválido
+    """
+    final = dict(CONFIG_LISTA_OBSERVACAO_PADRAO)
+    final.update(config or {})
+
+    desconhecidos = set(final) - set(CONFIG_LISTA_OBSERVACAO_PADRAO)
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos na configuração da lista de observação: "
+                         f"{', '.join(sorted(desconhecidos))}")
+
+    if not CUSTO_CONFUSAO <= final['distancia_maxima'] <= DISTANCIA_MAXIMA_INDICE:
+        raise ValueError("Configuração da lista de observação inválida: distancia_maxima deve estar entre "
+                         f"{CUSTO_CONFUSAO} (uma troca de caracteres parecidos) e {DISTANCIA_MAXIMA_INDICE}")
+    return final
+
+
+def distancia_ocr(a: str, b: str) -> float:
+    """Distância de edição entre duas placas; trocas entre caracteres de GRUPOS_CONFUSAO custam menos"""
+    if a == b:
+        return 0.0
+    anterior = [float(j) for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        atual = [float(i)]
+        for j, cb in enumerate(b, 1):
+            troca = 0.0 if ca == cb else CUSTOS_TROCA.get((ca, cb), 1.0)
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + troca))
+        anterior = atual
+    return anterior[-1]
+
+
+def variantes(placa: str, remocoes: int) -> set:
+    """Forma canônica da placa e as variantes com até `remocoes` caracteres removidos"""
+    fronteira = {placa.translate(TABELA_CANONICA)}
+    todas = set(fronteira)
+    for _ in range(remocoes):
+        fronteira = {texto[:i] + texto[i + 1:] for texto in fronteira for i in range(len(texto))}
+        todas |= fronteira
+    return todas
+
+
+class ListaObservacao:
+    """
+    Placas observadas (marcadas ou de usuário não autorizado) indexadas para busca aproximada
+
+    Uso:
+        lista.carregar(armazenamento.observados(conn))
+        lista.atualizar(placa, veiculo)  # após marcar/cadastrar, com o resultado de buscar_veiculo
+        for placa_observada, distancia, info in lista.buscar(leitura): ...
+        info = lista.obter(leitura)  # leitura idêntica a uma placa da lista
+    """
+
+    def __init__(self, config: dict = None):
+        self.config = validar_config_lista_observacao(config)
+        self.remocoes = int(self.config['distancia_maxima'])
+        self.placas = {}  # placa -> info (marcado, motivo_marcacao, usuario_nome, usuario_autorizado)
+        self.indice = {}  # variante -> placas
+        self.lock = threading.Lock()
+        OBSERVACAO_TAMANHO.set_funcao(lambda: len(self.placas))
+
+    @staticmethod
+    def observada(veiculo: dict) -> bool:
+        """Veículo que gera alerta quando lido: marcado ou de usuário não autorizado (ou sem usuário)"""
+        return bool(veiculo.get('marcado')) or not veiculo.get('usuario_autorizado')
+
+    @staticmethod
+    def _info(veiculo: dict) -> dict:
+        return {
+            'marcado': bool(veiculo.get('marcado')),
+            'motivo_marcacao': veiculo.get('motivo_marcacao'),
+            'usuario_nome': veiculo.get('usuario_nome'),
+            'usuario_autorizado': veiculo.get('usuario_autorizado'),
+        }
+
+    def _indexar(self, placa: str):
+        for variante in variantes(placa, self.remocoes):
+            self.indice.setdefault(variante, set()).add(placa)
+
+    def carregar(self, veiculos):
+        """Substitui a lista pelos veículos informados (dicts com placa e os campos de info)"""
+        with self.lock:
+            self.placas = {veiculo['placa']: self._info(veiculo) for veiculo in veiculos}
+            self.indice = {}
+            for placa in self.placas:
+                self._indexar(placa)
+
+    def adicionar(self, veiculo: dict):
+        with self.lock:
+            if veiculo['placa'] not in self.placas:
+                self._indexar(veiculo['placa'])
+            self.placas[veiculo['placa']] = self._info(veiculo)
+
+    def remover(self, placa: str):
+        with self.lock:
+            if self.placas.pop(placa, None) is None:
+                return
+            for variante in variantes(placa, self.remocoes):
+                placas = self.indice[variante]
+                placas.discard(placa)
+                if not placas:
+                    del self.indice[variante]
+
+    def atualizar(self, placa: str, veiculo: dict = None):
+        """Inclui ou retira a placa conforme o cadastro atual (veiculo de buscar_veiculo; None = removido)"""
+        if veiculo is not None and self.observada(veiculo):
+            self.adicionar(veiculo)
+        else:
+            self.remover(placa)
+
+    def obter(self, placa: str):
+        """Info da placa se ela está na lista (leitura idêntica), ou None"""
+        with self.lock:
+            return self.placas.get(placa)
+
+    def buscar(self, leitura: str) -> list:
+        """
+        Placas da lista a até distancia_maxima da leitura, sem contar a própria leitura
+
+        Returns:
+            [(placa, distancia, info)] da mais próxima para a mais distante
+        """
+        limite = self.config['distancia_maxima']
+        encontradas = []
+        with OBSERVACAO_BUSCA.cronometrar(), self.lock:
+            candidatas = set()
+            for variante in variantes(leitura, self.remocoes):
+                candidatas.update(self.indice.get(variante, ()))
+            for placa in candidatas:
+                distancia = distancia_ocr(leitura, placa)
+                if 0 < distancia <= limite:
+                    encontradas.append((placa, distancia, self.placas[placa]))
+        if encontradas:
+            OBSERVACAO_CORRESPONDENCIAS.inc(len(encontradas))
+        return sorted(encontradas, key=lambda encontrada: (encontrada[1], encontrada[0]))
+
+    def __len__(self):
+        return len(self.placas)
@@ -0,0 +1,379 @@
+"""
+Métricas no formato texto do Prometheus
+O caminho quente (por frame) não usa lock: cada thread escreve nos próprios contadores
+e a soma entre threads só é feita quando /metrics é consultado
+"""
+
+import bisect
+import functools
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Buckets padrão para latências (segundos)
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Guarda:
+    """Objeto guardado só no thread-local: é coletado quando a thread termina"""
+
+    __slots__ = ('__weakref__',)
+
+
+class _Fragmentos:
+    """
+    Lista de valores por thread, somada apenas na exportação
+    Quando a thread termina, os valores dela vão para `encerradas` e a lista sai de `todos`
+    (o servidor Flask cria uma thread por requisição)
+    """
+
+    def __init__(self, tamanho: int):
+        self.tamanho = tamanho
+        self.local = threading.local()
+        self.todos = []
+        self.encerradas = [0.0] * tamanho  # Soma das threads que já terminaram
+        self.lock = threading.RLock()  # Reentrante: o recolhimento pode rodar enquanto a thread segura o lock
+
+    def meus(self) -> list:
+        """Valores da thread atual (lock apenas na primeira escrita da thread)"""
+        try:
+            return self.local.valores
+        except AttributeError:
+            valores = [0.0] * self.tamanho
+            guarda = _Guarda()
+            with self.lock:
+                self.todos.append(valores)
+            weakref.finalize(guarda, self._recolher, valores)
+            self.local.valores = valores
+            self.local.guarda = guarda
+            return valores
+
+    def _recolher(self, valores: list):
+        """Soma os valores da thread encerrada em `encerradas` e descarta a lista dela"""
+        with self.lock:
+            for i, valor in enumerate(valores):
+                self.encerradas[i] += valor
+            self.todos = [outros for outros in self.todos if outros is not valores]
+
+    def somar(self) -> list:
+        """Soma os valores de todas as threads"""
+        with self.lock:
+            todos = list(self.todos)
+            total = list(self.encerradas)
+        for valores in todos:
+            for i, valor in enumerate(valores):
+                total[i] += valor
+        return total
+
+
+def _formatar_rotulos(nomes, valores, extra=None) -> str:
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{n}="{v}"' for n, v in pares) + '}'
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(int(valor)) if float(valor).is_integer() else repr(valor)
+
+
+class _Metrica:
+    """Base comum: nome, ajuda e filhos por rótulo"""
+
+    tipo = 'untyped'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), registro=None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.valores_rotulos = ()
+        self.filhos = {}
+        self.lock = threading.Lock()
+        (registro if registro is not None else REGISTRO).registrar(self)
+
+    def _novo_filho(self):
+        raise NotImplementedError
+
+    def rotulo(self, *valores):
+        """Retorna a série correspondente aos valores dos rótulos"""
+        filho = self.filhos.get(valores)
+        if filho is None:
+            with self.lock:
+                filho = self.filhos.get(valores)
+                if filho is None:
+                    filho = self._novo_filho()
+                    filho.valores_rotulos = valores
+                    self.filhos[valores] = filho
+        return filho
+
+    def _series(self):
+        if self.rotulos:
+            with self.lock:
+                return list(self.filhos.values())
+        return [self]
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        for serie in self._series():
+            linhas.extend(serie._amostras(self.nome, self.rotulos))
+        return linhas
+
+
+class Contador(_Metrica):
+    """Contador monotônico"""
+
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=(), registro=None):
+        super().__init__(nome, ajuda, rotulos, registro)
+        self.fragmentos = _Fragmentos(1)
+
+    def _novo_filho(self):
+        filho = Contador.__new__(Contador)
+        filho.fragmentos = _Fragmentos(1)
+        return filho
+
+    def inc(self, valor: float = 1):
+        self.fragmentos.meus()[0] += valor
+
+    def valor(self) -> float:
+        return self.fragmentos.somar()[0]
+
+    def _amostras(self, nome, rotulos):
+        return [f"{nome}{_formatar_rotulos(rotulos, self.valores_rotulos)} {_formatar_numero(self.valor())}"]
+
+
+class Medidor(_Metrica):
+    """Valor instantâneo (gauge): inc/dec sem lock, set() ou função de leitura"""
+
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, rotulos=(), funcao=None, registro=None):
+        super().__init__(nome, ajuda, rotulos, registro)
+        self.fragmentos = _Fragmentos(1)
+        self.base = 0.0
+        self.funcao = funcao
+
+    def _novo_filho(self):
+        filho = Medidor.__new__(Medidor)
+        filho.fragmentos = _Fragmentos(1)
+        filho.base = 0.0
+        filho.funcao = None
+        return filho
+
+    def inc(self, valor: float = 1):
+        self.fragmentos.meus()[0] += valor
+
+    def dec(self, valor: float = 1):
+        self.fragmentos.meus()[0] -= valor
+
+    def set(self, valor: float):
+        self.base = valor - self.fragmentos.somar()[0]
+
+    def set_funcao(self, funcao):
+        """Define uma função chamada apenas na exportação"""
+        self.funcao = funcao
+
+    def valor(self) -> float:
+        if self.funcao is not None:
+            try:
+                return float(self.funcao())
+            except Exception:
+                return float('nan')
+        return self.base + self.fragmentos.somar()[0]
+
+    def _amostras(self, nome, rotulos):
+        return [f"{nome}{_formatar_rotulos(rotulos, self.valores_rotulos)} {_formatar_numero(self.valor())}"]
+
+
+class Histograma(_Metrica):
+    """Histograma com buckets fixos"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA, registro=None):
+        super().__init__(nome, ajuda, rotulos, registro)
+        self.buckets = tuple(sorted(buckets))
+        # [contagem por bucket..., +Inf, soma, total]
+        self.fragmentos = _Fragmentos(len(self.buckets) + 3)
+
+    def _novo_filho(self):
+        filho = Histograma.__new__(Histograma)
+        filho.buckets = self.buckets
+        filho.fragmentos = _Fragmentos(len(self.buckets) + 3)
+        return filho
+
+    def observar(self, valor: float):
+        valores = self.fragmentos.meus()
+        valores[bisect.bisect_left(self.buckets, valor)] += 1
+        valores[-2] += valor
+        valores[-1] += 1
+
+    @contextmanager
+    def cronometrar(self):
+        """Mede a duração do bloco em segundos"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio)
+
+    def resumo(self) -> dict:
+        """Total e soma das observações"""
+        valores = self.fragmentos.somar()
+        return {'total': valores[-1], 'soma': valores[-2]}
+
+    def _amostras(self, nome, rotulos):
+        valores = self.fragmentos.somar()
+        linhas = []
+        acumulado = 0.0
+        for limite, contagem in zip(self.buckets + (float('inf'),), valores):
+            acumulado += contagem
+            le = ('le', _formatar_numero(limite))
+            linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, self.valores_rotulos, le)} "
+                          f"{_formatar_numero(acumulado)}")
+        sufixo = _formatar_rotulos(rotulos, self.valores_rotulos)
+        linhas.append(f"{nome}_sum{sufixo} {_formatar_numero(valores[-2])}")
+        linhas.append(f"{nome}_count{sufixo} {_formatar_numero(valores[-1])}")
+        return linhas
+
+
+class Registro:
+    """Conjunto de métricas exportadas"""
+
+    def __init__(self):
+        self.metricas = {}
+        self.lock = threading.Lock()
+
+    def registrar(self, metrica):
+        with self.lock:
+            if metrica.nome in self.metricas:
+                raise ValueError(f"Métrica duplicada: {metrica.nome}")
+            self.metricas[metrica.nome] = metrica
+
+    def obter(self, nome: str):
+        return self.metricas.get(nome)
+
+    def exportar(self) -> str:
+        """Texto no formato de exposição do Prometheus"""
+        with self.lock:
+            metricas = list(self.metricas.values())
+        linhas = []
+        for metrica in metricas:
+            linhas.extend(metrica.exportar())
+        return '\n'.join(linhas) + '\n'
+
+
+REGISTRO = Registro()
+
+
+def cronometrar(histograma):
+    """Decorador que registra a duração da função no histograma"""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                histograma.observar(time.perf_counter() - inicio)
+        return envoltorio
+    return decorador
+
+
+# --- MÉTRICAS DO SISTEMA ---
+FRAMES_CAPTURADOS = Contador('placas_frames_capturados_total', 'Frames lidos da câmera/vídeo')
+FRAMES_DESCARTADOS = Contador('placas_frames_descartados_total',
+                              'Frames descartados (falha de leitura, substituídos por um mais recente ou não amostrados para OCR)',
+                              rotulos=('motivo',))
+FRAMES_OCR = Contador('placas_frames_ocr_total', 'Frames enviados ao OCR')
+OCR_LATENCIA = Histograma('placas_ocr_latencia_segundos',
+                          'Latência do OCR por etapa (det, cls, rec, total)',
+                          rotulos=('etapa',))
+OCR_FALLBACK_CLS = Contador('placas_ocr_fallback_cls_total',
+                            'Recortes reenviados ao classificador de ângulo (modo adaptativo)')
+VALIDACAO = Contador('placas_validacao_total', 'Textos validados como placa (acerto) ou rejeitados (erro)',
+                     rotulos=('resultado',))
+PAREAMENTOS_MOTO = Contador('placas_pareamentos_moto_total', 'Combinações de 2 linhas testadas (placas de moto)')
+DB_LATENCIA = Histograma('placas_db_latencia_segundos', 'Latência das operações de banco',
+                         rotulos=('operacao',))
+DB_FALHAS = Contador('placas_db_falhas_total', 'Falhas nas operações de banco', rotulos=('operacao',))
+CACHE_OCR = Contador('placas_cache_ocr_total', 'Consultas ao cache de recortes do OCR (acerto ou erro)',
+                     rotulos=('resultado',))
+CACHE_OCR_ECONOMIA = Contador('placas_cache_ocr_economia_segundos_total',
+                              'Tempo de reconhecimento estimado economizado pelos acertos do cache')
+CACHE_OCR_TAMANHO = Medidor('placas_cache_ocr_tamanho', 'Recortes no cache do OCR')
+AMOSTRAGEM_INTERVALO = Medidor('placas_amostragem_intervalo_frames', 'Intervalo atual entre frames enviados ao OCR',
+                               rotulos=('fonte',))
+AMOSTRAGEM_DECISOES = Contador('placas_amostragem_decisoes_total',
+                               'Ajustes do controlador de amostragem (sobrecarga, folga, presenca, ocioso)',
+                               rotulos=('motivo',))
+CENA_ATIVA = Medidor('placas_cena_ativa', '1 quando há movimento ou veículo recente na cena', rotulos=('fonte',))
+LATENCIA_PONTA_A_PONTA = Histograma('placas_latencia_ponta_a_ponta_segundos',
+                                    'Da captura do frame ao fim do processamento dos frames enviados ao OCR')
+CAMERA_CONECTADA = Medidor('placas_camera_conectada', '1 quando a fonte de vídeo está conectada', rotulos=('fonte',))
+CAMERA_RECONEXOES = Contador('placas_camera_reconexoes_total', 'Reconexões da fonte de vídeo', rotulos=('fonte',))
+CLIPES_GRAVADOS = Contador('placas_clipes_gravados_total', 'Clipes de alerta gravados (ok ou erro)',
+                           rotulos=('resultado',))
+CLIPES_BUFFER_BYTES = Medidor('placas_clipes_buffer_bytes', 'Bytes de frames JPEG no anel de clipes')
+BARRAMENTO_SLOTS_LIVRES = Medidor('placas_barramento_slots_livres', 'Slots livres no barramento de frames')
+BARRAMENTO_ALOCACOES = Contador('placas_barramento_alocacoes_total',
+                                'Frames alocados fora do barramento (criação, nova resolução ou slots esgotados)')
+PARTICOES = Medidor('placas_particoes', 'Partições mensais existentes', rotulos=('tabela',))
+PARTICOES_REMOVIDAS = Contador('placas_particoes_removidas_total', 'Partições removidas pela retenção',
+                               rotulos=('acao',))
+EXPORTACAO_BYTES = Contador('placas_exportacao_bytes_total', 'Bytes entregues pelas exportações do histórico',
+                            rotulos=('tabela', 'formato'))
+DIARIO_SINCRONIZADOS = Contador('placas_diario_sincronizados_total', 'Eventos do diário local gravados no banco',
+                               rotulos=('tipo',))
+DIARIO_ATRASO = Medidor('placas_diario_atraso_segundos', 'Idade do evento mais antigo aguardando no diário local')
+CACHE_COOLDOWN = Medidor('placas_cache_cooldown_tamanho', 'Placas no cache de cooldown')
+FILA_PROFUNDIDADE = Medidor('placas_fila_profundidade', 'Itens aguardando em filas internas', rotulos=('fila',))
+CLIENTES_MJPEG = Medidor('placas_mjpeg_clientes', 'Streams MJPEG abertos')
+CLIENTES_EVENTOS = Medidor('placas_eventos_clientes', 'Painéis conectados ao stream de eventos')
+CODIFICACAO_JPEG = Histograma('placas_jpeg_codificacao_segundos', 'Tempo de codificação JPEG por frame')
+RENDERIZACAO = Histograma('placas_renderizacao_segundos', 'Tempo de renderização das páginas e fragmentos HTML',
+                          rotulos=('modelo',))
+CACHE_FRAGMENTOS = Contador('placas_cache_fragmentos_total', 'Consultas ao cache de fragmentos HTML (acerto ou erro)',
+                            rotulos=('resultado',))
+OBSERVACAO_BUSCA = Histograma('placas_observacao_busca_segundos',
+                              'Tempo da busca aproximada de uma leitura na lista de observação',
+                              buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01))
+OBSERVACAO_CORRESPONDENCIAS = Contador('placas_observacao_correspondencias_total',
+                                       'Possíveis correspondências de leituras com a lista de observação')
+OBSERVACAO_TAMANHO = Medidor('placas_observacao_placas', 'Placas na lista de observação (marcadas e não autorizadas)')
+
+
+class _HandlerMetricas(BaseHTTPRequestHandler):
+    """Serve /metrics para os scripts sem servidor web"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        corpo = REGISTRO.exportar().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_servidor_metricas(porta: int, host: str = '0.0.0.0'):
+    """Inicia um servidor HTTP mínimo em background expondo /metrics"""
+    servidor = ThreadingHTTPServer((host, porta), _HandlerMetricas)
+    thread = threading.Thread(target=servidor.serve_forever, name='servidor-metricas', daemon=True)
+    thread.start()
+    print(f"📊 Métricas disponíveis em http://{host}:{porta}/metrics")
+    return servidor
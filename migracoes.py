@@ -0,0 +1,319 @@
+"""
+Migrações versionadas do esquema no PostgreSQL (web_app_placas e detectar_placas_video)
+A versão aplicada fica em versao_esquema; na inicialização só as migrações com versão maior rodam
+(cada uma na sua transação, registrada junto com a mudança). Com o banco em dia, a inicialização
+faz uma única consulta.
+
+Para mudar o esquema, acrescente uma função ao fim de MIGRACOES (nunca altere uma já publicada).
+Os passos usam IF [NOT] EXISTS para que bancos criados antes das migrações adotem a versão 1 sem erro.
+
+Uso:
+    python migracoes.py            # aplica as pendentes
+    python migracoes.py --status   # mostra a versão atual e as pendentes
+"""
+
+import argparse
+
+import estatisticas
+import particoes
+
+# Número fixo do lock consultivo que serializa inicializações simultâneas (web, scripts)
+LOCK_MIGRACOES = 4610001
+
+
+# --- Passos ---
+def _v1_esquema_inicial(cursor, contexto: dict):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(100) NOT NULL,
+            cpf VARCHAR(14) UNIQUE,
+            telefone VARCHAR(20),
+            tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('PARTICULAR', 'OFICIAL')),
+            autorizado BOOLEAN DEFAULT TRUE,
+            observacoes TEXT,
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS veiculos (
+            id SERIAL PRIMARY KEY,
+            placa VARCHAR(10) UNIQUE NOT NULL,
+            tipo_placa VARCHAR(20) NOT NULL,
+            usuario_id INTEGER REFERENCES usuarios(id) ON DELETE SET NULL,
+            modelo VARCHAR(100),
+            cor VARCHAR(50),
+            tipo_veiculo VARCHAR(20) CHECK (tipo_veiculo IN ('CARRO', 'MOTO', 'CAMINHAO', 'OUTRO')),
+            marcado BOOLEAN DEFAULT FALSE,
+            motivo_marcacao TEXT,
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    if contexto['particionar_acessos']:
+        criar_acessos_particionada(cursor, contexto['meses_futuros'])
+    else:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS acessos (
+                id SERIAL PRIMARY KEY,
+                veiculo_id INTEGER REFERENCES veiculos(id) ON DELETE CASCADE,
+                placa VARCHAR(10) NOT NULL,
+                tipo_evento VARCHAR(20) CHECK (tipo_evento IN ('ENTRADA', 'SAIDA', 'DETECTADO')),
+                confianca DECIMAL(5, 4),
+                imagem_path VARCHAR(255),
+                camera VARCHAR(50),
+                data_acesso TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alertas (
+            id SERIAL PRIMARY KEY,
+            veiculo_id INTEGER REFERENCES veiculos(id) ON DELETE CASCADE,
+            placa VARCHAR(10) NOT NULL,
+            tipo_alerta VARCHAR(50) NOT NULL,
+            mensagem TEXT NOT NULL,
+            resolvido BOOLEAN DEFAULT FALSE,
+            data_alerta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            clipe VARCHAR(255),
+            camera VARCHAR(50)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_data ON acessos(data_acesso)")
+
+    # Bancos criados antes das colunas existirem
+    cursor.execute("ALTER TABLE alertas ADD COLUMN IF NOT EXISTS clipe VARCHAR(255)")
+    cursor.execute("ALTER TABLE alertas ADD COLUMN IF NOT EXISTS camera VARCHAR(50)")
+    cursor.execute("ALTER TABLE acessos ADD COLUMN IF NOT EXISTS camera VARCHAR(50)")
+
+    estatisticas.criar_tabelas(cursor)
+
+
+def _v2_indices_consultas(cursor, contexto: dict):
+    # veiculos.placa já tem o índice da constraint UNIQUE
+    cursor.execute("DROP INDEX IF EXISTS idx_veiculos_placa")
+    # Índice de um booleano quase sempre TRUE: substituído pelo índice parcial dos não resolvidos
+    cursor.execute("DROP INDEX IF EXISTS idx_alertas_resolvido")
+
+    # Histórico de uma placa (detalhes, exportação filtrada)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_placa_data ON acessos(placa, data_acesso)")
+    # JOIN usuarios -> veiculos e ON DELETE SET NULL ao remover um usuário
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_usuario ON veiculos(usuario_id)")
+    # Listas do painel e da página de usuários (ORDER BY ... LIMIT sem ordenar a tabela toda)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_data_cadastro ON veiculos(data_cadastro)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_usuarios_nome ON usuarios(nome)")
+    # Painel: alertas mais recentes e apenas os não resolvidos
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alertas_data ON alertas(data_alerta)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_alertas_nao_resolvidos ON alertas(data_alerta)
+        WHERE resolvido = FALSE
+    """)
+
+
+def _v3_chaves_eventos(cursor, contexto: dict):
+    # Chave gerada na captura (diario_local): reenviar um evento do diário não duplica a linha
+    cursor.execute("ALTER TABLE acessos ADD COLUMN IF NOT EXISTS chave_evento VARCHAR(32)")
+    # Em tabela particionada o índice único precisa conter a coluna de partição
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_acessos_chave_evento ON acessos(chave_evento, data_acesso)
+    """)
+    cursor.execute("ALTER TABLE alertas ADD COLUMN IF NOT EXISTS chave_evento VARCHAR(32)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_alertas_chave_evento ON alertas(chave_evento)")
+
+
+def _v4_acessos_unificados(cursor, contexto: dict):
+    # Mesmo esquema para o detector (armazenamento.py): tipo da placa lida em cada acesso
+    cursor.execute("ALTER TABLE acessos ADD COLUMN IF NOT EXISTS tipo_placa VARCHAR(20)")
+
+    # Detecções da antiga tabela do detectar_placas_video passam para acessos (origem -> camera)
+    cursor.execute("SELECT to_regclass('deteccoes_placas') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        return
+    cursor.execute("ALTER TABLE deteccoes_placas ADD COLUMN IF NOT EXISTS chave_evento VARCHAR(32)")
+    cursor.execute("SELECT MIN(data_deteccao) FROM deteccoes_placas")
+    inicio = cursor.fetchone()[0]
+    if particoes.tipo_tabela(cursor, 'acessos') == 'p' and inicio:
+        particoes.garantir_particoes(cursor, 'acessos', 'data_acesso', contexto['meses_futuros'], desde=inicio)
+    cursor.execute("""
+        INSERT INTO acessos (veiculo_id, placa, tipo_placa, tipo_evento, confianca, camera, data_acesso, chave_evento)
+        SELECT v.id, d.placa, d.tipo_placa, 'DETECTADO', d.confianca, d.origem,
+               COALESCE(d.data_deteccao, CURRENT_TIMESTAMP), d.chave_evento
+        FROM deteccoes_placas d
+        LEFT JOIN veiculos v ON v.placa = d.placa
+    """)
+    print(f"✓ {cursor.rowcount} detecções de deteccoes_placas copiadas para acessos")
+    # Mantida com outro nome para conferência; pode ser removida depois
+    cursor.execute("ALTER TABLE deteccoes_placas RENAME TO deteccoes_placas_migrada")
+
+
+def _v5_placas_unicas_geral(cursor, contexto: dict):
+    # Contador de placas únicas de todas as câmeras (preenchido a partir de estatisticas_placas_dia)
+    estatisticas.criar_tabelas(cursor)
+
+
+MIGRACOES = [
+    (1, "Esquema inicial (usuarios, veiculos, acessos, alertas, estatísticas)", _v1_esquema_inicial),
+    (2, "Índices das consultas frequentes; remove índices redundantes", _v2_indices_consultas),
+    (3, "Chave de idempotência dos eventos sincronizados do diário local", _v3_chaves_eventos),
+    (4, "acessos.tipo_placa; detecções do detector (deteccoes_placas) em acessos", _v4_acessos_unificados),
+    (5, "Placas únicas do dia em todas as câmeras (estatisticas_geral_dia)", _v5_placas_unicas_geral),
+]
+
+
+# --- Acessos particionada ---
+def criar_acessos_particionada(cursor, meses_futuros: int):
+    """
+    Cria acessos particionada por mês em data_acesso (com as partições atuais e futuras)
+    Uma tabela acessos comum já existente é convertida: os dados são copiados para as partições
+    """
+    legado = particoes.tipo_tabela(cursor, 'acessos') == 'r'
+    inicio_legado = None
+    if legado:
+        print("🔄 Convertendo a tabela acessos para partições mensais...")
+        cursor.execute("ALTER TABLE acessos RENAME TO acessos_legado")
+        cursor.execute("ALTER INDEX IF EXISTS idx_acessos_data RENAME TO idx_acessos_legado_data")
+        cursor.execute("ALTER INDEX IF EXISTS idx_acessos_placa_data RENAME TO idx_acessos_legado_placa_data")
+        cursor.execute("ALTER INDEX IF EXISTS idx_acessos_chave_evento RENAME TO idx_acessos_legado_chave_evento")
+        # A sequência dos ids continua a mesma na tabela nova
+        cursor.execute("ALTER SEQUENCE IF EXISTS acessos_id_seq OWNED BY NONE")
+        cursor.execute("ALTER TABLE acessos_legado ADD COLUMN IF NOT EXISTS camera VARCHAR(50)")
+        cursor.execute("ALTER TABLE acessos_legado ADD COLUMN IF NOT EXISTS chave_evento VARCHAR(32)")
+        cursor.execute("ALTER TABLE acessos_legado ADD COLUMN IF NOT EXISTS tipo_placa VARCHAR(20)")
+        cursor.execute("SELECT MIN(data_acesso) FROM acessos_legado")
+        inicio_legado = cursor.fetchone()[0]
+
+    cursor.execute("CREATE SEQUENCE IF NOT EXISTS acessos_id_seq")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS acessos (
+            id INTEGER NOT NULL DEFAULT nextval('acessos_id_seq'),
+            veiculo_id INTEGER REFERENCES veiculos(id) ON DELETE CASCADE,
+            placa VARCHAR(10) NOT NULL,
+            tipo_placa VARCHAR(20),
+            tipo_evento VARCHAR(20) CHECK (tipo_evento IN ('ENTRADA', 'SAIDA', 'DETECTADO')),
+            confianca DECIMAL(5, 4),
+            imagem_path VARCHAR(255),
+            camera VARCHAR(50),
+            chave_evento VARCHAR(32),
+            data_acesso TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, data_acesso)
+        ) PARTITION BY RANGE (data_acesso)
+    """)
+    cursor.execute("ALTER SEQUENCE acessos_id_seq OWNED BY acessos.id")
+    particoes.garantir_particoes(cursor, 'acessos', 'data_acesso', meses_futuros, desde=inicio_legado)
+
+    if legado:
+        cursor.execute("""
+            INSERT INTO acessos (id, veiculo_id, placa, tipo_placa, tipo_evento, confianca, imagem_path, camera,
+                                 chave_evento, data_acesso)
+            SELECT id, veiculo_id, placa, tipo_placa, tipo_evento, confianca, imagem_path, camera, chave_evento,
+                   COALESCE(data_acesso, CURRENT_TIMESTAMP)
+            FROM acessos_legado
+        """)
+        print(f"✓ {cursor.rowcount} acessos copiados para as partições")
+        cursor.execute("DROP TABLE acessos_legado")
+        # Índices que a tabela comum já tinha recebido das migrações
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_data ON acessos(data_acesso)")
+        if versao_atual(cursor) >= 2:
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_placa_data ON acessos(placa, data_acesso)")
+        if versao_atual(cursor) >= 3:
+            cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_acessos_chave_evento ON acessos(chave_evento, data_acesso)
+            """)
+
+
+def garantir_acessos_particionada(conn, meses_futuros: int) -> bool:
+    """Converte acessos se o particionamento foi ligado depois das migrações; True se converteu"""
+    with conn.cursor() as cursor:
+        convertida = particoes.tipo_tabela(cursor, 'acessos') == 'r'
+        if convertida:
+            # Web e detector podem subir juntos: só um converte, o outro confere de novo após o lock
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (LOCK_MIGRACOES,))
+            convertida = particoes.tipo_tabela(cursor, 'acessos') == 'r'
+            if convertida:
+                criar_acessos_particionada(cursor, meses_futuros)
+    conn.commit()
+    return convertida
+
+
+# --- Versões ---
+def versao_atual(cursor) -> int:
+    """Maior versão aplicada (0 se a tabela de versões ainda não existir)"""
+    cursor.execute("SELECT to_regclass('versao_esquema') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        return 0
+    cursor.execute("SELECT COALESCE(MAX(versao), 0) FROM versao_esquema")
+    return cursor.fetchone()[0]
+
+
+def pendentes(cursor, migracoes=MIGRACOES) -> list:
+    atual = versao_atual(cursor)
+    return [migracao for migracao in migracoes if migracao[0] > atual]
+
+
+def aplicar_migracoes(conn, contexto: dict, migracoes=MIGRACOES) -> list:
+    """
+    Aplica as migrações pendentes em ordem, cada uma numa transação com o registro da versão
+
+    Args:
+        contexto: opções dos passos ('particionar_acessos', 'meses_futuros')
+
+    Returns:
+        Versões aplicadas (vazia se o banco já estava em dia)
+    """
+    with conn.cursor() as cursor:
+        a_aplicar = pendentes(cursor, migracoes)
+    conn.commit()
+    if not a_aplicar:
+        return []
+
+    aplicadas = []
+    for versao, descricao, passo in a_aplicar:
+        try:
+            with conn.cursor() as cursor:
+                # Outra instância pode estar migrando ao mesmo tempo: espera e confere de novo
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (LOCK_MIGRACOES,))
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS versao_esquema (
+                        versao INTEGER PRIMARY KEY,
+                        descricao TEXT NOT NULL,
+                        aplicada_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                if versao_atual(cursor) >= versao:
+                    conn.commit()
+                    continue
+                passo(cursor, contexto)
+                cursor.execute("INSERT INTO versao_esquema (versao, descricao) VALUES (%s, %s)", (versao, descricao))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            print(f"❌ Falha na migração {versao} ({descricao})")
+            raise
+        print(f"✓ Migração {versao} aplicada: {descricao}")
+        aplicadas.append(versao)
+    return aplicadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações do esquema do web_app_placas")
+    parser.add_argument('--status', action='store_true', help="Só mostra a versão atual e as pendentes")
+    args = parser.parse_args()
+
+    import psycopg2
+    import configuracao as origem
+    conn = psycopg2.connect(**origem.POSTGRES_CONFIG)
+    try:
+        if args.status:
+            with conn.cursor() as cursor:
+                print(f"Versão atual: {versao_atual(cursor)}")
+                for versao, descricao, _ in pendentes(cursor):
+                    print(f"  pendente {versao}: {descricao}")
+            return
+        aplicadas = aplicar_migracoes(conn, origem.contexto_migracoes())
+        print(f"✅ {len(aplicadas)} migrações aplicadas" if aplicadas else "✅ Esquema já está na versão atual")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Templates HTML das páginas
+- RegistroModelos: templates compilados uma única vez na inicialização (não a cada requisição)
+- CacheFragmentos: trechos que raramente mudam (tabela de veículos, lista de usuários), invalidados nos cadastros
+- comprimir_resposta: gzip das respostas de texto (after_request do Flask)
+"""
+
+import gzip
+import threading
+import time
+
+from flask import render_template, request
+from jinja2 import ChoiceLoader, DictLoader
+from markupsafe import Markup
+
+from metricas import CACHE_FRAGMENTOS, RENDERIZACAO
+
+VALIDADE_FRAGMENTOS = 300  # Segundos; rede de segurança para mudanças feitas fora deste processo
+NIVEL_GZIP = 6
+TAMANHO_MINIMO_GZIP = 1024  # Bytes; abaixo disso o cabeçalho do gzip não compensa
+TIPOS_COMPRIMIVEIS = ('text/', 'application/json', 'application/javascript')
+
+
+class RegistroModelos:
+    """Templates nomeados servidos pelo carregador do Flask (o Jinja compila e guarda cada um uma vez)"""
+
+    def __init__(self, app):
+        self.app = app
+        self.fontes = {}
+        app.jinja_loader = ChoiceLoader([DictLoader(self.fontes)] + ([app.jinja_loader] if app.jinja_loader else []))
+
+    def registrar(self, nome: str, fonte: str) -> str:
+        self.fontes[nome] = fonte
+        return nome
+
+    def compilar(self):
+        """Compila todos os templates registrados (chamado na inicialização, fora das requisições)"""
+        inicio = time.perf_counter()
+        for nome in self.fontes:
+            self.app.jinja_env.get_template(nome)
+        print(f"✅ {len(self.fontes)} templates compilados em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    def renderizar(self, nome: str, **contexto) -> str:
+        with RENDERIZACAO.rotulo(nome).cronometrar():
+            return render_template(nome, **contexto)
+
+
+class CacheFragmentos:
+    """
+    Fragmentos HTML já renderizados
+
+    obter() chama gerar() apenas se o fragmento não estiver em cache (ou tiver expirado);
+    invalidar() é chamado quando os dados por trás dele mudam (ex.: cadastro de veículo).
+    """
+
+    def __init__(self, validade: float = VALIDADE_FRAGMENTOS):
+        self.validade = validade
+        self.fragmentos = {}  # nome -> (valor, gerado_em, geracao)
+        self.geracoes = {}  # nome -> incrementado a cada invalidação
+        self.lock = threading.Lock()
+
+    def obter(self, nome: str, gerar):
+        """
+        Args:
+            gerar: função sem argumentos que renderiza o fragmento (pode retornar uma tupla com dados extras)
+        """
+        with self.lock:
+            item = self.fragmentos.get(nome)
+            geracao = self.geracoes.get(nome, 0)
+        if item is not None and item[2] == geracao and time.monotonic() - item[1] < self.validade:
+            CACHE_FRAGMENTOS.rotulo('acerto').inc()
+            return item[0]
+
+        CACHE_FRAGMENTOS.rotulo('erro').inc()
+        valor = gerar()
+        with self.lock:
+            # Invalidado durante a geração: não guarda um valor que pode estar desatualizado
+            if self.geracoes.get(nome, 0) == geracao:
+                self.fragmentos[nome] = (valor, time.monotonic(), geracao)
+        return valor
+
+    def invalidar(self, *nomes):
+        with self.lock:
+            for nome in nomes:
+                self.geracoes[nome] = self.geracoes.get(nome, 0) + 1
+                self.fragmentos.pop(nome, None)
+
+
+def marcar_seguro(html: str) -> Markup:
+    """Fragmento já renderizado pelo Jinja (com autoescape), inserido sem escapar de novo"""
+    return Markup(html)
+
+
+def comprimir_resposta(resposta):
+    """Comprime com gzip respostas de texto quando o cliente aceita (não se aplica a streams)"""
+    if (resposta.direct_passthrough or resposta.is_streamed or resposta.status_code != 200 or
+            'Content-Encoding' in resposta.headers or
+            not (resposta.mimetype or '').startswith(TIPOS_COMPRIMIVEIS) or
+            'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+        return resposta
+
+    corpo = resposta.get_data()
+    if len(corpo) < TAMANHO_MINIMO_GZIP:
+        return resposta
+    resposta.set_data(gzip.compress(corpo, NIVEL_GZIP))
+    resposta.headers['Content-Encoding'] = 'gzip'
+    resposta.vary.add('Accept-Encoding')
+    return resposta
@@ -0,0 +1,411 @@
+"""
+Carregamento e execução do PaddleOCR
+- Configuração validada do motor (threads, MKLDNN, variante do modelo, tamanho de entrada, lote)
+- CarregadorOCR: importa o paddle e carrega o modelo em background, com aquecimento
+- executar_ocr: executa o OCR medindo o tempo por etapa (detecção, classificação, reconhecimento)
+- executar_ocr_adaptativo: retifica cada placa e só usa o classificador de ângulo como fallback
+- Cache opcional de recortes por hash perceptual na frente do reconhecedor
+"""
+
+import difflib
+import json
+import os
+import re
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from metricas import OCR_LATENCIA, FRAMES_OCR, OCR_FALLBACK_CLS
+
+# Configuração padrão do motor OCR (pode ser sobrescrita por config_ocr.json)
+ARQUIVO_CONFIG_OCR = "config_ocr.json"
+PASTA_MODELOS = "modelos"
+
+CONFIG_OCR_PADRAO = {
+    'cpu_threads': min(os.cpu_count() or 4, 8),  # Threads de inferência na CPU
+    'enable_mkldnn': True,  # Aceleração oneDNN (MKLDNN) na CPU
+    'variante': 'mobile',  # 'mobile' (rápido) ou 'server' (mais preciso, requer modelos em PASTA_MODELOS)
+    'det_limit_side_len': 960,  # Maior lado da imagem enviada ao detector
+    'rec_batch_num': 6,  # Recortes reconhecidos por lote
+    'use_angle_cls': True,  # Carrega o classificador de ângulo do texto
+    'cls_adaptativo': True,  # Classificador só como fallback (leitura fraca/inválida) em vez de em todo recorte
+    'reconhecedor': 'geral',  # 'geral' (dicionário inglês completo) ou 'placas' (A-Z/0-9 com gramática da placa)
+    'cache_tamanho': 256,  # Recortes guardados no cache do reconhecedor (0 = desativado)
+    'cache_distancia': 8,  # Distância de Hamming máxima (bits de 256) para reaproveitar uma leitura
+}
+
+RECONHECEDORES = ('geral', 'placas')
+
+# Diretórios dos modelos por variante (None = modelo padrão baixado pelo PaddleOCR)
+MODELOS_VARIANTE = {
+    'mobile': {'det_model_dir': None, 'rec_model_dir': None},
+    'server': {
+        'det_model_dir': os.path.join(PASTA_MODELOS, 'ch_PP-OCRv4_det_server_infer'),
+        'rec_model_dir': os.path.join(PASTA_MODELOS, 'ch_PP-OCRv4_rec_server_infer'),
+    },
+}
+# Idioma passado ao PaddleOCR por variante: define o dicionário de caracteres (rec_char_dict_path) do reconhecedor.
+# O reconhecedor server do PP-OCRv4 é o chinês (ppocr_keys_v1, que inclui A-Z e 0-9); com o dicionário inglês
+# as classes da rede não correspondem aos caracteres e a decodificação do CTC sai errada
+IDIOMA_VARIANTE = {'mobile': 'en', 'server': 'ch'}
+
+# Placa sintética lida no aquecimento; a leitura precisa se parecer com ela (confere modelo e dicionário)
+TEXTO_AQUECIMENTO = "ABC1D23"
+SIMILARIDADE_MINIMA_AQUECIMENTO = 0.5
+
+# Estados do carregador
+ESTADO_PENDENTE = 'pendente'
+ESTADO_CARREGANDO = 'carregando'
+ESTADO_AQUECENDO = 'aquecendo'
+ESTADO_PRONTO = 'pronto'
+ESTADO_ERRO = 'erro'
+
+
+def configurar_dispositivo():
+    """Configura GPU se disponível (importa o paddle apenas aqui)"""
+    import paddle
+
+    gpu_disponivel = paddle.device.is_compiled_with_cuda()
+
+    if gpu_disponivel:
+        try:
+            paddle.set_device('gpu')
+            print("✓ GPU ATIVADA (CUDA)")
+            return 'gpu'
+        except:
+            paddle.set_device('cpu')
+            print("⚠ Usando CPU")
+    else:
+        paddle.set_device('cpu')
+        print("⚠ Usando CPU (CUDA não disponível)")
+    return 'cpu'
+
+
+def validar_config_ocr(config: dict = None) -> dict:
+    """
+    Completa a configuração com os valores padrão e valida cada campo
+
+    Raises:
+        ValueError: se algum campo for desconhecido ou inválido
+    """
+    final = dict(CONFIG_OCR_PADRAO)
+    final.update(config or {})
+
+    desconhecidos = set(final) - set(CONFIG_OCR_PADRAO)
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos na configuração do OCR: {', '.join(sorted(desconhecidos))}")
+
+    erros = []
+    if not isinstance(final['cpu_threads'], int) or not 1 <= final['cpu_threads'] <= 64:
+        erros.append("cpu_threads deve ser um inteiro entre 1 e 64")
+    if not isinstance(final['enable_mkldnn'], bool):
+        erros.append("enable_mkldnn deve ser true/false")
+    if final['variante'] not in MODELOS_VARIANTE:
+        erros.append(f"variante deve ser uma de: {', '.join(MODELOS_VARIANTE)}")
+    if (not isinstance(final['det_limit_side_len'], int) or not 320 <= final['det_limit_side_len'] <= 2560
+            or final['det_limit_side_len'] % 32 != 0):
+        erros.append("det_limit_side_len deve ser múltiplo de 32 entre 320 e 2560")
+    if not isinstance(final['rec_batch_num'], int) or not 1 <= final['rec_batch_num'] <= 64:
+        erros.append("rec_batch_num deve ser um inteiro entre 1 e 64")
+    if not isinstance(final['use_angle_cls'], bool):
+        erros.append("use_angle_cls deve ser true/false")
+    if not isinstance(final['cls_adaptativo'], bool):
+        erros.append("cls_adaptativo deve ser true/false")
+    if final['reconhecedor'] not in RECONHECEDORES:
+        erros.append(f"reconhecedor deve ser um de: {', '.join(RECONHECEDORES)}")
+    if not isinstance(final['cache_tamanho'], int) or not 0 <= final['cache_tamanho'] <= 100000:
+        erros.append("cache_tamanho deve ser um inteiro entre 0 e 100000")
+    if not isinstance(final['cache_distancia'], int) or not 0 <= final['cache_distancia'] <= 64:
+        erros.append("cache_distancia deve ser um inteiro entre 0 e 64")
+
+    if not erros and final['variante'] != 'mobile':
+        for pasta in MODELOS_VARIANTE[final['variante']].values():
+            if pasta and not os.path.isdir(pasta):
+                erros.append(f"Modelo da variante '{final['variante']}' não encontrado em {pasta}")
+
+    if erros:
+        raise ValueError("Configuração do OCR inválida: " + "; ".join(erros))
+    return final
+
+
+def carregar_config_ocr(caminho: str = ARQUIVO_CONFIG_OCR, **sobrescritas) -> dict:
+    """Lê a configuração do arquivo (se existir), aplica sobrescritas e valida"""
+    config = {}
+    if caminho and os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as arquivo:
+            config = json.load(arquivo)
+        # Campos informativos gravados pelo ajuste automático
+        config.pop('_ajuste', None)
+    config.update(sobrescritas)
+    return validar_config_ocr(config)
+
+
+def salvar_config_ocr(config: dict, caminho: str = ARQUIVO_CONFIG_OCR, **informacoes):
+    """Grava a configuração validada (com informações opcionais do ajuste)"""
+    dados = validar_config_ocr(config)
+    if informacoes:
+        dados['_ajuste'] = informacoes
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+
+
+def criar_ocr(config: dict = None):
+    """Instancia o PaddleOCR com a configuração validada"""
+    from paddleocr import PaddleOCR
+
+    config = validar_config_ocr(config)
+    parametros = {
+        'lang': IDIOMA_VARIANTE[config['variante']],
+        'use_angle_cls': config['use_angle_cls'],
+        'cpu_threads': config['cpu_threads'],
+        'enable_mkldnn': config['enable_mkldnn'],
+        'det_limit_side_len': config['det_limit_side_len'],
+        'rec_batch_num': config['rec_batch_num'],
+        'show_log': False,
+    }
+    for chave, pasta in MODELOS_VARIANTE[config['variante']].items():
+        if pasta:
+            parametros[chave] = pasta
+
+    ocr = PaddleOCR(**parametros)
+
+    if config['reconhecedor'] == 'placas':
+        # Mesma interface do text_recognizer: vale tanto para o modo adaptativo quanto para o completo
+        from reconhecedor_placas import ReconhecedorPlacas
+        ocr.text_recognizer = ReconhecedorPlacas(ocr.text_recognizer)
+
+    if config['cache_tamanho']:
+        # Envolve o reconhecedor escolhido: acertos no cache pulam a rede
+        from cache_ocr import CacheOCRPerceptual, ReconhecedorComCache
+        cache = CacheOCRPerceptual(config['cache_tamanho'], config['cache_distancia'])
+        ocr.text_recognizer = ReconhecedorComCache(ocr.text_recognizer, cache)
+
+    return ocr
+
+
+def gerar_imagem_aquecimento(texto: str = TEXTO_AQUECIMENTO):
+    """Gera uma placa sintética (fundo branco, texto preto) para a primeira inferência"""
+    imagem = np.full((160, 520, 3), 255, dtype=np.uint8)
+    cv2.rectangle(imagem, (5, 5), (514, 154), (0, 0, 0), 4)
+    cv2.putText(imagem, texto, (30, 115), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 8)
+    return imagem
+
+
+def aquecer_ocr(ocr, config: dict) -> str:
+    """
+    Primeira inferência com a placa sintética, conferindo a leitura (um frame de teste da variante)
+
+    Returns:
+        Texto lido (A-Z/0-9)
+
+    Raises:
+        RuntimeError: se a leitura não se parece com a placa (modelo e dicionário de caracteres incompatíveis)
+    """
+    resultado = ocr.ocr(gerar_imagem_aquecimento(), cls=config['use_angle_cls'])
+    linhas = resultado[0] if resultado and resultado[0] else []
+    lido = re.sub(r'[^A-Z0-9]', '', ''.join(texto for _, (texto, _) in linhas).upper())
+    similaridade = difflib.SequenceMatcher(None, lido, TEXTO_AQUECIMENTO).ratio()
+    if similaridade < SIMILARIDADE_MINIMA_AQUECIMENTO:
+        raise RuntimeError(f"variante '{config['variante']}' leu '{lido}' na placa de teste {TEXTO_AQUECIMENTO} "
+                           "(modelo e dicionário de caracteres não correspondem?)")
+    return lido
+
+
+class CarregadorOCR:
+    """Carrega o modelo OCR em background e informa quando está pronto"""
+
+    def __init__(self, config: dict = None, aquecer: bool = True):
+        self.config = validar_config_ocr(config)
+        self.aquecer = aquecer
+        self.ocr = None
+        self.estado = ESTADO_PENDENTE
+        self.erro = None
+        self.dispositivo = None
+        self.tempos = {}
+        self.pronto_evento = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def pronto(self) -> bool:
+        return self.estado == ESTADO_PRONTO
+
+    def iniciar(self):
+        """Dispara o carregamento em background (chamadas repetidas são ignoradas)"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._carregar, name='carregador-ocr', daemon=True)
+            self.thread.start()
+
+    def obter(self, timeout: float = None):
+        """Aguarda o modelo ficar pronto e retorna a instância do PaddleOCR"""
+        self.iniciar()
+        self.pronto_evento.wait(timeout)
+        if self.estado == ESTADO_ERRO:
+            raise RuntimeError(f"Falha ao carregar o modelo OCR: {self.erro}")
+        return self.ocr
+
+    def _carregar(self):
+        inicio = time.perf_counter()
+        try:
+            self.estado = ESTADO_CARREGANDO
+            print("\nCarregando modelo OCR...")
+            self.dispositivo = configurar_dispositivo()
+
+            ocr = criar_ocr(self.config)
+            self.tempos['carregamento'] = time.perf_counter() - inicio
+            print(f"✓ Modelo OCR carregado ({self.tempos['carregamento']:.1f}s) - "
+                  f"{self.config['variante']}, {self.config['cpu_threads']} threads, "
+                  f"MKLDNN {'ativo' if self.config['enable_mkldnn'] else 'inativo'}, "
+                  f"det {self.config['det_limit_side_len']}px, lote {self.config['rec_batch_num']}, "
+                  f"reconhecedor {self.config['reconhecedor']}, "
+                  f"cache {self.config['cache_tamanho'] or 'desativado'}")
+
+            if self.aquecer:
+                self.estado = ESTADO_AQUECENDO
+                inicio_aquecimento = time.perf_counter()
+                lido = aquecer_ocr(ocr, self.config)
+                self.tempos['aquecimento'] = time.perf_counter() - inicio_aquecimento
+                print(f"✓ OCR aquecido ({self.tempos['aquecimento']:.2f}s, leu {lido})")
+
+            self.ocr = ocr
+            self.estado = ESTADO_PRONTO
+        except Exception as e:
+            self.erro = str(e)
+            self.estado = ESTADO_ERRO
+            print(f"❌ Erro ao carregar modelo OCR: {e}")
+        finally:
+            self.pronto_evento.set()
+
+    def status(self) -> dict:
+        cache = getattr(getattr(self.ocr, 'text_recognizer', None), 'cache', None)
+        return {
+            'estado': self.estado,
+            'dispositivo': self.dispositivo,
+            'config': dict(self.config),
+            'erro': self.erro,
+            'tempos': dict(self.tempos),
+            'cache': cache.estatisticas() if cache is not None else None
+        }
+
+
+def executar_ocr(ocr, imagem, cls: bool = True) -> list:
+    """
+    Executa o OCR em uma imagem BGR e registra a latência de cada etapa
+
+    Returns:
+        Lista no mesmo formato de ocr.ocr(imagem)[0]: [[coords, (texto, confianca)], ...]
+    """
+    FRAMES_OCR.inc()
+    inicio = time.perf_counter()
+
+    if hasattr(ocr, 'text_detector'):
+        # TextSystem devolve os tempos de cada etapa junto com o resultado
+        dt_boxes, rec_res, tempos = ocr(imagem, cls)
+        for etapa in ('det', 'cls', 'rec'):
+            if tempos.get(etapa):
+                OCR_LATENCIA.rotulo(etapa).observar(tempos[etapa])
+        linhas = [[box.tolist(), res] for box, res in zip(dt_boxes or [], rec_res or [])]
+    else:
+        resultado = ocr.ocr(imagem, cls=cls)
+        linhas = resultado[0] if resultado and resultado[0] else []
+
+    OCR_LATENCIA.rotulo('total').observar(time.perf_counter() - inicio)
+    return linhas
+
+
+# Formatos aceitos sem fallback: placa completa ou metade de placa de moto (2 linhas)
+PADRAO_TEXTO_PLACA = re.compile(r'^([A-Z]{3}\d[A-Z0-9]\d{2}|[A-Z]{3}|\d[A-Z0-9]\d{2})$')
+
+
+def parece_placa(texto: str) -> bool:
+    """Verifica se o texto lido já tem formato de placa (ou de uma linha de placa de moto)"""
+    return bool(PADRAO_TEXTO_PLACA.match(re.sub(r'[^A-Z0-9]', '', texto.upper())))
+
+
+def ordenar_caixas(caixas: list) -> list:
+    """Ordena as caixas de cima para baixo e da esquerda para a direita"""
+    caixas = sorted(caixas, key=lambda c: (c[0][1], c[0][0]))
+    for i in range(len(caixas) - 1):
+        for j in range(i, -1, -1):
+            # Caixas na mesma linha (até 10px de diferença) ficam em ordem horizontal
+            if abs(caixas[j + 1][0][1] - caixas[j][0][1]) < 10 and caixas[j + 1][0][0] < caixas[j][0][0]:
+                caixas[j], caixas[j + 1] = caixas[j + 1], caixas[j]
+            else:
+                break
+    return caixas
+
+
+def retificar_quadrilatero(imagem, caixa):
+    """Recorta o quadrilátero da placa com transformação de perspectiva (vista frontal)"""
+    pontos = np.asarray(caixa, dtype=np.float32)
+    largura = int(max(np.linalg.norm(pontos[0] - pontos[1]), np.linalg.norm(pontos[2] - pontos[3])))
+    altura = int(max(np.linalg.norm(pontos[0] - pontos[3]), np.linalg.norm(pontos[1] - pontos[2])))
+    largura, altura = max(largura, 1), max(altura, 1)
+
+    destino = np.float32([[0, 0], [largura, 0], [largura, altura], [0, altura]])
+    matriz = cv2.getPerspectiveTransform(pontos, destino)
+    recorte = cv2.warpPerspective(imagem, matriz, (largura, altura),
+                                  borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+
+    # Texto na vertical (placa girada ~90°): deita o recorte
+    if altura / largura >= 1.5:
+        recorte = np.rot90(recorte)
+    return recorte
+
+
+def executar_ocr_adaptativo(ocr, imagem, confianca_minima: float = 0.9, usar_cls: bool = True) -> list:
+    """
+    Detecta, retifica cada caixa e reconhece sem o classificador de ângulo.
+    O classificador só roda nos recortes com confiança baixa ou texto fora do formato de placa.
+
+    Returns:
+        Lista no mesmo formato de executar_ocr(): [[coords, (texto, confianca)], ...]
+    """
+    if not hasattr(ocr, 'text_detector'):
+        return executar_ocr(ocr, imagem, cls=usar_cls)
+
+    FRAMES_OCR.inc()
+    inicio = time.perf_counter()
+
+    caixas, tempo_det = ocr.text_detector(imagem)
+    OCR_LATENCIA.rotulo('det').observar(tempo_det)
+    if caixas is None or len(caixas) == 0:
+        OCR_LATENCIA.rotulo('total').observar(time.perf_counter() - inicio)
+        return []
+
+    caixas = ordenar_caixas(list(caixas))
+    recortes = [retificar_quadrilatero(imagem, caixa) for caixa in caixas]
+
+    resultados, tempo_rec = ocr.text_recognizer(recortes)
+    OCR_LATENCIA.rotulo('rec').observar(tempo_rec)
+
+    # Fallback: classificador de ângulo apenas nos recortes suspeitos
+    suspeitos = [i for i, (texto, confianca) in enumerate(resultados)
+                 if confianca < confianca_minima or not parece_placa(texto)]
+
+    if suspeitos and usar_cls and getattr(ocr, 'text_classifier', None) is not None:
+        OCR_FALLBACK_CLS.inc(len(suspeitos))
+        corrigidos, _, tempo_cls = ocr.text_classifier([recortes[i] for i in suspeitos])
+        OCR_LATENCIA.rotulo('cls').observar(tempo_cls)
+
+        novos, tempo_rec = ocr.text_recognizer(corrigidos)
+        OCR_LATENCIA.rotulo('rec').observar(tempo_rec)
+
+        for i, novo in zip(suspeitos, novos):
+            if novo[1] > resultados[i][1]:
+                resultados[i] = novo
+
+    linhas = [[np.asarray(caixa).tolist(), tuple(res)] for caixa, res in zip(caixas, resultados)]
+    OCR_LATENCIA.rotulo('total').observar(time.perf_counter() - inicio)
+    return linhas
+
+
+def reconhecer(ocr, imagem, config: dict, confianca_minima: float = 0.9) -> list:
+    """Executa o OCR no modo definido pela configuração (adaptativo ou completo)"""
+    if config['cls_adaptativo']:
+        return executar_ocr_adaptativo(ocr, imagem, confianca_minima, usar_cls=config['use_angle_cls'])
+    return executar_ocr(ocr, imagem, cls=config['use_angle_cls'])
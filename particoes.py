@@ -0,0 +1,283 @@
+"""
+Particionamento mensal por data (PostgreSQL, partições declarativas por RANGE)
+- garantir_particoes: cria as partições do mês atual e dos próximos meses (e a partição padrão)
+- aplicar_retencao: partições mais antigas que a retenção são arquivadas em CSV gzip e removidas, assim como
+  as linhas antigas que ficaram na partição padrão
+- ManutencaoParticoes: thread que repete as duas tarefas periodicamente com conexão própria
+
+As partições se chamam <tabela>_AAAA_MM; linhas fora de qualquer mês criado caem em <tabela>_padrao
+e são movidas para a partição do mês quando ela é criada.
+"""
+
+import gzip
+import os
+import re
+import threading
+from datetime import date, datetime
+
+from psycopg2 import sql
+
+from metricas import PARTICOES, PARTICOES_REMOVIDAS
+
+CONFIG_PARTICOES_PADRAO = {
+    'meses_futuros': 2,  # Partições criadas com antecedência
+    'retencao_meses': 0,  # Meses completos mantidos no banco além do atual (0 = sem retenção)
+    'acao_retencao': 'arquivar',  # 'arquivar' (CSV gzip em pasta_arquivo, depois remove) ou 'descartar'
+    'pasta_arquivo': 'arquivo_acessos',
+    'intervalo_horas': 6,  # Intervalo entre execuções da manutenção
+}
+
+ACOES_RETENCAO = ('arquivar', 'descartar')
+
+
+def validar_config_particoes(config: dict = None) -> dict:
+    """
+    Completa a configuração com os valores padrão e valida os limites
+
+    Raises:
+        ValueError: se algum campo for desconhecido ou inválido
+    """
+    final = dict(CONFIG_PARTICOES_PADRAO)
+    final.update(config or {})
+
+    desconhecidos = set(final) - set(CONFIG_PARTICOES_PADRAO)
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos na configuração de partições: {', '.join(sorted(desconhecidos))}")
+
+    erros = []
+    if final['meses_futuros'] < 1:
+        erros.append("meses_futuros deve ser ao menos 1")
+    if final['retencao_meses'] < 0:
+        erros.append("retencao_meses não pode ser negativo")
+    if final['acao_retencao'] not in ACOES_RETENCAO:
+        erros.append(f"acao_retencao deve ser uma de: {', '.join(ACOES_RETENCAO)}")
+    if final['intervalo_horas'] <= 0:
+        erros.append("intervalo_horas deve ser positivo")
+    if erros:
+        raise ValueError("Configuração de partições inválida: " + "; ".join(erros))
+    return final
+
+
+# --- Meses ---
+def inicio_mes(momento=None) -> date:
+    momento = momento or datetime.now()
+    return date(momento.year, momento.month, 1)
+
+
+def somar_meses(mes: date, quantidade: int) -> date:
+    indice = mes.year * 12 + mes.month - 1 + quantidade
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def nome_particao(tabela: str, mes: date) -> str:
+    return f"{tabela}_{mes:%Y_%m}"
+
+
+# --- Catálogo ---
+def tipo_tabela(cursor, tabela: str):
+    """'p' (particionada), 'r' (tabela comum) ou None se não existir"""
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (tabela,))
+    linha = cursor.fetchone()
+    return linha[0] if linha else None
+
+
+def listar_particoes(cursor, tabela: str) -> dict:
+    """Partições mensais existentes: {mês (date): nome}"""
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+    """, (tabela,))
+    padrao = re.compile(rf'^{re.escape(tabela)}_(\d{{4}})_(\d{{2}})$')
+    particoes = {}
+    for (nome,) in cursor.fetchall():
+        encontrado = padrao.match(nome)
+        if encontrado:
+            particoes[date(int(encontrado.group(1)), int(encontrado.group(2)), 1)] = nome
+    return particoes
+
+
+# --- Criação ---
+def garantir_particoes(cursor, tabela: str, coluna: str, meses_futuros: int, desde: date = None) -> list:
+    """
+    Cria a partição padrão e as partições mensais de `desde` (padrão: mês atual) até `meses_futuros` à frente
+
+    Returns:
+        Nomes das partições criadas
+    """
+    cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} DEFAULT").format(
+        sql.Identifier(f"{tabela}_padrao"), sql.Identifier(tabela)))
+
+    existentes = listar_particoes(cursor, tabela)
+    atual = inicio_mes()
+    mes = min(inicio_mes(desde), atual) if desde else atual
+    criadas = []
+    while mes <= somar_meses(atual, meses_futuros):
+        if mes not in existentes:
+            criar_particao(cursor, tabela, coluna, mes)
+            criadas.append(nome_particao(tabela, mes))
+        mes = somar_meses(mes, 1)
+    PARTICOES.rotulo(tabela).set(len(existentes) + len(criadas))
+    return criadas
+
+
+def criar_particao(cursor, tabela: str, coluna: str, mes: date):
+    """
+    Cria a partição do mês; linhas do mês que estiverem na partição padrão são movidas para ela
+    (o PostgreSQL recusa criar a partição enquanto a padrão tiver linhas do intervalo)
+    """
+    nome = sql.Identifier(nome_particao(tabela, mes))
+    pai = sql.Identifier(tabela)
+    padrao = sql.Identifier(f"{tabela}_padrao")
+    col = sql.Identifier(coluna)
+    inicio, fim = mes, somar_meses(mes, 1)
+
+    cursor.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {} WHERE {} >= %s AND {} < %s)").format(padrao, col, col),
+                   (inicio, fim))
+    if not cursor.fetchone()[0]:
+        cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(nome, pai),
+                       (inicio, fim))
+        return
+
+    cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(nome, pai))
+    cursor.execute(sql.SQL("""
+        WITH movidas AS (DELETE FROM {} WHERE {} >= %s AND {} < %s RETURNING *)
+        INSERT INTO {} SELECT * FROM movidas
+    """).format(padrao, col, col, nome), (inicio, fim))
+    movidas = cursor.rowcount
+    cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)").format(pai, nome),
+                   (inicio, fim))
+    print(f"📦 {movidas} linhas movidas da partição padrão para {nome.string}")
+
+
+# --- Retenção ---
+def arquivar_particao(cursor, nome: str, pasta: str, filtro=None, parametros=None, arquivo: str = None) -> str:
+    """
+    Exporta a partição para <pasta>/<nome>.csv.gz (arquivo temporário renomeado no fim)
+
+    Args:
+        filtro: condição (sql.Composable) das linhas exportadas; None exporta todas
+        arquivo: nome do arquivo sem extensão (padrão: o nome da partição)
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"{arquivo or nome}.csv.gz")
+    temporario = caminho + '.parcial'
+    consulta = sql.SQL("COPY (SELECT * FROM {} WHERE {}) TO STDOUT WITH CSV HEADER").format(
+        sql.Identifier(nome), filtro if filtro is not None else sql.SQL("TRUE"))
+    consulta = cursor.mogrify(consulta.as_string(cursor), parametros).decode()
+    with gzip.open(temporario, 'wb') as saida:
+        cursor.copy_expert(consulta, saida)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def aplicar_retencao(cursor, tabela: str, coluna: str, retencao_meses: int, acao: str, pasta: str) -> list:
+    """
+    Remove as partições de meses anteriores a (mês atual - retencao_meses), arquivando antes se acao='arquivar';
+    linhas desses meses que estejam na partição padrão também são arquivadas e removidas
+
+    Returns:
+        Nomes das partições removidas
+    """
+    if retencao_meses <= 0:
+        return []
+    limite = somar_meses(inicio_mes(), -retencao_meses)
+    removidas = []
+    for mes, nome in sorted(listar_particoes(cursor, tabela).items()):
+        if mes >= limite:
+            break
+        if acao == 'arquivar':
+            caminho = arquivar_particao(cursor, nome, pasta)
+            print(f"🗄️  Partição {nome} arquivada em {caminho}")
+        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(nome)))
+        PARTICOES_REMOVIDAS.rotulo(acao).inc()
+        PARTICOES.rotulo(tabela).dec()
+        removidas.append(nome)
+    aplicar_retencao_padrao(cursor, tabela, coluna, limite, acao, pasta)
+    return removidas
+
+
+def aplicar_retencao_padrao(cursor, tabela: str, coluna: str, limite: date, acao: str, pasta: str) -> int:
+    """Remove (arquivando antes se acao='arquivar') as linhas da partição padrão anteriores a `limite`"""
+    padrao = f"{tabela}_padrao"
+    if tipo_tabela(cursor, padrao) is None:
+        return 0
+    filtro = sql.SQL("{} < %s").format(sql.Identifier(coluna))
+    cursor.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {} WHERE {})").format(sql.Identifier(padrao), filtro),
+                   (limite,))
+    if not cursor.fetchone()[0]:
+        return 0
+    if acao == 'arquivar':
+        caminho = arquivar_particao(cursor, padrao, pasta, filtro, (limite,),
+                                    arquivo=f"{padrao}_ate_{limite:%Y_%m}_{datetime.now():%Y%m%d%H%M%S}")
+        print(f"🗄️  Linhas antigas de {padrao} arquivadas em {caminho}")
+    cursor.execute(sql.SQL("DELETE FROM {} WHERE {}").format(sql.Identifier(padrao), filtro), (limite,))
+    return cursor.rowcount
+
+
+class ManutencaoParticoes:
+    """
+    Cria partições futuras e aplica a retenção em background
+
+    Args:
+        conectar: função que abre uma conexão nova (a thread não compartilha a conexão da aplicação)
+    """
+
+    def __init__(self, conectar, tabela: str, coluna: str, config: dict = None):
+        self.conectar = conectar
+        self.tabela = tabela
+        self.coluna = coluna
+        self.config = validar_config_particoes(config)
+        self.conn = None
+        self.ultima_execucao = None
+        self.ultimo_erro = None
+        self.parar_evento = threading.Event()
+        self.thread = None
+
+    def iniciar(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._laco, name=f'particoes-{self.tabela}', daemon=True)
+            self.thread.start()
+        return self
+
+    def parar(self):
+        self.parar_evento.set()
+
+    def _laco(self):
+        intervalo = self.config['intervalo_horas'] * 3600
+        while not self.parar_evento.is_set():
+            self.executar()
+            self.parar_evento.wait(intervalo)
+        if self.conn:
+            self.conn.close()
+
+    def executar(self) -> dict:
+        """Uma rodada de manutenção (em transação única); retorna as partições criadas e removidas"""
+        try:
+            if self.conn is None or self.conn.closed:
+                self.conn = self.conectar()
+            with self.conn.cursor() as cursor:
+                criadas = garantir_particoes(cursor, self.tabela, self.coluna, self.config['meses_futuros'])
+                removidas = aplicar_retencao(cursor, self.tabela, self.coluna, self.config['retencao_meses'],
+                                             self.config['acao_retencao'], self.config['pasta_arquivo'])
+            self.conn.commit()
+        except Exception as e:
+            self.ultimo_erro = str(e)
+            print(f"❌ Erro na manutenção das partições de {self.tabela}: {e}")
+            if self.conn is not None and not self.conn.closed:
+                self.conn.rollback()
+            return {'criadas': [], 'removidas': []}
+
+        self.ultima_execucao = datetime.now()
+        self.ultimo_erro = None
+        if criadas or removidas:
+            print(f"🗓️  Partições de {self.tabela}: {len(criadas)} criadas, {len(removidas)} removidas")
+        return {'criadas': criadas, 'removidas': removidas}
+
+    def status(self) -> dict:
+        return {
+            'tabela': self.tabela,
+            'ultima_execucao': self.ultima_execucao.isoformat() if self.ultima_execucao else None,
+            'erro': self.ultimo_erro,
+        }
@@ -0,0 +1,235 @@
+"""
+Diagnóstico do processo em execução
+- PerfiladorAmostragem: amostra as pilhas de todas as threads por N segundos (flame graph)
+- RastreadorEtapas: tempo de cada etapa dos últimos K frames em um buffer circular
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from html import escape
+
+
+class PerfiladorAmostragem:
+    """Profiler por amostragem baseado em sys._current_frames()"""
+
+    def __init__(self, intervalo: float = 0.005, profundidade_maxima: int = 128):
+        self.intervalo = intervalo
+        self.profundidade_maxima = profundidade_maxima
+        self.pilhas = collections.Counter()
+        self.amostras = 0
+        self.inicio = None
+        self.fim = None
+        self.thread = None
+        self.parar_evento = threading.Event()
+        self.lock = threading.Lock()
+        self.lock_pilhas = threading.Lock()  # Compartilhado entre a amostragem e quem lê as pilhas
+
+    @property
+    def ativo(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def iniciar(self, segundos: float) -> bool:
+        """Inicia a amostragem por até `segundos` (False se já estiver ativa)"""
+        with self.lock:
+            if self.ativo:
+                return False
+            with self.lock_pilhas:
+                self.pilhas = collections.Counter()
+                self.amostras = 0
+            self.inicio = time.time()
+            self.fim = None
+            self.parar_evento.clear()
+            self.thread = threading.Thread(
+                target=self._amostrar, args=(segundos,), name='perfilador', daemon=True
+            )
+            self.thread.start()
+            return True
+
+    def parar(self):
+        """Interrompe a amostragem e aguarda a thread terminar"""
+        self.parar_evento.set()
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _formatar_frame(self, frame) -> str:
+        codigo = frame.f_code
+        return f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}"
+
+    def _amostrar(self, segundos: float):
+        limite = time.monotonic() + segundos
+        propria = threading.get_ident()
+
+        while not self.parar_evento.is_set() and time.monotonic() < limite:
+            nomes = {t.ident: t.name for t in threading.enumerate()}
+            amostra = []
+
+            for ident, frame in sys._current_frames().items():
+                if ident == propria:
+                    continue
+                pilha = []
+                while frame is not None and len(pilha) < self.profundidade_maxima:
+                    pilha.append(self._formatar_frame(frame))
+                    frame = frame.f_back
+                pilha.append(nomes.get(ident, f"thread-{ident}"))
+                pilha.reverse()
+                amostra.append(';'.join(pilha))
+
+            with self.lock_pilhas:
+                self.pilhas.update(amostra)
+                self.amostras += 1
+            self.parar_evento.wait(self.intervalo)
+
+        self.fim = time.time()
+
+    def _copiar_pilhas(self) -> dict:
+        """Cópia das pilhas amostradas até agora (a amostragem continua alterando self.pilhas)"""
+        with self.lock_pilhas:
+            return dict(self.pilhas)
+
+    def estado(self) -> dict:
+        with self.lock_pilhas:
+            amostras, pilhas_distintas = self.amostras, len(self.pilhas)
+        return {
+            'ativo': self.ativo,
+            'inicio': self.inicio,
+            'fim': self.fim,
+            'amostras': amostras,
+            'intervalo': self.intervalo,
+            'pilhas_distintas': pilhas_distintas
+        }
+
+    def pilhas_colapsadas(self) -> str:
+        """Formato 'collapsed stacks' (compatível com flamegraph.pl e speedscope)"""
+        return ''.join(f"{pilha} {contagem}\n" for pilha, contagem in sorted(self._copiar_pilhas().items()))
+
+    def flame_graph_svg(self, largura: int = 1200, altura_linha: int = 16) -> str:
+        """Renderiza um flame graph SVG simples a partir das pilhas amostradas"""
+        # Monta a árvore de chamadas: nome -> [contagem, filhos]
+        raiz = [0, {}]
+        for pilha, contagem in self._copiar_pilhas().items():
+            no = raiz
+            no[0] += contagem
+            for nome in pilha.split(';'):
+                no = no[1].setdefault(nome, [0, {}])
+                no[0] += contagem
+
+        total = raiz[0] or 1
+        retangulos = []
+        profundidade_maxima = 0
+
+        def desenhar(filhos, x, profundidade):
+            nonlocal profundidade_maxima
+            profundidade_maxima = max(profundidade_maxima, profundidade)
+            for nome, (contagem, netos) in sorted(filhos.items()):
+                w = contagem / total * largura
+                if w >= 0.5:
+                    retangulos.append((x, profundidade, w, nome, contagem))
+                    desenhar(netos, x, profundidade + 1)
+                x += w
+
+        desenhar(raiz[1], 0.0, 0)
+
+        altura = (profundidade_maxima + 1) * altura_linha + 20
+        partes = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura}" height="{altura}" '
+            f'font-family="monospace" font-size="11">',
+            '<rect width="100%" height="100%" fill="#fff"/>',
+        ]
+        for x, profundidade, w, nome, contagem in retangulos:
+            y = altura - (profundidade + 1) * altura_linha - 10
+            # Cor por nome de função (tons quentes)
+            matiz = hash(nome) % 60
+            percentual = contagem / total * 100
+            titulo = escape(f"{nome} ({contagem} amostras, {percentual:.1f}%)")
+            caracteres = int(w / 7)
+            rotulo = escape(nome[:caracteres - 2] + '..' if len(nome) > caracteres else nome)
+            partes.append(
+                f'<g><title>{titulo}</title>'
+                f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{altura_linha - 1}" '
+                f'fill="hsl({matiz},80%,60%)"/>'
+                + (f'<text x="{x + 3:.1f}" y="{y + altura_linha - 4}">{rotulo}</text>' if caracteres > 3 else '')
+                + '</g>'
+            )
+        partes.append('</svg>')
+        return '\n'.join(partes)
+
+
+class RastroFrame:
+    """Tempos das etapas de um frame"""
+
+    __slots__ = ('frame', 'inicio', 'etapas')
+
+    def __init__(self, frame: int):
+        self.frame = frame
+        self.inicio = time.time()
+        self.etapas = {}
+
+    def como_dict(self) -> dict:
+        return {
+            'frame': self.frame,
+            'inicio': self.inicio,
+            'etapas': {nome: [inicio, duracao] for nome, (inicio, duracao) in self.etapas.items()}
+        }
+
+
+class RastreadorEtapas:
+    """Registra o tempo de cada etapa dos últimos K frames"""
+
+    def __init__(self, capacidade: int = 500):
+        self.rastros = collections.deque(maxlen=capacidade)
+        self.local = threading.local()
+        self.ativo = True
+
+    def iniciar_frame(self, frame: int):
+        """Abre o rastro do frame atual para esta thread"""
+        self.local.rastro = RastroFrame(frame) if self.ativo else None
+
+    def concluir_frame(self):
+        """Fecha o rastro do frame atual e guarda no buffer circular"""
+        rastro = getattr(self.local, 'rastro', None)
+        if rastro is not None:
+            self.rastros.append(rastro)
+            self.local.rastro = None
+
+    @contextmanager
+    def etapa(self, nome: str):
+        """Mede uma etapa do frame atual (chamadas repetidas são somadas)"""
+        rastro = getattr(self.local, 'rastro', None)
+        if rastro is None:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            anterior = rastro.etapas.get(nome)
+            if anterior:
+                rastro.etapas[nome] = (anterior[0], anterior[1] + duracao)
+            else:
+                rastro.etapas[nome] = (time.time() - duracao - rastro.inicio, duracao)
+
+    def exportar(self) -> list:
+        """Rastros dos últimos frames (offsets e durações em segundos)"""
+        return [rastro.como_dict() for rastro in list(self.rastros)]
+
+    def exportar_chrome(self) -> dict:
+        """Formato Trace Event (abre em chrome://tracing ou ui.perfetto.dev)"""
+        eventos = []
+        for rastro in list(self.rastros):
+            for nome, (inicio, duracao) in rastro.etapas.items():
+                eventos.append({
+                    'name': nome,
+                    'ph': 'X',
+                    'ts': (rastro.inicio + inicio) * 1e6,
+                    'dur': duracao * 1e6,
+                    'pid': os.getpid(),
+                    'tid': 1,
+                    'args': {'frame': rastro.frame}
+                })
+        return {'traceEvents': eventos, 'displayTimeUnit': 'ms'}
@@ -0,0 +1,242 @@
+"""
+Reconhecedor especializado em placas brasileiras
+Usa a mesma rede do reconhecedor do PaddleOCR, mas restringe a saída ao alfabeto
+A-Z/0-9 e decodifica o CTC sob a gramática da placa: cada posição só considera
+letras ou dígitos conforme o layout (Mercosul ABC1D23, antiga ABC1234 e as duas
+linhas das placas de moto).
+"""
+
+import string
+import time
+
+import numpy as np
+
+ALFABETO = string.ascii_uppercase + string.digits
+INDICES_LETRAS = np.arange(26)
+INDICES_DIGITOS = np.arange(26, 36)
+
+# L = letra, D = dígito, X = letra ou dígito (Mercosul usa letra, antiga usa dígito)
+GRAMATICAS = {
+    'completa': 'LLLDXDD',
+    'moto_superior': 'LLL',
+    'moto_inferior': 'DXDD',
+}
+
+NEG = -np.inf
+
+
+def _mascaras(padrao: str) -> np.ndarray:
+    """Máscara booleana [posições, 36] dos caracteres permitidos em cada posição"""
+    mascaras = np.zeros((len(padrao), len(ALFABETO)), dtype=bool)
+    for k, classe in enumerate(padrao):
+        if classe in 'LX':
+            mascaras[k, INDICES_LETRAS] = True
+        if classe in 'DX':
+            mascaras[k, INDICES_DIGITOS] = True
+    return mascaras
+
+
+MASCARAS = {nome: _mascaras(padrao) for nome, padrao in GRAMATICAS.items()}
+
+
+def decodificar_gramatica(logp_chars: np.ndarray, logp_blank: np.ndarray, mascaras: np.ndarray):
+    """
+    Viterbi do CTC restrito à gramática: encontra o melhor alinhamento que emite
+    exatamente uma sequência com um caractere permitido por posição.
+
+    Args:
+        logp_chars: log-probabilidades [T, 36] do alfabeto restrito
+        logp_blank: log-probabilidade [T] do símbolo vazio do CTC
+        mascaras: caracteres permitidos por posição [K, 36]
+
+    Returns:
+        (log_prob_total, texto, confianca) ou None se a sequência não couber em T passos
+    """
+    T = logp_chars.shape[0]
+    K = mascaras.shape[0]
+    if T < K:
+        return None
+
+    emissao = np.where(mascaras[None, :, :], logp_chars[:, None, :], NEG)  # [T, K, 36]
+    colunas = np.arange(len(ALFABETO))
+    linhas = np.arange(K - 1)
+
+    # B[j]: j caracteres completos e frame atual vazio; C[k, c]: emitindo c na posição k
+    B = np.full(K + 1, NEG)
+    C = np.full((K, len(ALFABETO)), NEG)
+    B[0] = logp_blank[0]
+    C[0] = emissao[0, 0]
+
+    # Ponteiros de retorno: origem de C (0 repete, 1 vem de B[k], 2 vem de C[k-1, c']) e de B
+    origem_C = np.zeros((T, K, len(ALFABETO)), dtype=np.int8)
+    anterior_C = np.zeros((T, K, len(ALFABETO)), dtype=np.int16)
+    origem_B = np.zeros((T, K + 1), dtype=bool)
+    anterior_B = np.zeros((T, K + 1), dtype=np.int16)
+
+    for t in range(1, T):
+        # Troca direta de caractere (c' != c) dispensa o símbolo vazio: usa o melhor c' diferente de c
+        anterior = C[:-1]
+        melhor = np.argmax(anterior, axis=1)
+        sem_melhor = anterior.copy()
+        sem_melhor[linhas, melhor] = NEG
+        segundo = np.argmax(sem_melhor, axis=1)
+        eh_melhor = colunas[None, :] == melhor[:, None]
+
+        vindo = np.full_like(C, NEG)
+        vindo[1:] = np.where(eh_melhor, anterior[linhas, segundo][:, None], anterior[linhas, melhor][:, None])
+        anterior_C[t, 1:] = np.where(eh_melhor, segundo[:, None], melhor[:, None])
+
+        pilha = np.stack([C, np.broadcast_to(B[:K, None], C.shape), vindo])
+        escolha = np.argmax(pilha, axis=0)
+        origem_C[t] = escolha
+        novo_C = np.take_along_axis(pilha, escolha[None], axis=0)[0] + emissao[t]
+
+        # Fim de um caractere (C[j-1] -> B[j]) ou continuação no vazio
+        fim_caractere = np.full(K + 1, NEG)
+        fim_caractere[1:] = C.max(axis=1)
+        anterior_B[t, 1:] = np.argmax(C, axis=1)
+        origem_B[t] = fim_caractere > B
+        novo_B = np.maximum(fim_caractere, B) + logp_blank[t]
+
+        B, C = novo_B, novo_C
+
+    # Estado final: K caracteres emitidos (terminando em vazio ou no último caractere)
+    c_final = int(np.argmax(C[K - 1]))
+    if B[K] >= C[K - 1, c_final]:
+        total = B[K]
+        estado = ('B', K, 0)
+    else:
+        total = C[K - 1, c_final]
+        estado = ('C', K - 1, c_final)
+
+    if not np.isfinite(total):
+        return None
+
+    # Retrocede para obter o caractere de cada posição e sua melhor probabilidade
+    caracteres = [None] * K
+    probabilidades = [0.0] * K
+    for t in range(T - 1, -1, -1):
+        tipo, k, c = estado
+        if tipo == 'C':
+            caracteres[k] = c
+            probabilidades[k] = max(probabilidades[k], float(np.exp(logp_chars[t, c])))
+            if t == 0:
+                break
+            origem = origem_C[t, k, c]
+            if origem == 0:
+                estado = ('C', k, c)
+            elif origem == 1:
+                estado = ('B', k, 0)
+            else:
+                estado = ('C', k - 1, int(anterior_C[t, k, c]))
+        else:
+            if t == 0:
+                break
+            if origem_B[t, k]:
+                estado = ('C', k - 1, int(anterior_B[t, k]))
+            else:
+                estado = ('B', k, 0)
+
+    if any(c is None for c in caracteres):
+        return None
+
+    texto = ''.join(ALFABETO[c] for c in caracteres)
+    # Confiança: média dos caracteres, limitada pela probabilidade média do caminho por frame
+    # (frames forçados a vazio para caber na gramática derrubam a confiança)
+    confianca = min(float(np.mean(probabilidades)), float(np.exp(total / T)))
+    return float(total), texto, confianca
+
+
+class ReconhecedorPlacas:
+    """
+    Substitui o text_recognizer do PaddleOCR (mesma interface: recortes -> (resultados, tempo)).
+    A rede é a mesma; muda a cabeça de saída (36 classes + vazio) e a decodificação.
+    """
+
+    def __init__(self, reconhecedor_base, gramaticas=('completa', 'moto_superior', 'moto_inferior')):
+        self.base = reconhecedor_base
+        self.gramaticas = [(nome, MASCARAS[nome]) for nome in gramaticas]
+        self.rec_batch_num = getattr(reconhecedor_base, 'rec_batch_num', 6)
+        self.indices = self._mapear_alfabeto(reconhecedor_base.postprocess_op.character)
+
+    @staticmethod
+    def _mapear_alfabeto(caracteres: list) -> list:
+        """Índices do dicionário do modelo para cada símbolo do alfabeto restrito (maiúscula + minúscula)"""
+        posicao = {caractere: i for i, caractere in enumerate(caracteres)}
+        indices = []
+        for simbolo in ALFABETO:
+            variantes = [posicao[v] for v in {simbolo, simbolo.lower()} if v in posicao]
+            if not variantes:
+                raise ValueError(f"Dicionário do reconhecedor não contém '{simbolo}'")
+            indices.append(variantes)
+        return indices
+
+    def probabilidades(self, recortes: list) -> list:
+        """Executa a rede do reconhecedor e retorna a matriz [T, classes] de cada recorte"""
+        base = self.base
+        saidas = [None] * len(recortes)
+        proporcoes = [r.shape[1] / float(r.shape[0]) for r in recortes]
+        ordem = np.argsort(proporcoes)
+        _, altura, largura = base.rec_image_shape
+
+        for inicio in range(0, len(recortes), self.rec_batch_num):
+            lote = ordem[inicio:inicio + self.rec_batch_num]
+            max_proporcao = max([largura / altura] + [proporcoes[i] for i in lote])
+            imagens = np.concatenate(
+                [base.resize_norm_img(recortes[i], max_proporcao)[np.newaxis, :] for i in lote]
+            ).copy()
+            base.input_tensor.copy_from_cpu(imagens)
+            base.predictor.run()
+            previsoes = base.output_tensors[0].copy_to_cpu()
+            for i, previsao in zip(lote, previsoes):
+                saidas[i] = previsao
+        return saidas
+
+    def decodificar(self, probabilidades: np.ndarray) -> tuple:
+        """Decodifica uma matriz [T, classes] sob a melhor gramática de placa"""
+        chars = np.stack([probabilidades[:, idx].sum(axis=1) for idx in self.indices], axis=1)
+        blank = probabilidades[:, 0]
+
+        # Caminho rápido: decodificação gulosa no alfabeto restrito já respeita a gramática
+        guloso = self._decodificar_guloso(chars, blank)
+        if guloso is not None:
+            return guloso
+
+        logp_chars = np.log(np.clip(chars, 1e-12, 1.0))
+        logp_blank = np.log(np.clip(blank, 1e-12, 1.0))
+
+        melhor = None
+        for _, mascaras in self.gramaticas:
+            resultado = decodificar_gramatica(logp_chars, logp_blank, mascaras)
+            # Todos os alinhamentos cobrem os mesmos T frames: log-prob total é comparável
+            if resultado and (melhor is None or resultado[0] > melhor[0]):
+                melhor = resultado
+
+        if melhor is None:
+            return '', 0.0
+        return melhor[1], melhor[2]
+
+    def _decodificar_guloso(self, chars: np.ndarray, blank: np.ndarray):
+        """CTC guloso (melhor classe por frame); retorna None se o texto não seguir uma gramática"""
+        classes = np.concatenate([blank[:, None], chars], axis=1)
+        melhores = classes.argmax(axis=1)
+        probs = classes.max(axis=1)
+
+        indices = []
+        confiancas = []
+        for t, classe in enumerate(melhores):
+            if classe != 0 and (t == 0 or classe != melhores[t - 1]):
+                indices.append(classe - 1)
+                confiancas.append(probs[t])
+
+        for _, mascaras in self.gramaticas:
+            if len(indices) == len(mascaras) and all(mascaras[k, c] for k, c in enumerate(indices)):
+                return ''.join(ALFABETO[c] for c in indices), float(np.mean(confiancas))
+        return None
+
+    def __call__(self, recortes: list):
+        inicio = time.perf_counter()
+        if not recortes:
+            return [], 0.0
+        resultados = [self.decodificar(p) for p in self.probabilidades(recortes)]
+        return resultados, time.perf_counter() - inicio
@@ -0,0 +1,161 @@
+"""
+Relatório de detecções por placa em um intervalo de datas (tabela acessos)
+Uma única consulta com funções de janela calcula, por placa, quantidade de detecções, primeira e
+última vez vista, melhor confiança e o tipo da última leitura. O resultado é lido com cursor no
+servidor (em lotes) e escrito em streaming no console, em CSV ou em JSON: a memória não cresce
+com a quantidade de placas.
+
+Uso:
+    python relatorio_deteccoes.py                                # hoje, no console
+    python relatorio_deteccoes.py --desde 2025-01-01 --ate 2025-02-01 --formato csv --saida janeiro.csv
+    python relatorio_deteccoes.py --banco web --camera camera    # banco do web_app_placas
+"""
+
+import argparse
+import csv
+import json
+import sys
+from datetime import date, datetime, timedelta
+
+TAMANHO_LOTE = 1000  # Linhas buscadas por ida ao servidor
+
+COLUNAS = ('placa', 'tipo_placa', 'deteccoes', 'primeira', 'ultima', 'melhor_confianca')
+
+CONSULTA_RELATORIO = """
+    SELECT placa, tipo_placa, deteccoes, primeira, ultima, melhor_confianca
+    FROM (
+        SELECT placa, COALESCE(tipo_placa, '-') AS tipo_placa,
+               COUNT(*) OVER por_placa AS deteccoes,
+               MIN(data_acesso) OVER por_placa AS primeira,
+               MAX(data_acesso) OVER por_placa AS ultima,
+               MAX(confianca) OVER por_placa AS melhor_confianca,
+               ROW_NUMBER() OVER (PARTITION BY placa ORDER BY data_acesso DESC, id DESC) AS ordem
+        FROM acessos
+        WHERE data_acesso >= %s AND data_acesso < %s{filtro}
+        WINDOW por_placa AS (PARTITION BY placa)
+    ) AS ultimas
+    WHERE ordem = 1
+    ORDER BY placa
+"""
+
+
+def gerar_relatorio(conn, desde: date, ate: date, dialeto: str = 'postgres', camera: str = None,
+                    tamanho_lote: int = TAMANHO_LOTE):
+    """
+    Gera uma linha (dict com COLUNAS) por placa detectada em [desde, ate)
+
+    PostgreSQL usa cursor nomeado (no servidor); MySQL, cursor sem buffer; SQLite lê do arquivo
+    conforme avança. Em todos as linhas chegam em lotes conforme são consumidas.
+    """
+    filtro, parametros = (" AND camera = %s", [camera]) if camera else ("", [])
+    inicio = datetime(desde.year, desde.month, desde.day)
+    fim = datetime(ate.year, ate.month, ate.day)
+
+    if dialeto == 'postgres':
+        cursor = conn.cursor(name='relatorio_deteccoes')
+        cursor.itersize = tamanho_lote
+    elif dialeto == 'mysql':
+        cursor = conn.cursor(buffered=False)
+    else:
+        cursor = conn.cursor()
+    try:
+        cursor.execute(CONSULTA_RELATORIO.format(filtro=filtro), [inicio, fim] + parametros)
+        for linha in cursor:
+            item = dict(zip(COLUNAS, linha))
+            # Sem confiança em nenhum acesso da placa (coluna opcional): None
+            if item['melhor_confianca'] is not None:
+                item['melhor_confianca'] = float(item['melhor_confianca'])
+            # SQLite: agregações voltam como texto (sem o tipo declarado da coluna)
+            for campo in ('primeira', 'ultima'):
+                if isinstance(item[campo], str):
+                    item[campo] = datetime.fromisoformat(item[campo])
+            yield item
+    finally:
+        cursor.close()
+
+
+# --- Saídas ---
+def escrever_console(linhas, saida=None) -> int:
+    """Lista numerada no formato do relatório do detector; retorna a quantidade de placas"""
+    saida = saida or sys.stdout
+    total = 0
+    for total, item in enumerate(linhas, 1):
+        if total == 1:
+            print("\nPlacas detectadas:", file=saida)
+        confianca = f"{item['melhor_confianca']:.2%}" if item['melhor_confianca'] is not None else "-"
+        print(f"  {total:2d}. {item['placa']} ({item['tipo_placa']}) - {item['deteccoes']}x - "
+              f"Primeira: {item['primeira']:%H:%M:%S} - Última: {item['ultima']:%H:%M:%S} - "
+              f"Melhor conf: {confianca}", file=saida)
+    return total
+
+
+def escrever_csv(linhas, saida=None) -> int:
+    saida = saida or sys.stdout
+    escritor = csv.writer(saida)
+    escritor.writerow(COLUNAS)
+    total = 0
+    for total, item in enumerate(linhas, 1):
+        escritor.writerow([item['placa'], item['tipo_placa'], item['deteccoes'], item['primeira'].isoformat(),
+                           item['ultima'].isoformat(),
+                           f"{item['melhor_confianca']:.4f}" if item['melhor_confianca'] is not None else ''])
+    return total
+
+
+def escrever_json(linhas, saida=None) -> int:
+    """Array JSON escrito item a item (sem montar a lista em memória)"""
+    saida = saida or sys.stdout
+    saida.write('[')
+    total = 0
+    for total, item in enumerate(linhas, 1):
+        if total > 1:
+            saida.write(',')
+        saida.write('\n  ' + json.dumps(item, default=lambda valor: valor.isoformat(), ensure_ascii=False))
+    saida.write('\n]\n' if total else ']\n')
+    return total
+
+
+FORMATOS = {
+    'console': escrever_console,
+    'csv': escrever_csv,
+    'json': escrever_json,
+}
+
+
+def _data(texto: str) -> date:
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de detecções por placa")
+    parser.add_argument('--desde', type=_data, default=date.today(), help="Primeiro dia (AAAA-MM-DD, padrão hoje)")
+    parser.add_argument('--ate', type=_data, help="Dia seguinte ao último (AAAA-MM-DD, exclusivo; padrão desde + 1)")
+    parser.add_argument('--formato', choices=sorted(FORMATOS), default='console')
+    parser.add_argument('--saida', help="Arquivo de saída (padrão: saída padrão)")
+    parser.add_argument('--camera', help="Filtra pela câmera (origem) das detecções")
+    parser.add_argument('--banco', choices=('detector', 'web'), default='detector',
+                        help="Usa o banco configurado no detectar_placas_video ou no web_app_placas")
+    args = parser.parse_args()
+    ate = args.ate or args.desde + timedelta(days=1)
+
+    # Usa a configuração de banco do script escolhido
+    if args.banco == 'web':
+        import configuracao as origem
+        armazenamento = origem.armazenamento
+    else:
+        import detectar_placas_video as origem
+        armazenamento = origem.armazenamento_configurado()
+    conn = armazenamento.conectar()
+
+    saida = open(args.saida, 'w', newline='', encoding='utf-8') if args.saida else sys.stdout
+    try:
+        linhas = gerar_relatorio(conn, args.desde, ate, armazenamento.dialeto, args.camera)
+        total = FORMATOS[args.formato](linhas, saida)
+    finally:
+        if args.saida:
+            saida.close()
+        conn.close()
+    print(f"✅ {total} placas de {args.desde} a {ate} (exclusivo)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
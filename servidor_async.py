@@ -0,0 +1,182 @@
+"""
+Servidor assíncrono (ASGI) para produção
+- Rotas de stream (MJPEG, SSE) são geradores assíncronos no event loop: cada cliente custa uma corrotina,
+  não uma thread do SO
+- Rotas de long-poll (snapshot, última detecção) são corrotinas que esperam sem ocupar o pool de threads
+- As demais rotas do Flask (páginas, cadastro, banco) rodam num pool de threads, fora do event loop
+- Downloads grandes do Flask (exportações) são enviados com contrapressão: a thread só produz o próximo
+  bloco quando o anterior foi escrito no socket (o WSGIMiddleware do uvicorn acumularia a resposta inteira)
+Requer uvicorn (pip install uvicorn)
+"""
+
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+THREADS_WSGI = 16  # Pool de threads das rotas Flask (banco, páginas)
+THREADS_DOWNLOADS = 4  # Threads dedicadas aos downloads (não ocupam o pool das páginas)
+
+
+class Requisicao:
+    """Parâmetros da URL e cabeçalhos (nomes em minúsculas) de uma requisição ASGI"""
+
+    def __init__(self, scope):
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        self.headers = {nome.decode('latin-1').lower(): valor.decode('latin-1')
+                        for nome, valor in scope.get('headers', [])}
+
+
+class AplicacaoASGI:
+    """
+    Aplicação ASGI que atende `streams` e `rotas` no event loop e delega o resto ao app WSGI
+
+    Args:
+        app_wsgi: aplicação Flask
+        streams: caminho -> (função que retorna o gerador assíncrono, content-type, cabeçalhos extras)
+        threads: tamanho do pool de threads do WSGI
+        downloads: prefixos de rotas do Flask com respostas grandes, enviadas com contrapressão
+        rotas: caminho -> corrotina (Requisicao) -> (status, cabeçalhos, corpo); para respostas que esperam
+            (long-poll) sem prender uma thread do pool
+    """
+
+    def __init__(self, app_wsgi, streams: dict, threads: int = THREADS_WSGI, downloads: tuple = (),
+                 rotas: dict = None):
+        from uvicorn.middleware.wsgi import WSGIMiddleware
+        self.app_wsgi = app_wsgi
+        self.wsgi = WSGIMiddleware(app_wsgi, workers=threads)
+        self.streams = streams
+        self.rotas = rotas or {}
+        self.downloads = tuple(downloads)
+        self.executor_downloads = ThreadPoolExecutor(THREADS_DOWNLOADS, thread_name_prefix='download')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._ciclo_de_vida(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        rota = self.streams.get(scope['path'])
+        corrotina = self.rotas.get(scope['path'])
+        if rota is None and corrotina is None:
+            if self.downloads and scope['path'].startswith(self.downloads):
+                await self._download(scope, receive, send)
+            else:
+                await self.wsgi(scope, receive, send)
+            return
+        if scope['method'] not in ('GET', 'HEAD'):
+            await send({'type': 'http.response.start', 'status': 405,
+                        'headers': [(b'allow', b'GET, HEAD')]})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        if corrotina is not None:
+            status, cabecalhos, corpo = await corrotina(Requisicao(scope))
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in cabecalhos.items()]
+            })
+            await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else corpo})
+            return
+
+        fabrica, content_type, cabecalhos = rota
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', content_type.encode('latin-1'))] +
+                       [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in cabecalhos.items()]
+        })
+        if scope['method'] == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await self._transmitir(fabrica(), receive, send)
+
+    @staticmethod
+    async def _transmitir(gerador, receive, send):
+        """Envia o gerador até ele terminar ou o cliente desconectar (o que vier primeiro)"""
+        async def enviar():
+            async for parte in gerador:
+                await send({'type': 'http.response.body', 'body': parte, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def aguardar_desconexao():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        tarefas = [asyncio.ensure_future(enviar()), asyncio.ensure_future(aguardar_desconexao())]
+        try:
+            concluidas, pendentes = await asyncio.wait(tarefas, return_when=asyncio.FIRST_COMPLETED)
+            for tarefa in pendentes:
+                tarefa.cancel()
+            await asyncio.gather(*pendentes, return_exceptions=True)
+            for tarefa in concluidas:
+                if tarefa.exception():
+                    print(f"⚠️  Stream interrompido: {tarefa.exception()}")
+        finally:
+            # Executa os finally do gerador (contagem de clientes, cancelamento da assinatura)
+            await gerador.aclose()
+
+    async def _download(self, scope, receive, send):
+        """Executa a rota do Flask numa thread que espera cada bloco ser enviado antes de gerar o próximo"""
+        from uvicorn.middleware.wsgi import build_environ
+        mensagem = await receive()
+        environ = build_environ(scope, mensagem, io.BytesIO(mensagem.get('body', b'')))
+        loop = asyncio.get_running_loop()
+        desconectado = threading.Event()
+
+        def enviar(evento):
+            asyncio.run_coroutine_threadsafe(send(evento), loop).result()
+
+        def executar():
+            inicio = {}
+
+            def start_response(status, cabecalhos, exc_info=None):
+                inicio['status'] = int(status.split(' ', 1)[0])
+                inicio['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in cabecalhos]
+
+            resultado = self.app_wsgi(environ, start_response)
+            try:
+                enviar({'type': 'http.response.start', **inicio})
+                for parte in resultado:
+                    if desconectado.is_set():
+                        return
+                    if parte:
+                        enviar({'type': 'http.response.body', 'body': parte, 'more_body': True})
+                enviar({'type': 'http.response.body', 'body': b''})
+            finally:
+                # Fecha o gerador da resposta (cancela a consulta se o cliente saiu no meio)
+                if hasattr(resultado, 'close'):
+                    resultado.close()
+
+        async def aguardar_desconexao():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            desconectado.set()
+
+        vigia = asyncio.ensure_future(aguardar_desconexao())
+        try:
+            await loop.run_in_executor(self.executor_downloads, executar)
+        except Exception as e:
+            print(f"⚠️  Download interrompido: {e}")
+        finally:
+            vigia.cancel()
+            await asyncio.gather(vigia, return_exceptions=True)
+
+    @staticmethod
+    async def _ciclo_de_vida(receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def executar(aplicacao, host: str = '0.0.0.0', porta: int = 5000):
+    """Sobe o uvicorn (um processo, um event loop) com a aplicação ASGI"""
+    import uvicorn
+    uvicorn.run(aplicacao, host=host, port=porta, log_level='warning', timeout_graceful_shutdown=5)
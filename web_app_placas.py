@@ -3,8 +3,7 @@ Sistema Web de Reconhecimento de Placas
 Detecta placas em tempo real e salva capturas de placas desconhecidas
 """
 
-import paddle
-from paddleocr import PaddleOCR
+import asyncio
 import cv2
 import numpy as np
 import re
@@ -12,147 +11,262 @@ from datetime import datetime
 import psycopg2
 import os
 import threading
-from flask import Flask, Response, render_template_string, request, redirect, url_for
+import time
+import hmac
+import io
+import json
+from functools import wraps
+from flask import Flask, Response, request, redirect, url_for, jsonify
 import glob
+from eventos import BroadcasterEventos, para_json
+import metricas
+from metricas import cronometrar, DB_LATENCIA, DB_FALHAS
+from amostragem import ControladorAmostragem, validar_config_amostragem
+from configuracao import (ARQUIVO_VIDEO, CONFIANCA_MINIMA, CONFIANCA_MINIMA_MOTO, CONFIG_PARTICOES, INDICE_CAMERA,
+                          NOME_CAMERA, PARTICIONAR_ACESSOS, PASTA_PLACAS_CONHECIDAS, PASTA_PLACAS_DESCONHECIDAS,
+                          POSTGRES_CONFIG, REPETIR_VIDEO, URL_CAMERA, USAR_WEBCAM, armazenamento, validar_placa)
+from diario_local import DiarioLocal, SincronizadorDiario, nova_chave, validar_config_diario
+from fonte_camera import FonteCamera
+from gravador_clipes import BufferQuadros, GravadorClipes
+from instantaneo import InstantaneoCamera, ValorVersionado
+from lista_observacao import ListaObservacao, validar_config_lista_observacao
+from modelos_html import CacheFragmentos, RegistroModelos, comprimir_resposta, marcar_seguro
+import servidor_async
+from motor_ocr import CarregadorOCR, carregar_config_ocr, reconhecer
+import estatisticas
+import exportacao
+import importacao
+import particoes
+from particoes import ManutencaoParticoes
+from perfilador import PerfiladorAmostragem, RastreadorEtapas
 
 # --- CONFIGURAÇÕES ---
-USAR_WEBCAM = False  # True para webcam, False para arquivo de vídeo
-ARQUIVO_VIDEO = "video_entrada.mp4"
-INDICE_CAMERA = 0  # Índice da webcam (0 = primeira câmera)
-
-# Configuração do Banco de Dados PostgreSQL
-POSTGRES_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'database': 'ifsuldeminas',
-    'user': 'postgres',
-    'password': '353742Ap$'
-}
+# Câmera, banco, partições, confiança mínima e pastas das placas: configuracao.py (lido também pelos scripts)
+SLOTS_BARRAMENTO = 8  # Frames pré-alocados em memória compartilhada (captura escreve uma vez, todos leem)
 
 # OCR e Processamento
-PROCESSAR_A_CADA_N_FRAMES = 1  # Processar 1 a cada 2 frames
-CONFIANCA_MINIMA = 0.94
-CONFIANCA_MINIMA_MOTO = 0.97
+# Amostragem adaptativa do OCR: intervalo entre frames ajustado pela latência e pela cena
+# (ver amostragem.CONFIG_AMOSTRAGEM_PADRAO; intervalo_minimo = intervalo_maximo fixa o intervalo)
+# Diário local: acessos, alertas e clipes vão primeiro para um arquivo SQLite e chegam ao banco em
+# background (nada se perde com o banco fora do ar). Ver diario_local.CONFIG_DIARIO_PADRAO
+CONFIG_DIARIO = validar_config_diario({
+    'caminho': 'diario_eventos.db',
+    'tamanho_lote': 500,  # Eventos por transação ao esvaziar o atraso
+})
+INTERVALO_RECONEXAO_BANCO = 15  # Segundos entre tentativas de reconexão das consultas com o banco fora
+
+CONFIG_AMOSTRAGEM = validar_config_amostragem({
+    'latencia_alvo': 0.5,  # Segundos da captura ao fim do processamento
+    'intervalo_ocioso': 6,  # Com a cena parada, OCR a cada 6 frames
+})
 COOLDOWN_SEGUNDOS = 120  # Tempo para não salvar a mesma placa novamente
 
-# Pastas para salvar imagens
-PASTA_PLACAS_DESCONHECIDAS = "placas_desconhecidas"
-PASTA_PLACAS_CONHECIDAS = "placas_conhecidas"
-# --------------------
+# Lista de observação: leituras parecidas (sem ser iguais) com placas marcadas ou de usuários não autorizados
+# geram alerta POSSIVEL_CORRESPONDENCIA. Ver lista_observacao.CONFIG_LISTA_OBSERVACAO_PADRAO
+CONFIG_LISTA_OBSERVACAO = validar_config_lista_observacao({
+    'distancia_maxima': 1.0,  # 0.5 por troca de caracteres parecidos (0/O, 8/B...), 1 pelas demais
+})
+
+# Motor OCR: threads, MKLDNN, variante, det_limit_side_len, lote (ver motor_ocr.CONFIG_OCR_PADRAO)
+# Lido de config_ocr.json (gerado por ajustar_ocr.py) quando existir
+CONFIG_OCR = carregar_config_ocr()
+
+# Eventos em tempo real (SSE)
+INTERVALO_EVENTO_DETECCAO = 2  # Segundos entre eventos da mesma placa parada na câmera
+# Campos da detecção enviados ao painel e a /api/ultima_deteccao (sem os dados do veículo e do usuário)
+CAMPOS_DETECCAO_PUBLICOS = ('placa', 'confianca', 'timestamp')
 
-# Cria pastas se não existirem
-os.makedirs(PASTA_PLACAS_DESCONHECIDAS, exist_ok=True)
-os.makedirs(PASTA_PLACAS_CONHECIDAS, exist_ok=True)
+# Servidor
+MODO_SERVIDOR = os.environ.get('PLACAS_SERVIDOR', 'async')  # 'async' (uvicorn, produção) ou 'flask' (desenvolvimento)
+INTERVALO_ESPERA_FRAME = 5  # Segundos que um cliente MJPEG espera por frame antes de checar de novo
 
-# Padrões de placas brasileiras
-PADRAO_MERCOSUL_CARRO = re.compile(r'^[A-Z]{3}\d[A-Z]\d{2}$')
-PADRAO_MERCOSUL_MOTO = re.compile(r'^[A-Z]{3}\d[A-Z]\d{2}$')
-PADRAO_ANTIGO_CARRO = re.compile(r'^[A-Z]{3}\d{4}$')
-PADRAO_ANTIGO_MOTO = re.compile(r'^[A-Z]{3}\d{4}$')
+# Pollers (/snapshot.jpg e /api/ultima_deteccao)
+LONG_POLL_MAXIMO = 30  # Segundos máximos de espera com ?aguardar=N
+
+# Diagnóstico (rotas /admin/*)
+TOKEN_ADMIN = os.environ.get('PLACAS_TOKEN_ADMIN', '')  # Vazio = rotas de administração desativadas
+PERFIL_SEGUNDOS_MAXIMO = 300  # Duração máxima de uma sessão do profiler
+RASTRO_FRAMES = 500  # Quantidade de frames mantidos no rastreador de etapas
+
+# Clipes de alerta (vídeo curto em torno do evento, vinculado à linha de alertas)
+PASTA_CLIPES = "clipes_alertas"
+CLIPES_SEGUNDOS_ANTES = 5
+CLIPES_SEGUNDOS_DEPOIS = 5
+TIPOS_ALERTA_COM_CLIPE = ('VEICULO_MARCADO', 'NAO_AUTORIZADO', 'POSSIVEL_CORRESPONDENCIA')
+
+# Importação em lote de cadastros (/importar_cadastros e importacao.py)
+IMPORTACAO_TAMANHO_MAXIMO = 20 * 1024 * 1024  # Bytes aceitos no upload do CSV
+# --------------------
 
 # --- INICIALIZAÇÃO DO SERVIDOR WEB (Flask) ---
 app = Flask(__name__)
+modelos = RegistroModelos(app)  # Templates compilados uma vez (PAGINA_* / FRAGMENTO_*)
+fragmentos = CacheFragmentos()  # Trechos renderizados, invalidados quando o cadastro muda
+app.after_request(comprimir_resposta)
 
 # Variáveis globais
 ocr = None
+carregador_ocr = CarregadorOCR(CONFIG_OCR)  # Modelo carregado em background (o servidor sobe antes)
 conn_db = None
+diario = None  # DiarioLocal (criado na inicialização do servidor)
+sincronizador = None
 placas_cache = {}  # Cache de placas já processadas
-frame_atual = None
+lista_observacao = ListaObservacao(CONFIG_LISTA_OBSERVACAO)  # Carregada pelo GerenciadorBanco
 ultima_deteccao = None
+eventos = BroadcasterEventos()  # Fan-out de eventos para os painéis abertos
+perfilador = PerfiladorAmostragem()
+rastreador = RastreadorEtapas(RASTRO_FRAMES)
+# Fonte única compartilhada pelos streams; mudanças de estado vão para o painel
+fonte_camera = FonteCamera(URL_CAMERA or (INDICE_CAMERA if USAR_WEBCAM else ARQUIVO_VIDEO),
+                           repetir=REPETIR_VIDEO, slots_barramento=SLOTS_BARRAMENTO, nome=NOME_CAMERA,
+                           ao_mudar_estado=lambda status: eventos.publicar('camera', status))
+# Um único laço de captura/OCR difunde cada frame codificado para todos os clientes MJPEG
+quadros_mjpeg = ValorVersionado()
+clientes_processamento = 0
+thread_processamento = None
+lock_processamento = threading.Lock()
+# Último frame codificado e última detecção serializada, servidos da memória aos pollers
+instantaneo = InstantaneoCamera(fonte_camera)
+ultima_deteccao_json = ValorVersionado()
+# Anel com os frames já codificados do stream; o clipe é gravado fora do laço de captura
+buffer_clipes = BufferQuadros(CLIPES_SEGUNDOS_ANTES + CLIPES_SEGUNDOS_DEPOIS + 2)
+gravador_clipes = GravadorClipes(buffer_clipes, PASTA_CLIPES, CLIPES_SEGUNDOS_ANTES, CLIPES_SEGUNDOS_DEPOIS,
+                                 ao_concluir=lambda chaves, arquivo: [conn_db.vincular_clipe(c, arquivo) for c in chaves])
+
+# Medidores lidos apenas quando /metrics é consultado
+metricas.CACHE_COOLDOWN.set_funcao(lambda: len(placas_cache))
+metricas.CLIENTES_EVENTOS.set_funcao(lambda: eventos.total_assinantes())
+metricas.FILA_PROFUNDIDADE.rotulo('eventos').set_funcao(lambda: eventos.total_pendentes())
+
+
+# Eventos do diário local (gravados de forma idempotente pela chave)
+APLICADORES_DIARIO, APLICADORES_DIARIO_LOTE = armazenamento.aplicadores_diario()
 
 
 class GerenciadorBanco:
-    """Gerencia conexão e operações com PostgreSQL"""
+    """
+    Gerencia conexão e operações com PostgreSQL
+
+    Args:
+        diario: DiarioLocal; com ele, acessos, alertas e clipes são gravados no diário e chegam ao banco
+            pelo SincronizadorDiario. Sem ele (scripts), vão direto para o banco
+    """
     
-    def __init__(self):
+    def __init__(self, diario: DiarioLocal = None):
+        self.diario = diario
         self.conn = None
+        self.ultima_tentativa = 0.0
+        self.lock_conexao = threading.Lock()
         self.conectar()
         self.criar_tabelas()
+        self.carregar_lista_observacao()
     
     def conectar(self):
         """Estabelece conexão com o banco de dados"""
+        self.ultima_tentativa = time.monotonic()
         try:
-            self.conn = psycopg2.connect(**POSTGRES_CONFIG)
-            print(f"✓ Conectado ao PostgreSQL: {POSTGRES_CONFIG['database']}")
+            self.conn = armazenamento.conectar()
+            print(f"✓ Conectado ao {armazenamento.descricao}")
         except Exception as e:
             print(f"❌ Erro ao conectar no banco: {e}")
-            print("⚠️  A aplicação funcionará sem banco de dados")
+            print("⚠️  A aplicação funcionará sem banco de dados (nova tentativa em "
+                  f"{INTERVALO_RECONEXAO_BANCO}s; detecções ficam no diário local)")
             self.conn = None
     
-    def criar_tabelas(self):
-        """Cria todas as tabelas necessárias"""
-        if not self.conn:
+    def disponivel(self) -> bool:
+        """Conexão utilizável; sem ela, tenta reconectar (no máximo a cada INTERVALO_RECONEXAO_BANCO)"""
+        if self.conn is not None and armazenamento.conexao_aberta(self.conn):
+            return True
+        with self.lock_conexao:
+            if self.conn is not None and armazenamento.conexao_aberta(self.conn):
+                return True
+            if time.monotonic() - self.ultima_tentativa < INTERVALO_RECONEXAO_BANCO:
+                return False
+            self.conectar()
+            try:
+                self.criar_tabelas()
+                self.carregar_lista_observacao()
+            except Exception as e:
+                print(f"❌ Erro ao preparar o esquema: {e}")
+                self.conn.close()
+                self.conn = None
+            return self.conn is not None
+    
+    def _desfazer(self):
+        """Desfaz a transação com erro; conexão perdida (rollback impossível) é descartada para reconectar"""
+        if self.conn is None:
             return
+        try:
+            self.conn.rollback()
+        except Exception:
+            pass
+        if not armazenamento.conexao_aberta(self.conn):
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+    
+    def _registrar_evento(self, tipo: str, dados: dict, operacao: str):
+        """Grava o evento no diário (ou direto no banco, sem diário); retorna a chave ou None"""
+        chave = nova_chave()
+        if self.diario is not None:
+            try:
+                return self.diario.registrar(tipo, dados, chave)
+            except Exception as e:
+                DB_FALHAS.rotulo(operacao).inc()
+                print(f"❌ Erro ao gravar no diário local: {e}")
+                return None
         
-        cursor = self.conn.cursor()
-        
-        # Tabela de usuários
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id SERIAL PRIMARY KEY,
-                nome VARCHAR(100) NOT NULL,
-                cpf VARCHAR(14) UNIQUE,
-                telefone VARCHAR(20),
-                tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('PARTICULAR', 'OFICIAL')),
-                autorizado BOOLEAN DEFAULT TRUE,
-                observacoes TEXT,
-                data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Tabela de veículos vinculados a usuários
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS veiculos (
-                id SERIAL PRIMARY KEY,
-                placa VARCHAR(10) UNIQUE NOT NULL,
-                tipo_placa VARCHAR(20) NOT NULL,
-                usuario_id INTEGER REFERENCES usuarios(id) ON DELETE SET NULL,
-                modelo VARCHAR(100),
-                cor VARCHAR(50),
-                tipo_veiculo VARCHAR(20) CHECK (tipo_veiculo IN ('CARRO', 'MOTO', 'CAMINHAO', 'OUTRO')),
-                marcado BOOLEAN DEFAULT FALSE,
-                motivo_marcacao TEXT,
-                data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Tabela de acessos (log de entradas/saídas)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS acessos (
-                id SERIAL PRIMARY KEY,
-                veiculo_id INTEGER REFERENCES veiculos(id) ON DELETE CASCADE,
-                placa VARCHAR(10) NOT NULL,
-                tipo_evento VARCHAR(20) CHECK (tipo_evento IN ('ENTRADA', 'SAIDA', 'DETECTADO')),
-                confianca DECIMAL(5, 4),
-                imagem_path VARCHAR(255),
-                data_acesso TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        if not self.disponivel():
+            return None
         
-        # Tabela de alertas
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS alertas (
-                id SERIAL PRIMARY KEY,
-                veiculo_id INTEGER REFERENCES veiculos(id) ON DELETE CASCADE,
-                placa VARCHAR(10) NOT NULL,
-                tipo_alerta VARCHAR(50) NOT NULL,
-                mensagem TEXT NOT NULL,
-                resolvido BOOLEAN DEFAULT FALSE,
-                data_alerta TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        try:
+            gravado = APLICADORES_DIARIO[tipo](self.conn, chave, dados)
+            self.conn.commit()
+            return chave if gravado else None
+        except Exception as e:
+            DB_FALHAS.rotulo(operacao).inc()
+            print(f"❌ Erro ao gravar {tipo}: {e}")
+            self._desfazer()
+            return None
+    
+    def criar_tabelas(self):
+        """Aplica as migrações pendentes do esquema (com o banco em dia, é uma única consulta)"""
+        if not self.conn:
+            return
         
-        # Índices para otimização
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_placa ON veiculos(placa)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_data ON acessos(data_acesso)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_alertas_resolvido ON alertas(resolvido)")
+        aplicadas = armazenamento.criar_esquema(self.conn)
+        if aplicadas:
+            print(f"✓ Esquema atualizado para a versão {aplicadas[-1]}")
+        else:
+            print("✓ Esquema na versão atual")
+    
+    def carregar_lista_observacao(self):
+        """Recarrega a lista de observação (placas marcadas e de não autorizados) do banco"""
+        if not self.conn:
+            return
         
-        self.conn.commit()
-        print("✓ Tabelas criadas/verificadas")
+        try:
+            lista_observacao.carregar(armazenamento.observados(self.conn))
+            print(f"✓ Lista de observação: {len(lista_observacao)} placas")
+        except Exception as e:
+            DB_FALHAS.rotulo('carregar_lista_observacao').inc()
+            print(f"❌ Erro ao carregar a lista de observação: {e}")
+            self._desfazer()
+    
+    def _atualizar_observacao(self, placa: str):
+        """Inclui ou retira a placa da lista de observação conforme o cadastro recém-gravado"""
+        try:
+            lista_observacao.atualizar(placa, armazenamento.buscar_veiculo(self.conn, placa))
+        except Exception as e:
+            DB_FALHAS.rotulo('carregar_lista_observacao').inc()
+            print(f"❌ Erro ao atualizar a lista de observação: {e}")
+            self._desfazer()
     
     def placa_existe(self, placa: str) -> bool:
         """Verifica se uma placa existe no banco de dados"""
-        if not self.conn:
+        if not self.disponivel():
             return False
         
         try:
@@ -168,75 +282,67 @@ class GerenciadorBanco:
             print(f"❌ Erro ao consultar banco: {e}")
             return False
     
+    @cronometrar(DB_LATENCIA.rotulo('buscar_veiculo'))
     def buscar_veiculo(self, placa: str):
-        """Busca informações completas de um veículo"""
-        if not self.conn:
+        """Busca informações completas de um veículo (comando preparado na conexão)"""
+        if not self.disponivel():
             return None
         
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT v.id, v.placa, v.tipo_placa, v.modelo, v.cor, v.tipo_veiculo,
-                       v.marcado, v.motivo_marcacao,
-                       u.id, u.nome, u.cpf, u.telefone, u.tipo, u.autorizado
-                FROM veiculos v
-                LEFT JOIN usuarios u ON v.usuario_id = u.id
-                WHERE v.placa = %s
-            """, (placa,))
-            
-            resultado = cursor.fetchone()
-            
-            if resultado:
-                return {
-                    'veiculo_id': resultado[0],
-                    'placa': resultado[1],
-                    'tipo_placa': resultado[2],
-                    'modelo': resultado[3],
-                    'cor': resultado[4],
-                    'tipo_veiculo': resultado[5],
-                    'marcado': resultado[6],
-                    'motivo_marcacao': resultado[7],
-                    'usuario_id': resultado[8],
-                    'usuario_nome': resultado[9],
-                    'usuario_cpf': resultado[10],
-                    'usuario_telefone': resultado[11],
-                    'usuario_tipo': resultado[12],
-                    'usuario_autorizado': resultado[13]
-                }
-            return None
+            return armazenamento.buscar_veiculo(self.conn, placa)
         except Exception as e:
+            DB_FALHAS.rotulo('buscar_veiculo').inc()
             print(f"❌ Erro ao buscar veículo: {e}")
+            self._desfazer()
             return None
     
-    def registrar_acesso(self, placa: str, confianca: float, imagem_path: str = None) -> bool:
-        """Registra um acesso (detecção) de veículo"""
-        if not self.conn:
-            return False
+    @cronometrar(DB_LATENCIA.rotulo('registrar_acesso'))
+    def registrar_acesso(self, placa: str, confianca: float, imagem_path: str = None,
+                         tipo_placa: str = None) -> bool:
+        """Registra um acesso (detecção) de veículo com o horário da captura"""
+        return self._registrar_evento('acesso', {
+            'placa': placa,
+            'tipo_placa': tipo_placa,
+            'confianca': confianca,
+            'imagem_path': imagem_path,
+            'camera': NOME_CAMERA,
+            'data_acesso': datetime.now().isoformat(),
+        }, 'registrar_acesso') is not None
+    
+    @cronometrar(DB_LATENCIA.rotulo('registrar_deteccao'))
+    def registrar_deteccao(self, placa: str, tipo_placa: str, confianca: float, imagem_path: str,
+                           veiculo: dict = None, alertas=()):
+        """
+        Registra o acesso e os alertas de uma detecção num único evento (gravados juntos, numa ida ao banco)
         
-        try:
-            cursor = self.conn.cursor()
-            
-            # Busca o veiculo_id se existir
-            cursor.execute("SELECT id FROM veiculos WHERE placa = %s", (placa,))
-            resultado = cursor.fetchone()
-            veiculo_id = resultado[0] if resultado else None
-            
-            cursor.execute("""
-                INSERT INTO acessos 
-                (veiculo_id, placa, tipo_evento, confianca, imagem_path)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (veiculo_id, placa, 'DETECTADO', confianca, imagem_path))
-            
-            self.conn.commit()
-            return True
-        except Exception as e:
-            print(f"❌ Erro ao registrar acesso: {e}")
-            self.conn.rollback()
-            return False
+        Args:
+            veiculo: resultado de buscar_veiculo (o veiculo_id dispensa nova consulta por placa) ou None
+                (a sincronização resolve o veículo pela placa)
+            alertas: [(tipo_alerta, mensagem)]; gravados apenas para veículo cadastrado
+        
+        Returns:
+            Chaves dos alertas (para vincular o clipe), ou None se o acesso não foi registrado
+        """
+        alertas = [{'chave': nova_chave(), 'tipo_alerta': tipo_alerta, 'mensagem': mensagem}
+                   for tipo_alerta, mensagem in alertas]
+        chave = self._registrar_evento('acesso_com_alertas', {
+            'placa': placa,
+            'tipo_placa': tipo_placa,
+            'confianca': confianca,
+            'imagem_path': imagem_path,
+            'camera': NOME_CAMERA,
+            'data_acesso': datetime.now().isoformat(),
+            'veiculo_id': veiculo['veiculo_id'] if veiculo else None,
+            'alertas': alertas,
+        }, 'registrar_deteccao')
+        if chave is None:
+            return None
+        return [alerta['chave'] for alerta in alertas]
     
+    @cronometrar(DB_LATENCIA.rotulo('cadastrar_usuario'))
     def cadastrar_usuario(self, nome: str, cpf: str, telefone: str, tipo: str, autorizado: bool = True) -> int:
         """Cadastra um novo usuário"""
-        if not self.conn:
+        if not self.disponivel():
             return None
         
         try:
@@ -249,16 +355,19 @@ class GerenciadorBanco:
             
             usuario_id = cursor.fetchone()[0]
             self.conn.commit()
+            fragmentos.invalidar('usuarios', 'opcoes_usuarios')
             return usuario_id
         except Exception as e:
+            DB_FALHAS.rotulo('cadastrar_usuario').inc()
             print(f"❌ Erro ao cadastrar usuário: {e}")
-            self.conn.rollback()
+            self._desfazer()
             return None
     
+    @cronometrar(DB_LATENCIA.rotulo('cadastrar_veiculo'))
     def cadastrar_veiculo(self, placa: str, tipo_placa: str, usuario_id: int, 
                          modelo: str = None, cor: str = None, tipo_veiculo: str = 'CARRO') -> bool:
         """Cadastra um novo veículo vinculado a um usuário"""
-        if not self.conn:
+        if not self.disponivel():
             return False
         
         try:
@@ -270,15 +379,47 @@ class GerenciadorBanco:
             """, (placa, tipo_placa, usuario_id, modelo, cor, tipo_veiculo))
             
             self.conn.commit()
+            fragmentos.invalidar('veiculos')
+            self._atualizar_observacao(placa)
             return True
         except Exception as e:
+            DB_FALHAS.rotulo('cadastrar_veiculo').inc()
             print(f"❌ Erro ao cadastrar veículo: {e}")
-            self.conn.rollback()
+            self._desfazer()
             return False
     
+    @cronometrar(DB_LATENCIA.rotulo('importar_cadastros'))
+    def importar_cadastros(self, arquivo, simular: bool = False):
+        """
+        Importa usuários e veículos de um CSV em uma transação (ver importacao.py)
+        
+        Returns:
+            Relatório da importação, ou None se o banco falhar
+        
+        Raises:
+            ValueError: cabeçalho do CSV inválido
+        """
+        if not self.disponivel():
+            return None
+        
+        try:
+            relatorio = importacao.importar(self.conn, arquivo, validar_placa, simular, NOME_CAMERA)
+        except ValueError:
+            raise
+        except Exception as e:
+            DB_FALHAS.rotulo('importar_cadastros').inc()
+            print(f"❌ Erro ao importar cadastros: {e}")
+            return None
+        
+        if relatorio['importadas'] and not simular:
+            fragmentos.invalidar('veiculos', 'usuarios', 'opcoes_usuarios')
+            self.carregar_lista_observacao()
+        return relatorio
+    
+    @cronometrar(DB_LATENCIA.rotulo('marcar_veiculo'))
     def marcar_veiculo(self, placa: str, motivo: str) -> bool:
         """Marca um veículo para controle específico"""
-        if not self.conn:
+        if not self.disponivel():
             return False
         
         try:
@@ -289,42 +430,45 @@ class GerenciadorBanco:
                 WHERE placa = %s
             """, (motivo, placa))
             
-            # Cria alerta
+            # Cria alerta (contado nas estatísticas na mesma transação, como os demais alertas)
+            momento = datetime.now()
             cursor.execute("""
-                INSERT INTO alertas (veiculo_id, placa, tipo_alerta, mensagem)
-                SELECT id, placa, 'VEICULO_MARCADO', %s
+                INSERT INTO alertas (veiculo_id, placa, tipo_alerta, mensagem, camera, data_alerta)
+                SELECT id, placa, 'VEICULO_MARCADO', %s, %s, %s
                 FROM veiculos WHERE placa = %s
-            """, (motivo, placa))
+            """, (motivo, NOME_CAMERA, momento, placa))
+            if cursor.rowcount:
+                estatisticas.registrar_alerta(cursor, momento, NOME_CAMERA, 'VEICULO_MARCADO')
             
             self.conn.commit()
+            self._atualizar_observacao(placa)
             return True
         except Exception as e:
+            DB_FALHAS.rotulo('marcar_veiculo').inc()
             print(f"❌ Erro ao marcar veículo: {e}")
-            self.conn.rollback()
+            self._desfazer()
             return False
     
-    def gerar_alerta(self, placa: str, tipo_alerta: str, mensagem: str) -> bool:
-        """Gera um alerta para um veículo"""
-        if not self.conn:
-            return False
-        
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO alertas (veiculo_id, placa, tipo_alerta, mensagem)
-                SELECT id, %s, %s, %s FROM veiculos WHERE placa = %s
-            """, (placa, tipo_alerta, mensagem, placa))
-            
-            self.conn.commit()
-            return True
-        except Exception as e:
-            print(f"❌ Erro ao gerar alerta: {e}")
-            self.conn.rollback()
-            return False
+    @cronometrar(DB_LATENCIA.rotulo('gerar_alerta'))
+    def gerar_alerta(self, placa: str, tipo_alerta: str, mensagem: str):
+        """Gera um alerta para um veículo e retorna a chave do alerta (None se não gerado)"""
+        return self._registrar_evento('alerta', {
+            'placa': placa,
+            'tipo_alerta': tipo_alerta,
+            'mensagem': mensagem,
+            'camera': NOME_CAMERA,
+            'data_alerta': datetime.now().isoformat(),
+        }, 'gerar_alerta')
+    
+    @cronometrar(DB_LATENCIA.rotulo('vincular_clipe'))
+    def vincular_clipe(self, chave_alerta: str, arquivo: str) -> bool:
+        """Associa o clipe gravado ao alerta"""
+        return self._registrar_evento('clipe', {'chave_alerta': chave_alerta, 'clipe': arquivo},
+                                      'vincular_clipe') is not None
     
     def listar_veiculos(self, limite=100):
         """Lista todos os veículos cadastrados"""
-        if not self.conn:
+        if not self.disponivel():
             return []
         
         try:
@@ -357,7 +501,7 @@ class GerenciadorBanco:
     
     def listar_usuarios(self, limite=100):
         """Lista todos os usuários"""
-        if not self.conn:
+        if not self.disponivel():
             return []
         
         try:
@@ -384,7 +528,7 @@ class GerenciadorBanco:
     
     def listar_alertas(self, apenas_nao_resolvidos=True, limite=50):
         """Lista alertas do sistema"""
-        if not self.conn:
+        if not self.disponivel():
             return []
         
         try:
@@ -392,7 +536,7 @@ class GerenciadorBanco:
             
             query = """
                 SELECT a.id, a.placa, a.tipo_alerta, a.mensagem, 
-                       a.resolvido, a.data_alerta, v.modelo, u.nome
+                       a.resolvido, a.data_alerta, v.modelo, u.nome, a.clipe
                 FROM alertas a
                 LEFT JOIN veiculos v ON a.veiculo_id = v.id
                 LEFT JOIN usuarios u ON v.usuario_id = u.id
@@ -413,28 +557,54 @@ class GerenciadorBanco:
                 'resolvido': row[4],
                 'data_alerta': row[5],
                 'modelo': row[6],
-                'usuario_nome': row[7]
+                'usuario_nome': row[7],
+                'clipe': row[8]
             } for row in cursor.fetchall()]
         except Exception as e:
             print(f"❌ Erro ao listar alertas: {e}")
             return []
     
+    @cronometrar(DB_LATENCIA.rotulo('estatisticas'))
+    def resumo_estatisticas(self, dia=None, camera=None, serie=False):
+        """Totais do dia lidos das tabelas pré-agregadas (com a série por hora se serie=True)"""
+        if not self.disponivel():
+            return None
+        
+        try:
+            cursor = self.conn.cursor()
+            resumo = estatisticas.resumo_dia(cursor, dia, camera)
+            if serie:
+                resumo['por_hora'] = estatisticas.serie_horaria(cursor, dia, camera)
+            return resumo
+        except Exception as e:
+            print(f"❌ Erro ao consultar estatísticas: {e}")
+            self._desfazer()
+            return None
+    
     def listar_acessos_recentes(self, limite=50):
         """Lista acessos recentes"""
-        if not self.conn:
+        if not self.disponivel():
             return []
         
         try:
             cursor = self.conn.cursor()
-            cursor.execute("""
+            consulta = """
                 SELECT a.placa, a.tipo_evento, a.confianca, a.data_acesso,
                        v.modelo, u.nome, u.tipo
                 FROM acessos a
                 LEFT JOIN veiculos v ON a.veiculo_id = v.id
                 LEFT JOIN usuarios u ON v.usuario_id = u.id
+                WHERE a.data_acesso >= %s
                 ORDER BY a.data_acesso DESC
                 LIMIT %s
-            """, (limite,))
+            """
+            # O filtro pelo mês atual faz o planejador ler só a partição corrente;
+            # no início do mês, se ela não tiver acessos suficientes, consulta sem o filtro
+            cursor.execute(consulta, (particoes.inicio_mes(), limite))
+            linhas = cursor.fetchall()
+            if len(linhas) < limite:
+                cursor.execute(consulta, (datetime.min, limite))
+                linhas = cursor.fetchall()
             
             return [{
                 'placa': row[0],
@@ -444,7 +614,7 @@ class GerenciadorBanco:
                 'modelo': row[4],
                 'usuario_nome': row[5],
                 'usuario_tipo': row[6]
-            } for row in cursor.fetchall()]
+            } for row in linhas]
         except Exception as e:
             print(f"❌ Erro ao listar acessos: {e}")
             return []
@@ -457,46 +627,16 @@ class GerenciadorBanco:
 
 
 def inicializar_ocr():
-    """Inicializa o modelo OCR"""
-    global ocr
-    print("\nCarregando modelo OCR...")
-    
-    gpu_disponivel = paddle.device.is_compiled_with_cuda()
-    
-    if gpu_disponivel:
-        try:
-            paddle.set_device('gpu')
-            print("✓ GPU ATIVADA (CUDA)")
-        except:
-            paddle.set_device('cpu')
-            print("⚠ Usando CPU")
-    else:
-        paddle.set_device('cpu')
-        print("⚠ Usando CPU (CUDA não disponível)")
-    
-    ocr = PaddleOCR(use_angle_cls=True, lang='en')
-    print("✓ Modelo OCR carregado")
+    """Dispara o carregamento do modelo OCR em background"""
+    carregador_ocr.iniciar()
 
 
-def validar_placa(texto: str, eh_combinacao: bool = False):
-    """
-    Valida se o texto é uma placa brasileira válida
-    
-    Returns:
-        (placa, tipo) ou (None, None)
-    """
-    texto_limpo = texto.upper()
-    texto_limpo = re.sub(r'[^A-Z0-9]', '', texto_limpo)
-    
-    texto_corrigido = texto_limpo.replace('O', '0').replace('I', '1').replace('S', '5')
-    
-    for texto_teste in [texto_limpo, texto_corrigido]:
-        if PADRAO_MERCOSUL_CARRO.match(texto_teste):
-            return texto_teste, "MERCOSUL_MOTO" if eh_combinacao else "MERCOSUL_CARRO"
-        elif PADRAO_ANTIGO_CARRO.match(texto_teste):
-            return texto_teste, "ANTIGA_MOTO" if eh_combinacao else "ANTIGA_CARRO"
-    
-    return None, None
+def obter_ocr():
+    """Retorna o modelo OCR se já estiver pronto (None enquanto carrega)"""
+    global ocr
+    if ocr is None and carregador_ocr.pronto:
+        ocr = carregador_ocr.ocr
+    return ocr
 
 
 def pode_processar_placa(placa: str) -> bool:
@@ -544,215 +684,344 @@ def salvar_imagem_placa(frame, coords, placa, eh_conhecida=False):
         return None
 
 
+def atualizar_ultima_deteccao(deteccao):
+    """Atualiza a última detecção e notifica os painéis conectados"""
+    global ultima_deteccao
+
+    anterior = ultima_deteccao
+    ultima_deteccao = deteccao
+
+    # Mesma placa parada na frente da câmera: notifica no máximo a cada N segundos
+    if (anterior and anterior['placa'] == deteccao['placa'] and
+            (deteccao['timestamp'] - anterior['timestamp']).total_seconds() < INTERVALO_EVENTO_DETECCAO):
+        ultima_deteccao = anterior
+        return
+
+    publica = {campo: deteccao[campo] for campo in CAMPOS_DETECCAO_PUBLICOS}
+    eventos.publicar('deteccao', publica)
+    ultima_deteccao_json.publicar(para_json(publica).encode('utf-8'))
+
+
+def processar_placa(frame, coords, placa, tipo, confianca, eh_moto=False, capturado_em=None):
+    """
+    Consulta o veículo, registra o acesso (respeitando o cooldown) e gera alertas, inclusive os de
+    leituras parecidas com a lista de observação (com clipe do evento para os tipos em TIPOS_ALERTA_COM_CLIPE)
+
+    Returns:
+        Dicionário da detecção para desenhar no frame
+    """
+    # Busca informações do veículo (SEMPRE busca para exibir)
+    with rastreador.etapa('banco'):
+        veiculo = conn_db.buscar_veiculo(placa)
+    placa_conhecida = veiculo is not None
+
+    # Verifica se deve SALVAR/REGISTRAR (com cooldown)
+    if pode_processar_placa(placa):
+        # Salva imagem
+        with rastreador.etapa('imagem'):
+            caminho_img = salvar_imagem_placa(frame, coords, placa, placa_conhecida)
+
+        # Atualiza cache
+        placas_cache[placa] = datetime.now()
+
+        # Alertas do veículo conhecido. Com o banco fora do ar, a placa da lista de observação (em memória)
+        # ainda gera os alertas; a sincronização do diário resolve o veículo pela placa
+        alertas = []
+        observado = veiculo or lista_observacao.obter(placa)
+        if observado:
+            # Verifica se está marcado
+            if observado.get('marcado'):
+                prefixo = "Veículo marcado" if eh_moto else "Veículo marcado detectado"
+                alertas.append(('VEICULO_MARCADO', f"{prefixo}: {observado.get('motivo_marcacao')}"))
+
+            # Verifica se usuário não está autorizado
+            if not observado.get('usuario_autorizado'):
+                prefixo = "Usuário não autorizado" if eh_moto else "Veículo de usuário não autorizado"
+                alertas.append(('NAO_AUTORIZADO', f"{prefixo}: {observado.get('usuario_nome')}"))
+
+        # Registra acesso e alertas juntos (um evento, uma ida ao banco)
+        with rastreador.etapa('banco'):
+            chaves_alertas = conn_db.registrar_deteccao(placa, tipo, confianca, caminho_img, veiculo, alertas)
+        if chaves_alertas is not None:
+            eventos.publicar('acesso', {
+                'placa': placa,
+                'tipo_evento': 'DETECTADO',
+                'confianca': confianca,
+                'data_acesso': datetime.now(),
+                'modelo': veiculo.get('modelo') if veiculo else None,
+                'usuario_nome': veiculo.get('usuario_nome') if veiculo else None,
+                'usuario_tipo': veiculo.get('usuario_tipo') if veiculo else None
+            })
+
+        alertas_com_clipe = []
+        for (tipo_alerta, mensagem), chave_alerta in zip(alertas, chaves_alertas or ()):
+            eventos.publicar('alerta', {
+                'placa': placa,
+                'tipo_alerta': tipo_alerta,
+                'mensagem': mensagem,
+                'data_alerta': datetime.now()
+            })
+            if tipo_alerta in TIPOS_ALERTA_COM_CLIPE:
+                alertas_com_clipe.append(chave_alerta)
+
+        # Leitura parecida com uma placa da lista de observação: pode ser a placa marcada lida errado pelo OCR.
+        # O alerta fica na placa observada (cadastrada), com a leitura e a distância na mensagem
+        with rastreador.etapa('observacao'):
+            correspondencias = lista_observacao.buscar(placa)
+        for placa_observada, distancia, info in correspondencias:
+            motivo = (f"marcado: {info['motivo_marcacao']}" if info['marcado']
+                      else f"usuário não autorizado: {info['usuario_nome']}")
+            mensagem = (f"Possível correspondência: lido {placa}, distância {distancia:g} "
+                        f"de {placa_observada} ({motivo})")
+            with rastreador.etapa('banco'):
+                chave_alerta = conn_db.gerar_alerta(placa_observada, 'POSSIVEL_CORRESPONDENCIA', mensagem)
+            print(f"⚠️  {mensagem}")
+            # Como os alertas do veículo: o painel só recebe o alerta que foi gravado
+            if chave_alerta is None:
+                continue
+            eventos.publicar('alerta', {
+                'placa': placa_observada,
+                'placa_lida': placa,
+                'distancia': distancia,
+                'tipo_alerta': 'POSSIVEL_CORRESPONDENCIA',
+                'mensagem': mensagem,
+                'data_alerta': datetime.now()
+            })
+            alertas_com_clipe.append(chave_alerta)
+
+        # Um clipe por evento, vinculado a todos os alertas dele
+        if alertas_com_clipe:
+            gravador_clipes.solicitar(placa, capturado_em, alertas_com_clipe)
+
+        if veiculo:
+            if eh_moto:
+                print(f"✓ Moto conhecida: {placa} - {veiculo.get('usuario_nome')}")
+            else:
+                print(f"✓ Veículo conhecido: {placa} - {veiculo.get('usuario_nome')} ({veiculo.get('usuario_tipo')})")
+        elif eh_moto:
+            print(f"🆕 PLACA NOVA (MOTO): {placa} ({tipo}) - {confianca:.2%}")
+        else:
+            print(f"🆕 PLACA NOVA DETECTADA: {placa} ({tipo}) - {confianca:.2%}")
+
+    # Atualiza última detecção
+    atualizar_ultima_deteccao({
+        'placa': placa,
+        'tipo': tipo,
+        'confianca': confianca,
+        'conhecida': placa_conhecida,
+        'veiculo': veiculo,
+        'timestamp': datetime.now()
+    })
+
+    # SEMPRE adiciona às detecções para exibir no frame
+    return {
+        'placa': placa,
+        'tipo': tipo,
+        'confianca': confianca,
+        'coordenadas': coords,
+        'conhecida': placa_conhecida,
+        'imagem': None,
+        'veiculo': veiculo
+    }
+
+
 def generate_frames():
     """
     Loop principal de captura e processamento de vídeo
+    Executado por um único laco_processamento(); os clientes recebem os frames por quadros_mjpeg
     """
-    global frame_atual, ultima_deteccao, conn_db, placas_cache
-    
     print("\nIniciando captura de vídeo...")
-    
-    if USAR_WEBCAM:
-        cap = cv2.VideoCapture(INDICE_CAMERA)
-        print(f"📹 Usando WEBCAM (índice {INDICE_CAMERA})")
-    else:
-        cap = cv2.VideoCapture(ARQUIVO_VIDEO)
-        print(f"📹 Processando vídeo: {ARQUIVO_VIDEO}")
-    
-    if not cap.isOpened():
-        print("❌ ERRO: Não foi possível abrir câmera/vídeo")
-        return
-    
-    print("✓ Câmera/vídeo conectado. Stream pronto em /video_feed")
+    fonte_camera.iniciar()
     
     frame_count = 0
+    ultimo_indice = -1
+    perdidos_desde_ocr = 0  # Fila observada pelo controlador: perdas desde o último frame com OCR
+    quadro_desenho = None  # Buffer de desenho reutilizado a cada frame
+    controlador = ControladorAmostragem(CONFIG_AMOSTRAGEM)
     
     while True:
-        ret, frame = cap.read()
+        rastreador.iniciar_frame(frame_count + 1)
+        with rastreador.etapa('leitura'):
+            quadro = fonte_camera.ler(apos=ultimo_indice)
         
-        if not ret:
-            print("Erro ao receber frame, tentando reconectar...")
-            cap.release()
-            if USAR_WEBCAM:
-                cap = cv2.VideoCapture(INDICE_CAMERA)
-            else:
-                cap = cv2.VideoCapture(ARQUIVO_VIDEO)
+        if quadro is None:
+            if not fonte_camera.ativa:
+                print("⏹️  Fonte de vídeo finalizada")
+                return
+            # Câmera reconectando: a fonte faz o backoff, aqui só aguardamos
             continue
         
-        frame_count += 1
-        frame_atual = frame.copy()
-        deteccoes = []
+        # Frames que chegaram enquanto este stream processava o anterior
+        perdidos = quadro.indice - ultimo_indice - 1 if ultimo_indice >= 0 else 0
+        if perdidos > 0:
+            metricas.FRAMES_DESCARTADOS.rotulo('substituido').inc(perdidos)
+            perdidos_desde_ocr += perdidos
+        ultimo_indice = quadro.indice
+        frame = quadro.frame
+        inicio_frame = quadro.capturado_em
         
-        # Processa apenas a cada N frames
-        if frame_count % PROCESSAR_A_CADA_N_FRAMES == 0:
-            try:
-                resultado = ocr.ocr(frame, cls=True)
+        try:
+            frame_count += 1
+            metricas.FRAMES_CAPTURADOS.inc()
+            deteccoes = []
+        
+            # Processa apenas os frames escolhidos pelo controlador de amostragem
+            if not controlador.deve_processar(frame):
+                metricas.FRAMES_DESCARTADOS.rotulo('nao_amostrado').inc()
+            elif obter_ocr() is None:
+                # Modelo ainda carregando: o stream segue sem reconhecimento
+                metricas.FRAMES_DESCARTADOS.rotulo('ocr_carregando').inc()
+            else:
+                try:
+                    with rastreador.etapa('ocr'):
+                        resultado = reconhecer(ocr, frame, CONFIG_OCR, CONFIANCA_MINIMA)
                 
-                if resultado and resultado[0]:
-                    textos_detectados = []
+                    if resultado:
+                        textos_detectados = []
                     
-                    for linha in resultado[0]:
-                        coords = linha[0]
-                        texto = linha[1][0]
-                        confianca = linha[1][1]
+                        for linha in resultado:
+                            coords = linha[0]
+                            texto = linha[1][0]
+                            confianca = linha[1][1]
                         
-                        if confianca >= CONFIANCA_MINIMA:
-                            textos_detectados.append({
-                                'texto': texto,
-                                'coords': coords,
-                                'confianca': confianca
-                            })
+                            if confianca >= CONFIANCA_MINIMA:
+                                textos_detectados.append({
+                                    'texto': texto,
+                                    'coords': coords,
+                                    'confianca': confianca
+                                })
                     
-                    # Valida placas individuais (carros)
-                    for item in textos_detectados:
-                        placa, tipo = validar_placa(item['texto'], eh_combinacao=False)
+                        # Valida placas individuais (carros)
+                        for item in textos_detectados:
+                            placa, tipo = validar_placa(item['texto'], eh_combinacao=False)
                         
-                        if placa:
-                            # Busca informações do veículo (SEMPRE busca para exibir)
-                            veiculo = conn_db.buscar_veiculo(placa)
-                            placa_conhecida = veiculo is not None
-                            
-                            # Verifica se deve SALVAR/REGISTRAR (com cooldown)
-                            deve_registrar = pode_processar_placa(placa)
-                            
-                            if deve_registrar:
-                                # Salva imagem
-                                caminho_img = salvar_imagem_placa(
-                                    frame, item['coords'], placa, placa_conhecida
-                                )
-                                
-                                # Atualiza cache
-                                placas_cache[placa] = datetime.now()
-                                
-                                # Registra acesso
-                                conn_db.registrar_acesso(placa, item['confianca'], caminho_img)
-                                
-                                # Verifica alertas se for veículo conhecido
-                                if veiculo:
-                                    # Verifica se está marcado
-                                    if veiculo.get('marcado'):
-                                        conn_db.gerar_alerta(placa, 'VEICULO_MARCADO', 
-                                                            f"Veículo marcado detectado: {veiculo.get('motivo_marcacao')}")
-                                    
-                                    # Verifica se usuário não está autorizado
-                                    if not veiculo.get('usuario_autorizado'):
-                                        conn_db.gerar_alerta(placa, 'NAO_AUTORIZADO', 
-                                                            f"Veículo de usuário não autorizado: {veiculo.get('usuario_nome')}")
-                                    
-                                    print(f"✓ Veículo conhecido: {placa} - {veiculo.get('usuario_nome')} ({veiculo.get('usuario_tipo')})")
-                                else:
-                                    print(f"🆕 PLACA NOVA DETECTADA: {placa} ({tipo}) - {item['confianca']:.2%}")
-                            
-                            # SEMPRE adiciona às detecções para exibir no frame
-                            deteccoes.append({
-                                'placa': placa,
-                                'tipo': tipo,
-                                'confianca': item['confianca'],
-                                'coordenadas': item['coords'],
-                                'conhecida': placa_conhecida,
-                                'imagem': None,
-                                'veiculo': veiculo
-                            })
-                            
-                            # Atualiza última detecção
-                            ultima_deteccao = {
-                                'placa': placa,
-                                'tipo': tipo,
-                                'confianca': item['confianca'],
-                                'conhecida': placa_conhecida,
-                                'veiculo': veiculo,
-                                'timestamp': datetime.now()
-                            }
+                            if placa:
+                                deteccoes.append(processar_placa(
+                                    frame, item['coords'], placa, tipo, item['confianca'],
+                                    capturado_em=inicio_frame
+                                ))
                     
-                    # Tenta combinar textos (motos)
-                    for i, item1 in enumerate(textos_detectados):
-                        for item2 in textos_detectados[i+1:]:
-                            texto1 = re.sub(r'[^A-Z0-9]', '', item1['texto'].upper())
-                            texto2 = re.sub(r'[^A-Z0-9]', '', item2['texto'].upper())
-                            
-                            combinado = texto1 + texto2
-                            placa, tipo = validar_placa(combinado, eh_combinacao=True)
+                        # Tenta combinar textos (motos)
+                        for i, item1 in enumerate(textos_detectados):
+                            for item2 in textos_detectados[i+1:]:
+                                metricas.PAREAMENTOS_MOTO.inc()
+                                with rastreador.etapa('pareamento'):
+                                    texto1 = re.sub(r'[^A-Z0-9]', '', item1['texto'].upper())
+                                    texto2 = re.sub(r'[^A-Z0-9]', '', item2['texto'].upper())
+                                
+                                    combinado = texto1 + texto2
+                                    placa, tipo = validar_placa(combinado, eh_combinacao=True)
                             
-                            if placa:
-                                confianca_media = (item1['confianca'] + item2['confianca']) / 2
+                                if placa:
+                                    confianca_media = (item1['confianca'] + item2['confianca']) / 2
                                 
-                                if confianca_media >= CONFIANCA_MINIMA_MOTO:
-                                    # Busca informações do veículo (SEMPRE busca para exibir)
-                                    veiculo = conn_db.buscar_veiculo(placa)
-                                    placa_conhecida = veiculo is not None
-                                    
-                                    # Verifica se deve SALVAR/REGISTRAR (com cooldown)
-                                    deve_registrar = pode_processar_placa(placa)
-                                    
-                                    if deve_registrar:
-                                        caminho_img = salvar_imagem_placa(
-                                            frame, item1['coords'], placa, placa_conhecida
-                                        )
-                                        
-                                        placas_cache[placa] = datetime.now()
-                                        
-                                        conn_db.registrar_acesso(placa, confianca_media, caminho_img)
-                                        
-                                        if veiculo:
-                                            if veiculo.get('marcado'):
-                                                conn_db.gerar_alerta(placa, 'VEICULO_MARCADO', 
-                                                                    f"Veículo marcado: {veiculo.get('motivo_marcacao')}")
-                                            
-                                            if not veiculo.get('usuario_autorizado'):
-                                                conn_db.gerar_alerta(placa, 'NAO_AUTORIZADO', 
-                                                                    f"Usuário não autorizado: {veiculo.get('usuario_nome')}")
-                                            
-                                            print(f"✓ Moto conhecida: {placa} - {veiculo.get('usuario_nome')}")
-                                        else:
-                                            print(f"🆕 PLACA NOVA (MOTO): {placa} ({tipo}) - {confianca_media:.2%}")
-                                    
-                                    # SEMPRE adiciona às detecções para exibir no frame
-                                    deteccoes.append({
-                                        'placa': placa,
-                                        'tipo': tipo,
-                                        'confianca': confianca_media,
-                                        'coordenadas': item1['coords'],
-                                        'conhecida': placa_conhecida,
-                                        'imagem': None,
-                                        'veiculo': veiculo
-                                    })
-                                    
-                                    ultima_deteccao = {
-                                        'placa': placa,
-                                        'tipo': tipo,
-                                        'confianca': confianca_media,
-                                        'conhecida': placa_conhecida,
-                                        'veiculo': veiculo,
-                                        'timestamp': datetime.now()
-                                    }
-                                    break
+                                    if confianca_media >= CONFIANCA_MINIMA_MOTO:
+                                        deteccoes.append(processar_placa(
+                                            frame, item1['coords'], placa, tipo, confianca_media,
+                                            eh_moto=True, capturado_em=inicio_frame
+                                        ))
+                                        break
             
-            except Exception as e:
-                print(f"Erro na análise: {e}")
-                pass
+                except Exception as e:
+                    print(f"Erro na análise: {e}")
+                    pass
+            
+                # Perdas durante o OCR só aparecem na leitura seguinte, em geral de um frame não amostrado
+                controlador.registrar(time.perf_counter() - inicio_frame, fila=perdidos_desde_ocr,
+                                      veiculo=bool(deteccoes))
+                perdidos_desde_ocr = 0
         
-        # Desenha interface no frame
-        frame_desenho = desenhar_interface(frame, deteccoes, frame_count)
+            # Desenha interface no frame
+            with rastreador.etapa('desenho'):
+                quadro_desenho = desenhar_interface(frame, deteccoes, frame_count, destino=quadro_desenho)
+        finally:
+            # Desenhado no buffer próprio do stream: o slot da câmera já pode ser reciclado
+            fonte_camera.liberar(quadro)
         
         # Codifica para JPEG
-        ret, buffer = cv2.imencode('.jpg', frame_desenho)
+        with rastreador.etapa('codificacao'), metricas.CODIFICACAO_JPEG.cronometrar():
+            ret, buffer = cv2.imencode('.jpg', quadro_desenho)
+        rastreador.concluir_frame()
         if not ret:
             continue
         
         frame_bytes = buffer.tobytes()
+        buffer_clipes.adicionar(quadro.indice, quadro.capturado_em, frame_bytes)
+        instantaneo.publicar(quadro.indice, frame_bytes)
         yield (b'--frame\r\n'
                b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
 
 
-def desenhar_interface(frame, deteccoes, frame_count):
-    """Desenha interface no frame com informações detalhadas"""
-    frame_desenho = frame.copy()
+def laco_processamento():
+    """
+    Executa generate_frames() enquanto houver clientes MJPEG e publica cada frame em quadros_mjpeg
+    (roda em thread própria: OCR e banco nunca ocupam o event loop nem as threads dos clientes)
+    """
+    global thread_processamento
+    gerador = generate_frames()
+    try:
+        for parte in gerador:
+            quadros_mjpeg.publicar(parte)
+            with lock_processamento:
+                if clientes_processamento == 0:
+                    thread_processamento = None
+                    print("⏸️  Nenhum cliente assistindo: processamento pausado")
+                    return
+    except Exception as e:
+        print(f"❌ Erro no processamento de vídeo: {e}")
+    finally:
+        gerador.close()
+    with lock_processamento:
+        thread_processamento = None
+    # Fim da fonte: os clientes encerram seus streams
+    quadros_mjpeg.publicar(None)
+
+
+def entrar_cliente_mjpeg() -> int:
+    """Registra um cliente e inicia o laço de processamento se ele estiver parado; retorna a versão atual"""
+    global clientes_processamento, thread_processamento
+    metricas.CLIENTES_MJPEG.inc()
+    with lock_processamento:
+        clientes_processamento += 1
+        if thread_processamento is None:
+            thread_processamento = threading.Thread(target=laco_processamento, name='processamento-video',
+                                                    daemon=True)
+            thread_processamento.start()
+    return quadros_mjpeg.obter()[0]
+
+
+def sair_cliente_mjpeg():
+    global clientes_processamento
+    metricas.CLIENTES_MJPEG.dec()
+    with lock_processamento:
+        clientes_processamento -= 1
+
+
+def mesclar_retangulo(imagem, p1, p2, cor, alfa):
+    """Preenche o retângulo com a cor e opacidade `alfa`, alterando só a região (sem copiar o frame)"""
+    x1, y1 = max(int(p1[0]), 0), max(int(p1[1]), 0)
+    x2, y2 = min(int(p2[0]) + 1, imagem.shape[1]), min(int(p2[1]) + 1, imagem.shape[0])
+    if x1 >= x2 or y1 >= y2:
+        return
+    regiao = imagem[y1:y2, x1:x2]
+    fundo = np.empty_like(regiao)
+    fundo[:] = cor
+    cv2.addWeighted(fundo, alfa, regiao, 1 - alfa, 0, dst=regiao)
+
+
+def desenhar_interface(frame, deteccoes, frame_count, destino=None):
+    """
+    Desenha interface com informações detalhadas em `destino` (reutilizado entre frames)
+    O frame original não é alterado: pode ser uma view somente leitura do barramento
+    """
+    if destino is None or destino.shape != frame.shape:
+        destino = np.empty_like(frame)
+    np.copyto(destino, frame)
+    frame_desenho = destino
     altura, largura = frame.shape[:2]
     
     # Barra superior com fundo semitransparente
-    overlay = frame_desenho.copy()
-    cv2.rectangle(overlay, (0, 0), (largura, 90), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.7, frame_desenho, 0.3, 0, frame_desenho)
+    mesclar_retangulo(frame_desenho, (0, 0), (largura, 90), (0, 0, 0), 0.7)
     
     # Título
     titulo = "SISTEMA DE RECONHECIMENTO DE PLACAS - IFSULDEMINAS"
@@ -840,12 +1109,10 @@ def desenhar_interface(frame, deteccoes, frame_count):
             y_text = y - 10  # Desenha em cima
         
         # Desenha fundo semitransparente para o texto
-        overlay = frame_desenho.copy()
-        cv2.rectangle(overlay, 
-                     (x - 5, y_text - total_height - 5), 
-                     (x + max_width + 10, y_text + 5), 
-                     cor, -1)
-        cv2.addWeighted(overlay, 0.85, frame_desenho, 0.15, 0, frame_desenho)
+        mesclar_retangulo(frame_desenho,
+                          (x - 5, y_text - total_height - 5),
+                          (x + max_width + 10, y_text + 5),
+                          cor, 0.85)
         
         # Desenha borda do fundo
         cv2.rectangle(frame_desenho, 
@@ -871,21 +1138,29 @@ def desenhar_interface(frame, deteccoes, frame_count):
 
 # --- ROTAS FLASK ---
 
-@app.route('/')
-def index():
-    """Página principal - Dashboard Moderno"""
+FRAGMENTO_VEICULOS = modelos.registrar('fragmento_veiculos.html', """
+                                    {% for veiculo in veiculos %}
+                                    <tr>
+                                        <td><span class="badge-placa px-2">{{ veiculo.placa }}</span></td>
+                                        <td>{{ veiculo.modelo or '-' }}</td>
+                                        <td>{{ veiculo.usuario_nome }}</td>
+                                        <td>
+                                            <a href="{{ url_for('detalhes_veiculo', placa=veiculo.placa) }}" class="btn btn-sm btn-outline-light">
+                                                <i class="fas fa-search"></i>
+                                            </a>
+                                        </td>
+                                    </tr>
+                                    {% endfor %}
+""")
+
+
+def renderizar_tabela_veiculos():
+    """(total, linhas da tabela) da base de veículos, para o cache de fragmentos"""
     veiculos = conn_db.listar_veiculos(100)
-    alertas = conn_db.listar_alertas(apenas_nao_resolvidos=True, limite=10)
-    acessos = conn_db.listar_acessos_recentes(limite=20)
-    
-    # Lista imagens de placas desconhecidas
-    imagens_desconhecidas = sorted(
-        glob.glob(os.path.join(PASTA_PLACAS_DESCONHECIDAS, "*.jpg")),
-        key=os.path.getmtime,
-        reverse=True
-    )[:20]  # Últimas 20
-    
-    html_page = """
+    return len(veiculos), marcar_seguro(modelos.renderizar(FRAGMENTO_VEICULOS, veiculos=veiculos))
+
+
+PAGINA_INDEX = modelos.registrar('index.html', """
     <!doctype html>
     <html lang="pt-br" data-bs-theme="dark">
     <head>
@@ -910,6 +1185,9 @@ def index():
         <nav class="navbar navbar-expand-lg navbar-dark mb-4 p-3">
             <div class="container-fluid">
                 <a class="navbar-brand fw-bold" href="#"><i class="fas fa-eye me-2"></i>SENTINEL SYSTEM</a>
+                <span id="estado-camera" class="badge {{ 'bg-success' if camera.estado == 'conectado' else 'bg-warning text-dark' }}"
+                      title="{{ camera.erro or camera.origem }}"><i class="fas fa-video me-1"></i>{{ camera.estado|upper }}</span>
+                <span id="ultima-deteccao" class="badge bg-dark border border-secondary font-monospace d-none"></span>
                 <div class="d-flex gap-2">
                     <a href="{{ url_for('live_view') }}" class="btn btn-danger btn-glow" target="_blank"><i class="fas fa-video me-2"></i>AO VIVO</a>
                     <a href="{{ url_for('cadastro_veiculo') }}" class="btn btn-primary"><i class="fas fa-plus me-2"></i>Novo Veículo</a>
@@ -919,11 +1197,13 @@ def index():
         </nav>
         
         <div class="container-fluid px-4">
+            <div id="area-alertas"></div>
             {% if alertas|length > 0 %}
                 {% for alerta in alertas[:3] %}
                 <div class="alert alert-dismissible fade show {% if alerta.tipo_alerta == 'VEICULO_MARCADO' %}alert-warning{% else %}alert-danger{% endif %} shadow-sm" role="alert">
                     <i class="fas fa-exclamation-triangle me-2"></i>
                     <strong>ALERTA:</strong> {{ alerta.mensagem }} ({{ alerta.placa }})
+                    {% if alerta.clipe %}<a href="{{ url_for('clipe_alerta', filename=alerta.clipe) }}" class="alert-link ms-2" target="_blank"><i class="fas fa-film me-1"></i>Clipe</a>{% endif %}
                     <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
                 </div>
                 {% endfor %}
@@ -935,7 +1215,7 @@ def index():
                         <div class="d-flex justify-content-between align-items-center">
                             <div>
                                 <h6 class="text-muted text-uppercase mb-1">Veículos Cadastrados</h6>
-                                <h2 class="fw-bold mb-0 text-success">{{ veiculos|length }}</h2>
+                                <h2 class="fw-bold mb-0 text-success">{{ total_veiculos }}</h2>
                             </div>
                             <div class="stat-icon text-success"><i class="fas fa-car"></i></div>
                         </div>
@@ -957,7 +1237,7 @@ def index():
                         <div class="d-flex justify-content-between align-items-center">
                             <div>
                                 <h6 class="text-muted text-uppercase mb-1">Alertas Ativos</h6>
-                                <h2 class="fw-bold mb-0 text-warning">{{ alertas|length }}</h2>
+                                <h2 id="contador-alertas" class="fw-bold mb-0 text-warning">{{ alertas|length }}</h2>
                             </div>
                             <div class="stat-icon text-warning"><i class="fas fa-bell"></i></div>
                         </div>
@@ -968,7 +1248,8 @@ def index():
                         <div class="d-flex justify-content-between align-items-center">
                             <div>
                                 <h6 class="text-muted text-uppercase mb-1">Acessos Recentes</h6>
-                                <h2 class="fw-bold mb-0 text-info">{{ acessos|length }}</h2>
+                                <h2 id="contador-acessos" class="fw-bold mb-0 text-info">{{ acessos|length }}</h2>
+                                {% if hoje %}<small class="text-muted">Hoje: {{ hoje.total }} detecções · {{ hoje.placas_unicas }} placas</small>{% endif %}
                             </div>
                             <div class="stat-icon text-info"><i class="fas fa-history"></i></div>
                         </div>
@@ -1025,7 +1306,7 @@ def index():
                                         <th>Horário</th>
                                     </tr>
                                 </thead>
-                                <tbody>
+                                <tbody id="tabela-acessos">
                                     {% for acesso in acessos %}
                                     <tr>
                                         <td><span class="badge-placa px-2 py-1">{{ acesso.placa }}</span></td>
@@ -1061,18 +1342,7 @@ def index():
                                     </tr>
                                 </thead>
                                 <tbody>
-                                    {% for veiculo in veiculos %}
-                                    <tr>
-                                        <td><span class="badge-placa px-2">{{ veiculo.placa }}</span></td>
-                                        <td>{{ veiculo.modelo or '-' }}</td>
-                                        <td>{{ veiculo.usuario_nome }}</td>
-                                        <td>
-                                            <a href="{{ url_for('detalhes_veiculo', placa=veiculo.placa) }}" class="btn btn-sm btn-outline-light">
-                                                <i class="fas fa-search"></i>
-                                            </a>
-                                        </td>
-                                    </tr>
-                                    {% endfor %}
+                                    {{ tabela_veiculos }}
                                 </tbody>
                             </table>
                         </div>
@@ -1082,23 +1352,136 @@ def index():
         </div>
         
         <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    """
-    return render_template_string(html_page, 
-                                 veiculos=veiculos,
-                                 alertas=alertas,
-                                 acessos=acessos,
-                                 imagens_desconhecidas=imagens_desconhecidas)
+        <script>
+            // Atualizações em tempo real: o servidor envia cada evento uma única vez para todos os painéis
+            const MAX_ACESSOS = 20;
+            const MAX_ALERTAS = 3;
 
+            function criar(tag, classe, texto) {
+                const el = document.createElement(tag);
+                if (classe) el.className = classe;
+                if (texto !== undefined) el.textContent = texto;
+                return el;
+            }
 
-@app.route('/cadastro_veiculo')
-def cadastro_veiculo():
-    """Página de cadastro de veículo - Reformulada"""
-    placa = request.args.get('placa', '')
-    usuarios = conn_db.listar_usuarios(200)
+            function formatarHorario(iso) {
+                const d = new Date(iso);
+                const p = n => String(n).padStart(2, '0');
+                return `${p(d.getHours())}:${p(d.getMinutes())}:${p(d.getSeconds())} - ${p(d.getDate())}/${p(d.getMonth() + 1)}`;
+            }
+
+            function incrementar(id) {
+                const el = document.getElementById(id);
+                el.textContent = parseInt(el.textContent || '0', 10) + 1;
+            }
+
+            const fonte = new EventSource("{{ url_for('stream_eventos') }}");
+
+            fonte.addEventListener('acesso', (e) => {
+                const acesso = JSON.parse(e.data);
+                const tbody = document.getElementById('tabela-acessos');
+                const tr = document.createElement('tr');
+
+                const tdPlaca = criar('td');
+                tdPlaca.appendChild(criar('span', 'badge-placa px-2 py-1', acesso.placa));
+                tr.appendChild(tdPlaca);
+                tr.appendChild(criar('td', '', acesso.usuario_nome || 'Desconhecido'));
+
+                const tdTipo = criar('td');
+                tdTipo.appendChild(criar('span', 'badge bg-secondary', acesso.usuario_tipo || 'N/A'));
+                tr.appendChild(tdTipo);
+
+                const tdStatus = criar('td');
+                const badge = acesso.usuario_nome
+                    ? criar('span', 'badge bg-success', ' OK')
+                    : criar('span', 'badge bg-danger', ' Alert');
+                badge.prepend(criar('i', acesso.usuario_nome ? 'fas fa-check-circle' : 'fas fa-times-circle'));
+                tdStatus.appendChild(badge);
+                tr.appendChild(tdStatus);
+
+                tr.appendChild(criar('td', 'font-monospace text-muted small', formatarHorario(acesso.data_acesso)));
+
+                tbody.prepend(tr);
+                while (tbody.children.length > MAX_ACESSOS) {
+                    tbody.removeChild(tbody.lastElementChild);
+                }
+                incrementar('contador-acessos');
+            });
+
+            fonte.addEventListener('alerta', (e) => {
+                const alerta = JSON.parse(e.data);
+                const area = document.getElementById('area-alertas');
+                const classe = alerta.tipo_alerta === 'VEICULO_MARCADO' ? 'alert-warning' : 'alert-danger';
+                const div = criar('div', `alert alert-dismissible fade show ${classe} shadow-sm`);
+                div.setAttribute('role', 'alert');
+                div.appendChild(criar('i', 'fas fa-exclamation-triangle me-2'));
+                div.appendChild(criar('strong', '', 'ALERTA: '));
+                div.appendChild(document.createTextNode(`${alerta.mensagem} (${alerta.placa})`));
+                const fechar = criar('button', 'btn-close');
+                fechar.type = 'button';
+                fechar.setAttribute('data-bs-dismiss', 'alert');
+                div.appendChild(fechar);
+
+                area.prepend(div);
+                while (area.children.length > MAX_ALERTAS) {
+                    area.removeChild(area.lastElementChild);
+                }
+                incrementar('contador-alertas');
+            });
+
+            fonte.addEventListener('deteccao', (e) => {
+                const det = JSON.parse(e.data);
+                const el = document.getElementById('ultima-deteccao');
+                el.textContent = `ÚLTIMA: ${det.placa} (${Math.round(det.confianca * 100)}%)`;
+                el.classList.remove('d-none');
+            });
+
+            fonte.addEventListener('camera', (e) => {
+                const camera = JSON.parse(e.data);
+                const el = document.getElementById('estado-camera');
+                el.className = `badge ${camera.estado === 'conectado' ? 'bg-success' : 'bg-warning text-dark'}`;
+                el.title = camera.erro || camera.origem;
+                el.replaceChildren(criar('i', 'fas fa-video me-1'), document.createTextNode(camera.estado.toUpperCase()));
+            });
+        </script>
+    </body>
+    </html>
+""")
+
+
+@app.route('/')
+def index():
+    """Página principal - Dashboard Moderno"""
+    total_veiculos, tabela_veiculos = fragmentos.obter('veiculos', renderizar_tabela_veiculos)
+    hoje = conn_db.resumo_estatisticas()
+    alertas = conn_db.listar_alertas(apenas_nao_resolvidos=True, limite=10)
+    acessos = conn_db.listar_acessos_recentes(limite=20)
+    
+    # Lista imagens de placas desconhecidas
+    imagens_desconhecidas = sorted(
+        glob.glob(os.path.join(PASTA_PLACAS_DESCONHECIDAS, "*.jpg")),
+        key=os.path.getmtime,
+        reverse=True
+    )[:20]  # Últimas 20
     
-    html_page = """
+    return modelos.renderizar(PAGINA_INDEX,
+                              total_veiculos=total_veiculos,
+                              tabela_veiculos=tabela_veiculos,
+                              alertas=alertas,
+                              acessos=acessos,
+                              imagens_desconhecidas=imagens_desconhecidas,
+                              hoje=hoje,
+                              camera=fonte_camera.status())
+
+
+FRAGMENTO_OPCOES_USUARIOS = modelos.registrar('fragmento_opcoes_usuarios.html', """
+                                        {% for usuario in usuarios %}
+                                            <option value="{{ usuario.id }}">{{ usuario.nome }} ({{ usuario.tipo }})</option>
+                                        {% endfor %}
+""")
+
+
+PAGINA_CADASTRO_VEICULO = modelos.registrar('cadastro_veiculo.html', """
     <!doctype html>
     <html lang="pt-br" data-bs-theme="dark">
     <head>
@@ -1139,7 +1522,10 @@ def cadastro_veiculo():
         <div class="container" style="max-width: 900px;">
             <div class="d-flex justify-content-between align-items-center mb-4">
                 <h2 class="fw-bold text-light"><i class="fas fa-car-side me-2"></i>Cadastro de Veículo</h2>
-                <a href="{{ url_for('index') }}" class="btn btn-outline-secondary"><i class="fas fa-arrow-left me-2"></i>Voltar</a>
+                <div>
+                    <a href="{{ url_for('importar_cadastros') }}" class="btn btn-outline-info me-2"><i class="fas fa-file-import me-2"></i>Importar CSV</a>
+                    <a href="{{ url_for('index') }}" class="btn btn-outline-secondary"><i class="fas fa-arrow-left me-2"></i>Voltar</a>
+                </div>
             </div>
 
             <form action="{{ url_for('salvar_veiculo') }}" method="post">
@@ -1188,9 +1574,7 @@ def cadastro_veiculo():
                                     <label class="form-label">Usuário Cadastrado</label>
                                     <select id="usuario_existente" name="usuario_existente" class="form-select" required>
                                         <option value="">-- Selecione --</option>
-                                        {% for usuario in usuarios %}
-                                            <option value="{{ usuario.id }}">{{ usuario.nome }} ({{ usuario.tipo }})</option>
-                                        {% endfor %}
+                                        {{ opcoes_usuarios }}
                                     </select>
                                 </div>
 
@@ -1251,8 +1635,17 @@ def cadastro_veiculo():
         </div>
     </body>
     </html>
-    """
-    return render_template_string(html_page, placa=placa, usuarios=usuarios)
+""")
+
+
+@app.route('/cadastro_veiculo')
+def cadastro_veiculo():
+    """Página de cadastro de veículo - Reformulada"""
+    placa = request.args.get('placa', '')
+    opcoes_usuarios = fragmentos.obter('opcoes_usuarios', lambda: marcar_seguro(
+        modelos.renderizar(FRAGMENTO_OPCOES_USUARIOS, usuarios=conn_db.listar_usuarios(200))))
+    
+    return modelos.renderizar(PAGINA_CADASTRO_VEICULO, placa=placa, opcoes_usuarios=opcoes_usuarios)
 
 
 @app.route('/salvar_veiculo', methods=['POST'])
@@ -1274,6 +1667,8 @@ def salvar_veiculo():
         # Cria novo usuário
         usuario_nome = request.form.get('usuario_nome', '').strip()
         usuario_cpf = request.form.get('usuario_cpf', '').strip()
+        # Mesmo formato da importação em lote, para o CPF continuar único entre os dois caminhos
+        usuario_cpf = importacao.normalizar_cpf(usuario_cpf) or usuario_cpf
         usuario_telefone = request.form.get('usuario_telefone', '').strip()
         usuario_tipo = request.form.get('usuario_tipo', 'PARTICULAR')
         usuario_autorizado = 'usuario_autorizado' in request.form
@@ -1306,31 +1701,135 @@ def salvar_veiculo():
     if marcado and motivo_marcacao:
         conn_db.marcar_veiculo(placa_validada, motivo_marcacao)
     
-    # Remove imagens da placa da pasta de desconhecidos
+    # Move as imagens da placa da pasta de desconhecidos para a de conhecidos
+    mover_imagens_para_conhecidas(placa_validada)
+    
+    return redirect(url_for('index'))
+
+
+def mover_imagens_para_conhecidas(*placas):
+    """Move as imagens das placas cadastradas da pasta de desconhecidas para a de conhecidas"""
     try:
         import shutil
-        imagens_placa = glob.glob(os.path.join(PASTA_PLACAS_DESCONHECIDAS, f"{placa_validada}_*.jpg"))
-        for img_path in imagens_placa:
-            # Move para pasta de conhecidas ao invés de deletar
+        cadastradas = set(placas)
+        for img_path in glob.glob(os.path.join(PASTA_PLACAS_DESCONHECIDAS, "*_*.jpg")):
             nome_arquivo = os.path.basename(img_path)
+            if nome_arquivo.split('_', 1)[0] not in cadastradas:
+                continue
             destino = os.path.join(PASTA_PLACAS_CONHECIDAS, nome_arquivo)
             shutil.move(img_path, destino)
             print(f"✓ Imagem movida de desconhecidas para conhecidas: {nome_arquivo}")
     except Exception as e:
         print(f"⚠️ Erro ao mover imagens: {e}")
-    
-    return redirect(url_for('index'))
 
 
-@app.route('/detalhes_veiculo/<placa>')
-def detalhes_veiculo(placa):
-    """Mostra detalhes de um veículo específico"""
-    veiculo = conn_db.buscar_veiculo(placa)
+PAGINA_IMPORTACAO = modelos.registrar('importar_cadastros.html', """
+    <!doctype html>
+    <html lang="pt-br" data-bs-theme="dark">
+    <head>
+        <meta charset="utf-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1">
+        <title>Importação | Sentinel</title>
+        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
+        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
+        <style>
+            body { background-color: #0f172a; color: #e2e8f0; }
+            .card { background-color: #1e293b; border-color: #334155; }
+            .form-control { background-color: #0f172a; border-color: #475569; color: white; }
+        </style>
+    </head>
+    <body class="py-4">
+        <div class="container" style="max-width: 900px;">
+            <div class="d-flex justify-content-between align-items-center mb-4">
+                <h2 class="fw-bold text-light"><i class="fas fa-file-import me-2"></i>Importação de Cadastros</h2>
+                <a href="{{ url_for('cadastro_veiculo') }}" class="btn btn-outline-secondary"><i class="fas fa-arrow-left me-2"></i>Voltar</a>
+            </div>
+
+            {% if erro %}<div class="alert alert-danger">{{ erro }}</div>{% endif %}
+
+            <div class="card mb-4">
+                <div class="card-body">
+                    <p class="text-secondary mb-3">
+                        CSV em UTF-8 com cabeçalho, uma linha por veículo. Obrigatórias: <code>nome</code>, <code>cpf</code>, <code>placa</code>.
+                        Opcionais: <code>telefone</code>, <code>tipo</code> (PARTICULAR/OFICIAL), <code>autorizado</code> (sim/não),
+                        <code>modelo</code>, <code>cor</code>, <code>tipo_veiculo</code> (CARRO/MOTO/CAMINHAO/OUTRO), <code>motivo_marcacao</code>.
+                        Usuários são atualizados pelo CPF e veículos pela placa.
+                    </p>
+                    <form action="{{ url_for('importar_cadastros') }}" method="post" enctype="multipart/form-data" class="row g-3 align-items-center">
+                        <div class="col-md-7"><input type="file" name="arquivo" accept=".csv,text/csv" class="form-control" required></div>
+                        <div class="col-md-2 form-check">
+                            <input type="checkbox" name="simular" id="simular" class="form-check-input">
+                            <label for="simular" class="form-check-label">Simular</label>
+                        </div>
+                        <div class="col-md-3 text-end"><button type="submit" class="btn btn-success"><i class="fas fa-upload me-2"></i>Importar</button></div>
+                    </form>
+                </div>
+            </div>
+
+            {% if relatorio %}
+            <div class="card">
+                <div class="card-header fw-bold">{{ 'Simulação (nada foi gravado)' if relatorio.simulacao else 'Resultado' }}</div>
+                <div class="card-body">
+                    <p>{{ relatorio.importadas }} de {{ relatorio.linhas }} linhas importadas ·
+                       {{ relatorio.usuarios_inseridos or 0 }} usuários novos, {{ relatorio.usuarios_atualizados or 0 }} atualizados ·
+                       {{ relatorio.veiculos_inseridos or 0 }} veículos novos, {{ relatorio.veiculos_atualizados or 0 }} atualizados</p>
+                    {% if relatorio.erros %}
+                    <table class="table table-dark table-sm">
+                        <thead><tr><th>Linha</th><th>Campo</th><th>Erro</th></tr></thead>
+                        <tbody>
+                            {% for erro in relatorio.erros %}
+                            <tr><td>{{ erro.linha }}</td><td>{{ erro.campo }}</td><td>{{ erro.mensagem }}</td></tr>
+                            {% endfor %}
+                        </tbody>
+                    </table>
+                    {% endif %}
+                </div>
+            </div>
+            {% endif %}
+        </div>
+    </body>
+    </html>
+""")
+
+
+@app.route('/importar_cadastros', methods=['GET', 'POST'])
+def importar_cadastros():
+    """
+    Importação em lote de usuários e veículos (CSV)
+    Responde com a página e o relatório por linha, ou em JSON se o cliente pedir (Accept: application/json)
+    """
+    if request.method == 'GET':
+        return modelos.renderizar(PAGINA_IMPORTACAO, relatorio=None, erro=None)
     
-    if not veiculo:
-        return "Veículo não encontrado", 404
+    quer_json = request.accept_mimetypes.best == 'application/json'
+    
+    def responder(status, relatorio=None, erro=None):
+        if quer_json:
+            return jsonify(relatorio if relatorio is not None else {'erro': erro}), status
+        return modelos.renderizar(PAGINA_IMPORTACAO, relatorio=relatorio, erro=erro), status
+    
+    if request.content_length and request.content_length > IMPORTACAO_TAMANHO_MAXIMO:
+        return responder(413, erro=f"Arquivo maior que {IMPORTACAO_TAMANHO_MAXIMO // (1024 * 1024)} MB")
+    enviado = request.files.get('arquivo')
+    if not enviado or not enviado.filename:
+        return responder(400, erro="Selecione um arquivo CSV")
     
-    html_page = """
+    arquivo = io.TextIOWrapper(enviado.stream, encoding='utf-8-sig', newline='')
+    try:
+        relatorio = conn_db.importar_cadastros(arquivo, simular='simular' in request.form)
+    except ValueError as e:
+        return responder(400, erro=f"Arquivo inválido: {e}")
+    if relatorio is None:
+        return responder(503, erro="Erro no banco de dados; nenhuma linha foi importada")
+    
+    if not relatorio['simulacao']:
+        mover_imagens_para_conhecidas(*relatorio['placas'])
+        print(f"📥 Importação: {relatorio['importadas']} de {relatorio['linhas']} linhas, "
+              f"{len(relatorio['erros'])} com erro")
+    return responder(200, relatorio=relatorio)
+
+
+PAGINA_DETALHES_VEICULO = modelos.registrar('detalhes_veiculo.html', """
     <!doctype html>
     <html lang="pt-br">
     <head>
@@ -1436,16 +1935,47 @@ def detalhes_veiculo(placa):
         </div>
     </body>
     </html>
-    """
-    return render_template_string(html_page, veiculo=veiculo)
+""")
 
 
-@app.route('/listar_usuarios')
-def listar_usuarios():
-    """Lista todos os usuários cadastrados"""
-    usuarios = conn_db.listar_usuarios(200)
+@app.route('/detalhes_veiculo/<placa>')
+def detalhes_veiculo(placa):
+    """Mostra detalhes de um veículo específico"""
+    veiculo = conn_db.buscar_veiculo(placa)
+    
+    if not veiculo:
+        return "Veículo não encontrado", 404
     
-    html_page = """
+    return modelos.renderizar(PAGINA_DETALHES_VEICULO, veiculo=veiculo)
+
+
+FRAGMENTO_USUARIOS = modelos.registrar('fragmento_usuarios.html', """
+                    {% for usuario in usuarios %}
+                    <tr>
+                        <td>{{ usuario.nome }}</td>
+                        <td>{{ usuario.cpf or '-' }}</td>
+                        <td>{{ usuario.telefone or '-' }}</td>
+                        <td>
+                            {% if usuario.tipo == 'OFICIAL' %}
+                                <span class="badge badge-oficial">OFICIAL</span>
+                            {% else %}
+                                <span class="badge badge-particular">PARTICULAR</span>
+                            {% endif %}
+                        </td>
+                        <td>
+                            {% if usuario.autorizado %}
+                                <span class="badge badge-success">AUTORIZADO</span>
+                            {% else %}
+                                <span class="badge badge-danger">NÃO AUTORIZADO</span>
+                            {% endif %}
+                        </td>
+                        <td>{{ usuario.data_cadastro.strftime('%d/%m/%Y') }}</td>
+                    </tr>
+                    {% endfor %}
+""")
+
+
+PAGINA_USUARIOS = modelos.registrar('listar_usuarios.html', """
     <!doctype html>
     <html lang="pt-br">
     <head>
@@ -1509,41 +2039,25 @@ def listar_usuarios():
                     </tr>
                 </thead>
                 <tbody>
-                    {% for usuario in usuarios %}
-                    <tr>
-                        <td>{{ usuario.nome }}</td>
-                        <td>{{ usuario.cpf or '-' }}</td>
-                        <td>{{ usuario.telefone or '-' }}</td>
-                        <td>
-                            {% if usuario.tipo == 'OFICIAL' %}
-                                <span class="badge badge-oficial">OFICIAL</span>
-                            {% else %}
-                                <span class="badge badge-particular">PARTICULAR</span>
-                            {% endif %}
-                        </td>
-                        <td>
-                            {% if usuario.autorizado %}
-                                <span class="badge badge-success">AUTORIZADO</span>
-                            {% else %}
-                                <span class="badge badge-danger">NÃO AUTORIZADO</span>
-                            {% endif %}
-                        </td>
-                        <td>{{ usuario.data_cadastro.strftime('%d/%m/%Y') }}</td>
-                    </tr>
-                    {% endfor %}
+                    {{ linhas_usuarios }}
                 </tbody>
             </table>
         </div>
     </body>
     </html>
-    """
-    return render_template_string(html_page, usuarios=usuarios)
+""")
 
 
-@app.route('/live')
-def live_view():
-    """Página de visualização ao vivo - Estilo Câmera de Segurança"""
-    html_page = """
+@app.route('/listar_usuarios')
+def listar_usuarios():
+    """Lista todos os usuários cadastrados"""
+    linhas_usuarios = fragmentos.obter('usuarios', lambda: marcar_seguro(
+        modelos.renderizar(FRAGMENTO_USUARIOS, usuarios=conn_db.listar_usuarios(200))))
+    
+    return modelos.renderizar(PAGINA_USUARIOS, linhas_usuarios=linhas_usuarios)
+
+
+PAGINA_AO_VIVO = modelos.registrar('ao_vivo.html', """
     <!doctype html>
     <html lang="pt-br">
     <head>
@@ -1622,17 +2136,209 @@ def live_view():
         </div>
     </body>
     </html>
-    """
-    return render_template_string(html_page)
+""")
+
+
+@app.route('/live')
+def live_view():
+    """Página de visualização ao vivo - Estilo Câmera de Segurança"""
+    return modelos.renderizar(PAGINA_AO_VIVO)
+
+
+def stream_mjpeg():
+    """Stream de um cliente (servidor Flask): repassa os frames difundidos pelo laço de processamento"""
+    versao = entrar_cliente_mjpeg()
+    try:
+        while True:
+            nova, parte = quadros_mjpeg.aguardar(versao, INTERVALO_ESPERA_FRAME)
+            if nova == versao:
+                continue  # Câmera reconectando
+            if parte is None:
+                return
+            versao = nova
+            yield parte
+    finally:
+        sair_cliente_mjpeg()
+
+
+async def stream_mjpeg_async():
+    """Versão assíncrona de stream_mjpeg() para o servidor ASGI (uma corrotina por cliente)"""
+    versao = entrar_cliente_mjpeg()
+    try:
+        while True:
+            nova, parte = await quadros_mjpeg.aguardar_async(versao, INTERVALO_ESPERA_FRAME)
+            if nova == versao:
+                continue
+            if parte is None:
+                return
+            versao = nova
+            yield parte
+    finally:
+        sair_cliente_mjpeg()
 
 
 @app.route('/video_feed')
 def video_feed():
     """Rota que serve o stream de vídeo"""
-    return Response(generate_frames(), 
+    return Response(stream_mjpeg(), 
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
+def versao_do_cliente(cabecalhos=None):
+    """Versão enviada em If-None-Match (ETag W/"N"), ou None (cabecalhos padrão: os da requisição Flask)"""
+    cabecalhos = request.headers if cabecalhos is None else cabecalhos
+    valor = cabecalhos.get('if-none-match', '').strip()
+    if valor.startswith('W/'):
+        valor = valor[2:]
+    valor = valor.strip('"')
+    return int(valor) if valor.isdigit() else None
+
+
+def tempo_long_poll(args=None) -> float:
+    """Segundos de espera pedidos em ?aguardar=N (limitados a LONG_POLL_MAXIMO)"""
+    args = request.args if args is None else args
+    try:
+        return min(max(float(args.get('aguardar', 0)), 0.0), LONG_POLL_MAXIMO)
+    except ValueError:
+        return 0.0
+
+
+def corpo_versionado(versao, corpo, mimetype, cliente) -> tuple:
+    """(status, cabeçalhos, corpo): 200 com ETag, ou 304 se o cliente já tem a versão"""
+    cabecalhos = {'ETag': f'W/"{versao}"', 'Cache-Control': 'no-cache'}
+    if versao == cliente:
+        return 304, cabecalhos, b''
+    return 200, {**cabecalhos, 'Content-Type': mimetype}, corpo
+
+
+def resposta_versionada(versao, corpo, mimetype):
+    """Resposta Flask de corpo_versionado para a requisição atual"""
+    status, cabecalhos, corpo = corpo_versionado(versao, corpo, mimetype, versao_do_cliente())
+    return Response(corpo, status=status, headers=cabecalhos)
+
+
+def _snapshot_indisponivel() -> tuple:
+    corpo = para_json({'erro': 'Nenhum frame disponível', 'camera': fonte_camera.status()}).encode('utf-8')
+    return 503, {'Content-Type': 'application/json'}, corpo
+
+
+@app.route('/snapshot.jpg')
+def snapshot():
+    """
+    Frame mais recente da câmera em JPEG, sem abrir um stream
+    Com If-None-Match e ?aguardar=N, espera até N segundos por um frame novo (long-poll)
+    No servidor assíncrono a rota é atendida por snapshot_async
+    """
+    cliente = versao_do_cliente()
+    espera = tempo_long_poll()
+    if cliente is not None and espera:
+        indice, jpeg = instantaneo.aguardar(cliente, espera)
+    else:
+        indice, jpeg = instantaneo.obter()
+    if jpeg is None:
+        status, cabecalhos, corpo = _snapshot_indisponivel()
+        return Response(corpo, status=status, headers=cabecalhos)
+    return resposta_versionada(indice, jpeg, 'image/jpeg')
+
+
+async def snapshot_async(requisicao) -> tuple:
+    """/snapshot.jpg no event loop: o long-poll espera numa corrotina, não numa thread do pool"""
+    cliente = versao_do_cliente(requisicao.headers)
+    espera = tempo_long_poll(requisicao.args)
+    if cliente is not None and espera:
+        indice, jpeg = await instantaneo.aguardar_async(cliente, espera)
+    else:
+        indice, jpeg = await asyncio.get_running_loop().run_in_executor(None, instantaneo.obter)
+    if jpeg is None:
+        return _snapshot_indisponivel()
+    return corpo_versionado(indice, jpeg, 'image/jpeg', cliente)
+
+
+@app.route('/api/ultima_deteccao')
+def api_ultima_deteccao():
+    """
+    Última detecção (JSON) servida da memória
+    Com If-None-Match e ?aguardar=N, espera até N segundos por uma detecção nova (long-poll)
+    No servidor assíncrono a rota é atendida por ultima_deteccao_async
+    """
+    cliente = versao_do_cliente()
+    espera = tempo_long_poll()
+    if cliente is not None and espera:
+        versao, corpo = ultima_deteccao_json.aguardar(cliente, espera)
+    else:
+        versao, corpo = ultima_deteccao_json.obter()
+    return resposta_versionada(versao, corpo if corpo is not None else b'null', 'application/json')
+
+
+async def ultima_deteccao_async(requisicao) -> tuple:
+    """/api/ultima_deteccao no event loop (long-poll sem ocupar o pool de threads)"""
+    cliente = versao_do_cliente(requisicao.headers)
+    espera = tempo_long_poll(requisicao.args)
+    if cliente is not None and espera:
+        versao, corpo = await ultima_deteccao_json.aguardar_async(cliente, espera)
+    else:
+        versao, corpo = ultima_deteccao_json.obter()
+    return corpo_versionado(versao, corpo if corpo is not None else b'null', 'application/json', cliente)
+
+
+@app.route('/api/estatisticas')
+def api_estatisticas():
+    """Totais do dia (?dia=AAAA-MM-DD, padrão hoje; ?camera=) e detecções por hora, das tabelas pré-agregadas"""
+    try:
+        dia = datetime.strptime(request.args['dia'], '%Y-%m-%d').date() if request.args.get('dia') else None
+    except ValueError:
+        return jsonify({'erro': 'dia deve estar no formato AAAA-MM-DD'}), 400
+    resumo = conn_db.resumo_estatisticas(dia, request.args.get('camera') or None, serie=True)
+    if resumo is None:
+        return jsonify({'erro': 'Banco de dados indisponível'}), 503
+    return Response(para_json(resumo), mimetype='application/json')
+
+
+@app.route('/health')
+def health():
+    """Prontidão do sistema (200 quando o OCR está pronto, 503 caso contrário)"""
+    status_ocr = carregador_ocr.status()
+    pronto = carregador_ocr.pronto
+    return jsonify({
+        'status': 'pronto' if pronto else status_ocr['estado'],
+        'ocr': status_ocr,
+        'camera': fonte_camera.status(),
+        'banco': bool(conn_db and conn_db.conn and not conn_db.conn.closed),
+        'diario': sincronizador.status() if sincronizador else None
+    }), 200 if pronto else 503
+
+
+@app.route('/metrics')
+def exportar_metricas():
+    """Métricas no formato do Prometheus"""
+    return Response(metricas.REGISTRO.exportar(), mimetype=metricas.CONTENT_TYPE)
+
+
+CABECALHOS_EVENTOS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+@app.route('/eventos')
+def stream_eventos():
+    """Stream de eventos (detecções, acessos e alertas) via Server-Sent Events"""
+    return Response(eventos.stream(),
+                   mimetype='text/event-stream',
+                   headers=CABECALHOS_EVENTOS)
+
+
+def criar_app_asgi():
+    """
+    Aplicação de produção: /video_feed e /eventos (streams) e os long-polls /snapshot.jpg e
+    /api/ultima_deteccao no event loop; demais rotas do Flask em threads
+    """
+    return servidor_async.AplicacaoASGI(app, {
+        '/video_feed': (stream_mjpeg_async, 'multipart/x-mixed-replace; boundary=frame', {}),
+        '/eventos': (eventos.stream_async, 'text/event-stream', CABECALHOS_EVENTOS),
+    }, downloads=('/admin/exportar/',), rotas={
+        '/snapshot.jpg': snapshot_async,
+        '/api/ultima_deteccao': ultima_deteccao_async,
+    })
+
+
 @app.route('/images/<filename>')
 def static_image(filename):
     """Serve imagens salvas"""
@@ -1643,6 +2349,139 @@ def static_image(filename):
     return "Imagem não encontrada", 404
 
 
+@app.route('/clipes/<filename>')
+def clipe_alerta(filename):
+    """Serve os clipes gravados nos alertas"""
+    from flask import send_from_directory
+    return send_from_directory(os.path.abspath(PASTA_CLIPES), filename, mimetype='video/mp4')
+
+
+def requer_admin(funcao):
+    """Exige o token de administração no cabeçalho X-Admin-Token"""
+    @wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        if not TOKEN_ADMIN:
+            return "Rotas de administração desativadas (defina PLACAS_TOKEN_ADMIN)", 403
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), TOKEN_ADMIN.encode('utf-8')):
+            return "Não autorizado", 401
+        return funcao(*args, **kwargs)
+    return envoltorio
+
+
+@app.route('/admin/perfil', methods=['GET', 'POST', 'DELETE'])
+@requer_admin
+def admin_perfil():
+    """
+    Profiler por amostragem do processo em execução
+    POST ?segundos=N inicia, DELETE interrompe, GET retorna o estado
+    """
+    if request.method == 'POST':
+        try:
+            segundos = float(request.args.get('segundos', 30))
+        except ValueError:
+            return "Parâmetro 'segundos' inválido", 400
+        segundos = max(1.0, min(segundos, PERFIL_SEGUNDOS_MAXIMO))
+        if not perfilador.iniciar(segundos):
+            return jsonify(perfilador.estado()), 409
+        print(f"🔬 Profiler iniciado por {segundos:.0f}s")
+    elif request.method == 'DELETE':
+        perfilador.parar()
+        print("🔬 Profiler interrompido")
+    
+    return jsonify(perfilador.estado())
+
+
+@app.route('/admin/perfil/resultado')
+@requer_admin
+def admin_perfil_resultado():
+    """
+    Resultado do profiler: ?formato=svg (flame graph) ou collapsed (padrão)
+    Com a amostragem em andamento espera até LONG_POLL_MAXIMO segundos por ela (202 com o estado se não
+    terminar a tempo); ?aguardar=0 devolve na hora o parcial
+    """
+    thread = perfilador.thread
+    if perfilador.ativo and request.args.get('aguardar') != '0':
+        thread.join(timeout=LONG_POLL_MAXIMO)
+        if thread.is_alive():
+            return jsonify(perfilador.estado()), 202
+    
+    if request.args.get('formato') == 'svg':
+        return Response(perfilador.flame_graph_svg(), mimetype='image/svg+xml')
+    return Response(perfilador.pilhas_colapsadas(), mimetype='text/plain',
+                   headers={'Content-Disposition': 'attachment; filename=perfil.collapsed'})
+
+
+@app.route('/admin/rastros')
+@requer_admin
+def admin_rastros():
+    """Tempo por etapa dos últimos frames: ?formato=chrome para chrome://tracing"""
+    if request.args.get('formato') == 'chrome':
+        dados = rastreador.exportar_chrome()
+    else:
+        dados = rastreador.exportar()
+    return Response(json.dumps(dados), mimetype='application/json',
+                   headers={'Content-Disposition': 'attachment; filename=rastros.json'})
+
+
+TIPOS_EXPORTACAO = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def data_do_parametro(nome: str):
+    """Data AAAA-MM-DD da query string (None se ausente); ValueError se mal formatada"""
+    valor = request.args.get(nome)
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"{nome} deve estar no formato AAAA-MM-DD")
+
+
+@app.route('/admin/exportar/<tabela>')
+@requer_admin
+def admin_exportar(tabela):
+    """
+    Exporta acessos ou alertas em streaming (CSV ou Parquet)
+    ?formato=csv|parquet&desde=AAAA-MM-DD&ate=AAAA-MM-DD (exclusivo)&placa=&camera=
+    Cada exportação abre uma conexão própria, separada da usada pelo reconhecimento
+    """
+    formato = request.args.get('formato', 'csv')
+    try:
+        filtros = {
+            'desde': data_do_parametro('desde'),
+            'ate': data_do_parametro('ate'),
+            'placa': request.args.get('placa') or None,
+            'camera': request.args.get('camera') or None,
+        }
+        if formato not in TIPOS_EXPORTACAO:
+            raise ValueError(f"formato deve ser um de: {', '.join(TIPOS_EXPORTACAO)}")
+        exportacao.montar_consulta(tabela, **filtros)
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    if formato == 'parquet' and not exportacao.parquet_disponivel():
+        return jsonify({'erro': 'Parquet requer pyarrow (pip install pyarrow)'}), 501
+    
+    if not exportacao.vagas_exportacao.acquire(blocking=False):
+        return jsonify({'erro': 'Muitas exportações em andamento, tente novamente mais tarde'}), 429
+    try:
+        conn = exportacao.abrir_conexao(lambda: psycopg2.connect(**POSTGRES_CONFIG))
+    except Exception as e:
+        exportacao.vagas_exportacao.release()
+        print(f"❌ Erro ao conectar para exportação: {e}")
+        return jsonify({'erro': 'Banco de dados indisponível'}), 503
+    
+    arquivo = exportacao.nome_arquivo(tabela, formato, filtros['desde'], filtros['ate'])
+    print(f"📤 Exportando {arquivo}")
+    resposta = Response(exportacao.exportar(conn, tabela, formato, **filtros),
+                        mimetype=TIPOS_EXPORTACAO[formato],
+                        headers={'Content-Disposition': f'attachment; filename={arquivo}'})
+    # O gerador fecha a conexão; aqui cobre o caso de a resposta ser descartada antes de começar
+    resposta.call_on_close(conn.close)
+    resposta.call_on_close(exportacao.vagas_exportacao.release)
+    return resposta
+
+
 # --- INICIALIZAÇÃO ---
 if __name__ == '__main__':
     print("\n" + "="*60)
@@ -1650,9 +2489,22 @@ if __name__ == '__main__':
     print("="*60)
     print()
     
-    # Inicializa componentes
+    # Cria pastas se não existirem
+    os.makedirs(PASTA_PLACAS_DESCONHECIDAS, exist_ok=True)
+    os.makedirs(PASTA_PLACAS_CONHECIDAS, exist_ok=True)
+    
+    # Inicializa componentes (o OCR carrega em background enquanto o servidor sobe)
     inicializar_ocr()
-    conn_db = GerenciadorBanco()
+    modelos.compilar()
+    # Detecções vão para o diário local; o sincronizador as leva ao banco (e esvazia o atraso de uma queda)
+    diario = DiarioLocal(CONFIG_DIARIO['caminho'])
+    conn_db = GerenciadorBanco(diario)
+    # Conexão própria do sincronizador, com as migrações aplicadas (o banco pode ter subido depois)
+    sincronizador = SincronizadorDiario(diario, armazenamento.abrir, APLICADORES_DIARIO, CONFIG_DIARIO,
+                                        APLICADORES_DIARIO_LOTE).iniciar()
+    if PARTICIONAR_ACESSOS:
+        manutencao_particoes = ManutencaoParticoes(lambda: psycopg2.connect(**POSTGRES_CONFIG),
+                                                   'acessos', 'data_acesso', CONFIG_PARTICOES).iniciar()
     
     print("\n" + "="*60)
     print("Iniciando servidor web...")
@@ -1662,7 +2514,16 @@ if __name__ == '__main__':
     print("\nPressione Ctrl+C para encerrar\n")
     
     try:
-        # Inicia o servidor Flask
-        app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+        if MODO_SERVIDOR == 'async':
+            try:
+                servidor_async.executar(criar_app_asgi(), porta=5000)
+            except ImportError:
+                print("⚠️  uvicorn não instalado (pip install uvicorn): usando o servidor do Flask")
+                app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+        else:
+            # Servidor de desenvolvimento (uma thread por cliente)
+            app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
     finally:
+        sincronizador.parar(aguardar=5)
         conn_db.fechar()
+        diario.fechar()